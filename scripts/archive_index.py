@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Sharded archive index for GitHub Pages.
+Keeps the newsletter list as a small head file with the newest issues, one
+shard per month, a tag index and a manifest listing the shards, so the
+landing page loads only the head and publishing rewrites only the files that
+changed.
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from build_manifest import write_if_changed
+from ledger import content_hash
+
+INDEX_DIR = "docs/newsletters/index"
+HEAD_FILE = "latest.json"
+MANIFEST_FILE = "manifest.json"
+TAGS_FILE = "tags.json"
+
+# The feed is built from the head, so it holds at least as many issues
+HEAD_SIZE = 20
+
+# Single-file index written before sharding; migrated on first use
+LEGACY_INDEX_PATH = "docs/newsletters/index.json"
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> bool:
+    return write_if_changed(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def tag_slug(tag: str) -> str:
+    """Return the file-name-safe slug of a feed tag."""
+    slug = re.sub(r"[^a-z0-9]+", "-", tag.lower()).strip("-")
+    # Tags without any ASCII letters or digits still need a stable name
+    return slug or f"t-{content_hash(tag)[:8]}"
+
+
+def _newest_first(newsletters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(newsletters, key=lambda newsletter: newsletter["date"], reverse=True)
+
+
+class ArchiveIndex:
+    """Head, monthly shards, tag index and manifest of the archive index.
+
+    After update(), changed_months and changed_tags (slugs) name the months
+    and tags whose listings changed.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR) -> None:
+        self.index_dir = index_dir
+        self.manifest = _read_json(self._path(MANIFEST_FILE)) or {
+            "head": HEAD_FILE, "shards": [], "totalCount": 0, "lastUpdated": None,
+        }
+        self.changed_months: Set[str] = set()
+        self.changed_tags: Set[str] = set()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def load_head(self) -> Dict[str, Any]:
+        """Return the head file: the newest issues plus the total count."""
+        return _read_json(self._path(HEAD_FILE)) or {
+            "newsletters": [], "totalCount": 0, "lastUpdated": None,
+        }
+
+    def load_shard(self, month: str) -> List[Dict[str, Any]]:
+        """Return the issues of one YYYY-MM month."""
+        shard = _read_json(self._path(f"{month}.json"))
+        return shard["newsletters"] if shard else []
+
+    def load_tags(self) -> Dict[str, Dict[str, Any]]:
+        """Return the tag index: slug -> {"name", "dates" (newest first)}."""
+        tags = _read_json(self._path(TAGS_FILE))
+        return tags["tags"] if tags else {}
+
+    def update(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge entries into their monthly shards and the head; return the head.
+
+        Only shards whose entries changed are rewritten; the head and manifest
+        (and the lastUpdated stamp) are rewritten only if anything changed.
+        """
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            by_month.setdefault(entry["date"][:7], []).append(entry)
+
+        shards = {shard["month"]: shard for shard in self.manifest["shards"]}
+        tags = None
+        changed = False
+        for month, month_entries in by_month.items():
+            newsletters = {newsletter["date"]: newsletter for newsletter in self.load_shard(month)}
+            merged = dict(newsletters)
+            merged.update((entry["date"], entry) for entry in month_entries)
+            if merged == newsletters:
+                continue
+            
+            for entry in month_entries:
+                previous = newsletters.get(entry["date"])
+                if previous == entry:
+                    continue
+                if tags is None:
+                    tags = self.load_tags()
+                self._retag(tags, entry["date"], previous.get("tags", []) if previous else [], entry.get("tags", []))
+
+            shard = {"month": month, "newsletters": _newest_first(list(merged.values()))}
+            _write_json(self._path(f"{month}.json"), shard)
+            shards[month] = {
+                "month": month,
+                "file": f"{month}.json",
+                "count": len(merged),
+                "hash": content_hash(json.dumps(shard, ensure_ascii=False, sort_keys=True)),
+            }
+            self.changed_months.add(month)
+            changed = True
+
+        if tags is not None and self.changed_tags:
+            _write_json(self._path(TAGS_FILE), {"tags": dict(sorted(tags.items()))})
+
+        head = self.load_head()
+        if not changed and head["lastUpdated"]:
+            return head
+
+        # The true newest issues are always among the old head and the new entries
+        newest = {newsletter["date"]: newsletter for newsletter in head["newsletters"]}
+        newest.update((entry["date"], entry) for entry in entries)
+
+        last_updated = datetime.now().isoformat()
+        total_count = sum(shard["count"] for shard in shards.values())
+        head = {
+            "newsletters": _newest_first(list(newest.values()))[:HEAD_SIZE],
+            "totalCount": total_count,
+            "lastUpdated": last_updated,
+        }
+        self.manifest = {
+            "head": HEAD_FILE,
+            "shards": sorted(shards.values(), key=lambda shard: shard["month"], reverse=True),
+            "totalCount": total_count,
+            "lastUpdated": last_updated,
+        }
+        _write_json(self._path(HEAD_FILE), head)
+        _write_json(self._path(MANIFEST_FILE), self.manifest)
+        return head
+
+    def _retag(self, tags: Dict[str, Dict[str, Any]], date: str, old: List[str], new: List[str]) -> None:
+        """Move one issue from its old tags to its new ones, marking both as changed."""
+        for tag in old:
+            slug = tag_slug(tag)
+            if slug in tags and date in tags[slug]["dates"]:
+                tags[slug]["dates"].remove(date)
+                if not tags[slug]["dates"]:
+                    del tags[slug]
+            self.changed_tags.add(slug)
+        for tag in new:
+            slug = tag_slug(tag)
+            entry = tags.setdefault(slug, {"name": tag, "dates": []})
+            if date not in entry["dates"]:
+                entry["dates"] = sorted(entry["dates"] + [date], reverse=True)
+            self.changed_tags.add(slug)
+
+    def migrate_legacy(self, legacy_path: str = LEGACY_INDEX_PATH) -> bool:
+        """Shard a single-file index.json and remove it; return True if migrated."""
+        legacy = _read_json(legacy_path)
+        if legacy is None:
+            return False
+        self.update(legacy["newsletters"])
+        os.remove(legacy_path)
+        return True
+
+
+def open_archive_index() -> ArchiveIndex:
+    """Open the sharded index, migrating a legacy index.json if one is left."""
+    index = ArchiveIndex()
+    if os.path.exists(LEGACY_INDEX_PATH):
+        index.migrate_legacy()
+    return index
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Build manifest for the static site.
+Records the content hashes of each generated file's inputs (source Markdown,
+template version, index entries) and of the file itself, so publishing only
+rebuilds stale outputs and never rewrites unchanged files. Outputs are
+replaced atomically, and publish_lock() serializes concurrent publishes.
+"""
+
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Union
+
+from ledger import content_hash, file_hash
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; publishing then runs unlocked
+    fcntl = None
+
+DEFAULT_MANIFEST_PATH = "build_manifest.json"
+
+MANIFEST_VERSION = 1
+
+# Lock file held while publishing; set PUBLISH_LOCK_PATH to an empty string to disable
+DEFAULT_LOCK_PATH = ".cache/publish.lock"
+
+
+def atomic_write(path: str, content: Union[str, bytes]) -> None:
+    """Write text or bytes to a temporary file, fsync it and rename it over path.
+
+    Readers and later runs see either the old file or the new one, never a
+    truncated write.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_if_changed(path: str, content: Union[str, bytes]) -> bool:
+    """Atomically write text or bytes to path unless the file already holds them; return True if written."""
+    if file_hash(path) == content_hash(content):
+        return False
+    atomic_write(path, content)
+    return True
+
+
+@contextmanager
+def publish_lock(path: Optional[str] = None) -> Iterator[None]:
+    """Hold an exclusive lock on the site outputs while publishing.
+
+    Other processes (and threads) taking the lock wait until it is released,
+    so concurrent publishes cannot interleave their index and feed updates.
+    """
+    if path is None:
+        path = os.environ.get("PUBLISH_LOCK_PATH", DEFAULT_LOCK_PATH)
+    if not path or fcntl is None:
+        yield
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class BuildManifest:
+    """Input and output hashes for every generated file, keyed by output path."""
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH) -> None:
+        self.path = path
+        self.targets: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.targets = data.get("targets", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def is_fresh(self, output_path: str, inputs: Dict[str, str]) -> bool:
+        """Check that output_path was built from these inputs and has not changed since."""
+        target = self.targets.get(output_path)
+        if not target or target.get("inputs") != inputs:
+            return False
+        return file_hash(output_path) == target.get("output")
+
+    def record(self, output_path: str, inputs: Dict[str, str], output_hash: Optional[str] = None) -> None:
+        """Remember the inputs an output was built from and the output's hash."""
+        self.targets[output_path] = {
+            "inputs": inputs,
+            "output": output_hash or file_hash(output_path),
+        }
+
+    def save(self) -> bool:
+        """Write the manifest if it changed; return True if written."""
+        data = {
+            "version": MANIFEST_VERSION,
+            "targets": dict(sorted(self.targets.items())),
+        }
+        return write_if_changed(self.path, json.dumps(data, ensure_ascii=False, indent=2) + "\n")
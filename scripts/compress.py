@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Precompressed variants of the published site.
+Writes gzip and Brotli siblings (.gz/.br) next to changed HTML, JSON, XML and
+CSS files under docs/ so hosts that serve static precompressed files can skip
+on-the-fly compression.
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from build_manifest import BuildManifest, publish_lock, write_if_changed
+from ledger import content_hash
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip siblings are still written
+    brotli = None
+
+SITE_DIR = "docs"
+COMPRESSIBLE_EXTENSIONS = (".html", ".json", ".xml", ".css")
+
+# Below this size the compressed file saves less than a network packet
+MIN_COMPRESS_BYTES = 1024
+
+
+class CompressionStats:
+    """Byte totals for the files compressed in one run."""
+
+    def __init__(self) -> None:
+        self.compressed = 0
+        self.unchanged = 0
+        self.original_bytes = 0
+        self.variant_bytes: Dict[str, int] = {"gz": 0, "br": 0}
+
+    def add(self, sizes: Dict[str, int]) -> None:
+        self.compressed += 1
+        self.original_bytes += sizes["original"]
+        for encoding in self.variant_bytes:
+            self.variant_bytes[encoding] += sizes.get(encoding, 0)
+
+    def summary(self) -> str:
+        """Format the byte savings as a short report."""
+        lines = [
+            f"Compressed {self.compressed} files ({self.unchanged} unchanged), "
+            f"{self.original_bytes:,} bytes original"
+        ]
+        for encoding, size in self.variant_bytes.items():
+            if size:
+                saved = self.original_bytes - size
+                lines.append(
+                    f"  .{encoding}: {size:,} bytes "
+                    f"({saved:,} saved, {saved / self.original_bytes:.0%})"
+                )
+        return "\n".join(lines)
+
+
+def find_site_files(site_dir: str = SITE_DIR) -> List[str]:
+    """List compressible files under the site directory."""
+    paths = []
+    for extension in COMPRESSIBLE_EXTENSIONS:
+        paths.extend(glob.glob(os.path.join(site_dir, "**", f"*{extension}"), recursive=True))
+    return sorted(path for path in paths if os.path.getsize(path) >= MIN_COMPRESS_BYTES)
+
+
+def compress_file(path: str) -> Dict[str, int]:
+    """Write the .gz (and .br if available) siblings of one file; return their sizes."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    # mtime=0 keeps the gzip bytes stable, so unchanged input never shows up in git
+    variants = {"gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+
+    sizes = {"original": len(data)}
+    for encoding, compressed in variants.items():
+        write_if_changed(f"{path}.{encoding}", compressed)
+        sizes[encoding] = len(compressed)
+    return sizes
+
+
+def compress_site(
+    paths: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    manifest: Optional[BuildManifest] = None,
+) -> CompressionStats:
+    """Compress every file whose content changed since its siblings were written.
+
+    Without a manifest, the build manifest is loaded and saved under the
+    publish lock, so a concurrent publish cannot overwrite (or be
+    overwritten by) this run's manifest.
+    """
+    if manifest is None:
+        with publish_lock():
+            manifest = BuildManifest()
+            stats = compress_site(paths, workers, manifest)
+            manifest.save()
+        return stats
+    if paths is None:
+        paths = find_site_files()
+    encodings = ["gz"] + (["br"] if brotli is not None else [])
+
+    stats = CompressionStats()
+    stale = []
+    inputs: Dict[str, Dict[str, str]] = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            inputs[path] = {"source": content_hash(f.read())}
+        if all(manifest.is_fresh(f"{path}.{encoding}", inputs[path]) for encoding in encodings):
+            stats.unchanged += 1
+        else:
+            stale.append(path)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, sizes in zip(stale, executor.map(compress_file, stale)):
+            stats.add(sizes)
+            for encoding in encodings:
+                manifest.record(f"{path}.{encoding}", inputs[path])
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Write .gz/.br siblings for changed files in docs/",
+    )
+    parser.add_argument("paths", nargs="*", help="Files to compress (default: every eligible file in docs/)")
+    parser.add_argument(
+        "--workers", type=int,
+        help="Files compressed at the same time (default: one per CPU)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main function to precompress the published site."""
+    args = parse_args()
+
+    if brotli is None:
+        print("brotli is not installed; writing gzip variants only", file=sys.stderr)
+
+    started = time.monotonic()
+    stats = compress_site(args.paths or None, args.workers)
+    print(stats.summary())
+    print(f"Done in {time.monotonic() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
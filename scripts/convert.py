@@ -4,11 +4,25 @@ HTML to Markdown conversion script.
 Converts HTML content to Markdown format while preserving headings and links.
 """
 
+import argparse
+import glob
+import os
 import sys
-from typing import Optional
+import time
+from typing import Callable, List, Optional, Tuple
 
 import html2text
 
+from html_sections import convert_html_to_sections, sections_markdown, write_sections
+from ledger import Ledger, content_hash, guid_for_file, open_ledger, run_stage
+
+# html2text converts the whole body in one pass; stream emits section records
+CONVERTERS = ("html2text", "stream")
+DEFAULT_CONVERTER = os.environ.get("CONVERTER", "html2text")
+
+# Source issue HTML saved by fetch.py; without any, the feed's entries are fetched
+BENCHMARK_PATTERN = "output/*_issue.html"
+
 
 def convert_html_to_markdown(html_content: str) -> str:
     """Convert HTML content to Markdown format."""
@@ -31,6 +45,11 @@ def convert_html_to_markdown(html_content: str) -> str:
     return markdown_content
 
 
+def convert_html_to_markdown_sections(html_content: str) -> str:
+    """Convert HTML content to Markdown with the streaming section converter."""
+    return sections_markdown(convert_html_to_sections(html_content))
+
+
 def read_html_file(file_path: str) -> str:
     """Read HTML content from file."""
     try:
@@ -44,24 +63,174 @@ def read_html_file(file_path: str) -> str:
         sys.exit(1)
 
 
+def convert_file(
+    html_file: str,
+    markdown_file: str,
+    ledger: Optional[Ledger] = None,
+    html_content: Optional[str] = None,
+    converter: Optional[str] = None,
+) -> str:
+    """Convert an HTML file to a Markdown file, skipping unchanged input.
+
+    With the stream converter the section records are saved next to the
+    Markdown (foo.md -> foo_sections.json) for translation to reuse.
+    html_content can be passed when the caller already holds the file's
+    content. Returns the Markdown content.
+    """
+    converter = converter or DEFAULT_CONVERTER
+    if html_content is None:
+        html_content = read_html_file(html_file)
+    
+    if not html_content.strip():
+        print("Error: HTML file is empty")
+        sys.exit(1)
+    
+    converted = {}
+    
+    def work(extra: dict) -> None:
+        sections = None
+        if converter == "stream":
+            sections = convert_html_to_sections(html_content)
+            markdown_content = sections_markdown(sections)
+        else:
+            markdown_content = convert_html_to_markdown(html_content)
+        
+        if not markdown_content.strip():
+            print("Error: Conversion resulted in empty content")
+            sys.exit(1)
+        
+        with open(markdown_file, "w", encoding="utf-8") as f:
+            f.write(markdown_content + "\n")
+        converted["markdown"] = markdown_content + "\n"
+        if sections is not None:
+            write_sections(markdown_file, sections, converted["markdown"])
+            extra["sections"] = len(sections)
+    
+    # html2text keeps the plain content hash so existing ledger entries stay current
+    input_hash = content_hash(html_content if converter == "html2text" else f"{converter}\0{html_content}")
+    ledger = ledger or open_ledger()
+    run_stage(
+        ledger, guid_for_file(ledger, html_file), "convert", work,
+        input_hash=input_hash, output_path=markdown_file,
+    )
+    if "markdown" in converted:
+        return converted["markdown"]
+    return read_html_file(markdown_file)
+
+
+def time_converter(convert: Callable[[str], str], html_content: str, repeat: int) -> float:
+    """Return the best of repeat wall-clock times for one conversion."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert(html_content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_sources(pattern: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Return (name, HTML) pairs of source issues to benchmark.
+
+    Files matching pattern (default: the fetched issues in output/) are used;
+    if the default matches nothing, the entries of the FEED_URL feed are
+    downloaded instead.
+    """
+    paths = sorted(glob.glob(pattern or BENCHMARK_PATTERN))
+    if paths or pattern:
+        return [(path, read_html_file(path)) for path in paths]
+    
+    feed_url = os.environ.get("FEED_URL")
+    if not feed_url:
+        print(f"Error: No files match {BENCHMARK_PATTERN}; set FEED_URL to benchmark the feed's issues")
+        sys.exit(1)
+    import fetch
+    feed, _ = fetch.fetch_feed(feed_url, conditional=False)
+    return [
+        (f"{fetch.get_date_prefix(entry)}_issue.html", fetch.extract_html_content(entry))
+        for entry in fetch.get_all_entries(feed)
+        if fetch.extract_html_content(entry)
+    ]
+
+
+def benchmark(sources: List[Tuple[str, str]], repeat: int = 3, largest: int = 5) -> None:
+    """Time both converters on each source and print the largest ones and totals."""
+    rows = []
+    for path, html_content in sources:
+        rows.append((
+            path,
+            len(html_content.encode("utf-8")),
+            time_converter(convert_html_to_markdown, html_content, repeat),
+            time_converter(convert_html_to_markdown_sections, html_content, repeat),
+        ))
+    if not rows:
+        print("Error: No HTML files to benchmark")
+        sys.exit(1)
+    
+    rows.sort(key=lambda row: row[1], reverse=True)
+    print(f"{'file':<40} {'KB':>7} {'html2text ms':>13} {'stream ms':>10} {'speedup':>8}")
+    for path, size, slow, fast in rows[:largest]:
+        print(f"{os.path.basename(path):<40} {size / 1024:>7.1f} {slow * 1000:>13.2f} {fast * 1000:>10.2f} {slow / fast:>7.2f}x")
+    total_size = sum(row[1] for row in rows)
+    total_slow = sum(row[2] for row in rows)
+    total_fast = sum(row[3] for row in rows)
+    print(
+        f"{f'total ({len(rows)} files)':<40} {total_size / 1024:>7.1f} {total_slow * 1000:>13.2f} "
+        f"{total_fast * 1000:>10.2f} {total_slow / total_fast:>7.2f}x"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Convert newsletter HTML to Markdown",
+        epilog="Example: python convert.py 2024-01-15_issue.html -o 2024-01-15_issue.md",
+    )
+    parser.add_argument(
+        "html_file", nargs="?",
+        help=f"HTML file to convert (with --benchmark: a glob of files, default {BENCHMARK_PATTERN} or the feed)",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write Markdown to this file and record the stage in the ledger (default: stdout)",
+    )
+    parser.add_argument(
+        "--converter", choices=CONVERTERS, default=DEFAULT_CONVERTER,
+        help="Conversion mode (default: CONVERTER or html2text)",
+    )
+    parser.add_argument(
+        "--benchmark", action="store_true",
+        help="Time both converters on the matching files instead of converting",
+    )
+    args = parser.parse_args()
+    if not args.html_file and not args.benchmark:
+        parser.error("html_file is required")
+    return args
+
+
 def main() -> None:
     """Main function to convert HTML to Markdown."""
-    if len(sys.argv) != 2:
-        print("Usage: python convert.py <html_file>")
-        print("Example: python convert.py 2024-01-15_issue.html")
-        sys.exit(1)
+    args = parse_args()
+    
+    if args.benchmark:
+        benchmark(benchmark_sources(args.html_file))
+        return
     
-    html_file = sys.argv[1]
+    if args.output:
+        convert_file(args.html_file, args.output, converter=args.converter)
+        return
     
     # Read HTML content
-    html_content = read_html_file(html_file)
+    html_content = read_html_file(args.html_file)
     
     if not html_content.strip():
         print("Error: HTML file is empty")
         sys.exit(1)
     
     # Convert to Markdown
-    markdown_content = convert_html_to_markdown(html_content)
+    if args.converter == "stream":
+        markdown_content = convert_html_to_markdown_sections(html_content)
+    else:
+        markdown_content = convert_html_to_markdown(html_content)
     
     if not markdown_content.strip():
         print("Error: Conversion resulted in empty content")
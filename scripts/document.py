@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Parsed model of a translated newsletter issue.
+Splits the Japanese Markdown once into title, dates, sections, paragraphs,
+the quiet-day flag and the summaries each consumer needs (archive index,
+Discord, tweet), and caches the result as a JSON sidecar next to the
+Markdown so summarize, tweet, publish and the workflow all read the same
+values instead of re-scanning the text.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from build_manifest import write_if_changed
+from ledger import content_hash
+
+# Bump when parsing rules change so stale sidecars are reparsed
+DOCUMENT_VERSION = 1
+
+DEFAULT_TITLE = "AI技術ニュースレター"
+
+ISSUE_SUFFIX = "_issue_ja.md"
+SIDECAR_SUFFIX = "_issue_ja.json"
+
+ISSUE_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+DATE_LABEL_RE = re.compile(r'\d{4}年\d{1,2}月\d{1,2}日')
+HEADING_RE = re.compile(r'^[#＃]+\s*(.*)$')
+LINK_RE = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+BOLD_RE = re.compile(r'\*\*([^*]+)\*\*')
+
+# Only the top of an issue is searched for its date and the quiet-day marker
+HEAD_LINES = 10
+QUIET_DAY_MARKERS = ("静かな一日", "quiet day")
+
+# Archive index summary
+SUMMARY_MAX_CHARS = 150
+SUMMARY_MIN_CHARS = 100
+
+# Discord embed description
+DISCORD_SUMMARY_MAX_CHARS = 1500
+
+# Tweet text, before the link is appended
+TWEET_MAX_CHARS = 100
+
+
+def clean_title(line: str) -> str:
+    """Strip heading markers and surrounding bold or italic from a title line."""
+    line = line.strip()
+    heading = HEADING_RE.match(line)
+    if heading:
+        line = heading.group(1)
+    if line.startswith("**") and line.endswith("**") and len(line) > 4:
+        line = line[2:-2]
+    elif line.startswith("*") and line.endswith("*") and len(line) > 2 and not line.startswith("**"):
+        line = line[1:-1]
+    return line.strip()
+
+
+def parse_sections(lines: List[str]) -> List[Dict[str, Any]]:
+    """Return every heading with its level (full-width ＃ counts as level 1)."""
+    sections = []
+    for line in lines:
+        stripped = line.strip()
+        heading = HEADING_RE.match(stripped)
+        if heading and heading.group(1):
+            marks = len(stripped) - len(stripped.lstrip("#＃"))
+            sections.append({"level": marks, "title": heading.group(1).strip()})
+    return sections
+
+
+def parse_paragraphs(lines: List[str]) -> List[str]:
+    """Return blank-line separated paragraphs, skipping headings, joined into single lines."""
+    paragraphs = []
+    current: List[str] = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            if current:
+                paragraphs.append(" ".join(current))
+                current = []
+        elif not HEADING_RE.match(stripped):
+            current.append(stripped)
+    if current:
+        paragraphs.append(" ".join(current))
+    return paragraphs
+
+
+def index_summary(lines: List[str]) -> str:
+    """Build the short archive summary from the first prose lines."""
+    summary_lines: List[str] = []
+    char_count = 0
+    for line in lines:
+        line = line.strip()
+        # Skip headers, images, bullet points, quotes and empty lines
+        if (not line or line.startswith(("#", "＃", "![", "- ", "* ", "> "))):
+            continue
+        clean_line = BOLD_RE.sub(r"\1", LINK_RE.sub(r"\1", line))
+        if char_count + len(clean_line) > SUMMARY_MAX_CHARS:
+            if summary_lines:
+                break
+            summary_lines.append(clean_line[:SUMMARY_MAX_CHARS - char_count - 3] + "...")
+            break
+        summary_lines.append(clean_line)
+        char_count += len(clean_line)
+        if char_count > SUMMARY_MIN_CHARS:
+            break
+
+    summary = " ".join(summary_lines)
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = summary[:SUMMARY_MAX_CHARS] + "..."
+    elif summary and not summary.endswith("..."):
+        summary = summary + "..."
+    return summary
+
+
+def discord_summary(paragraphs: List[str], max_length: int = DISCORD_SUMMARY_MAX_CHARS) -> str:
+    """Join whole paragraphs (no link-only lines) up to max_length characters."""
+    summary = ""
+    for para in paragraphs:
+        if para.startswith("["):
+            continue
+        if len(summary) + len(para) + 2 <= max_length:
+            summary = f"{summary}\n\n{para}" if summary else para
+            continue
+        # Add a partial paragraph if there is meaningful room left
+        remaining = max_length - len(summary) - 5
+        if remaining > 50:
+            partial = ""
+            for word in para.split():
+                if len(partial) + len(word) + 1 > remaining:
+                    break
+                partial = f"{partial} {word}" if partial else word
+            if partial:
+                summary += "\n\n" + partial + "..."
+        break
+    return summary.strip()
+
+
+def tweet_text(title: str, max_length: int = TWEET_MAX_CHARS) -> str:
+    """Shorten the title for a tweet, preferring to cut at a Japanese comma."""
+    if len(title) <= max_length:
+        return title
+    head = title[:max_length - 3]
+    if "、" in head:
+        return title[:head.rfind("、")] + "..."
+    return head + "..."
+
+
+class Document:
+    """One translated issue, parsed once."""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+
+    @property
+    def title(self) -> str:
+        return self.data["title"]
+
+    @property
+    def date(self) -> Optional[str]:
+        """Issue date (YYYY-MM-DD) from the file name, if known."""
+        return self.data["date"]
+
+    @property
+    def date_label(self) -> Optional[str]:
+        """Date as written near the top of the issue (YYYY年M月D日), if any."""
+        return self.data["date_label"]
+
+    @property
+    def sections(self) -> List[Dict[str, Any]]:
+        return self.data["sections"]
+
+    @property
+    def paragraphs(self) -> List[str]:
+        return self.data["paragraphs"]
+
+    @property
+    def quiet_day(self) -> bool:
+        return self.data["quiet_day"]
+
+    @property
+    def summary(self) -> str:
+        """Short summary for the archive index and feeds."""
+        return self.data["summary"]
+
+    @property
+    def discord_summary(self) -> str:
+        return self.data["discord_summary"]
+
+    @property
+    def tweet_text(self) -> str:
+        return self.data["tweet_text"]
+
+    def to_json(self) -> str:
+        return json.dumps(self.data, ensure_ascii=False, indent=2) + "\n"
+
+
+def parse_document(content: str, date: Optional[str] = None) -> Document:
+    """Parse translated Markdown into a Document."""
+    lines = content.replace("\r\n", "\n").strip().split("\n")
+
+    title = DEFAULT_TITLE
+    for line in lines:
+        if line.strip():
+            title = clean_title(line) or DEFAULT_TITLE
+            break
+
+    head = lines[:HEAD_LINES]
+    date_label = None
+    for line in head:
+        match = DATE_LABEL_RE.search(line)
+        if match:
+            date_label = match.group()
+            break
+
+    paragraphs = parse_paragraphs(lines)
+    return Document({
+        "version": DOCUMENT_VERSION,
+        "source_hash": content_hash(content),
+        "title": title,
+        "date": date,
+        "date_label": date_label,
+        "quiet_day": any(marker in line.lower() for line in head for marker in QUIET_DAY_MARKERS),
+        "sections": parse_sections(lines),
+        "paragraphs": paragraphs,
+        "summary": index_summary(lines),
+        "discord_summary": discord_summary(paragraphs),
+        "tweet_text": tweet_text(title),
+    })
+
+
+def sidecar_path(markdown_file: str) -> Optional[str]:
+    """Return the sidecar of a translated issue (*_issue_ja.md -> *_issue_ja.json).
+
+    Other Markdown files (such as the kept sources in content/newsletters,
+    whose .json siblings hold tags) have no sidecar.
+    """
+    if not markdown_file.endswith(ISSUE_SUFFIX):
+        return None
+    return markdown_file[:-len(ISSUE_SUFFIX)] + SIDECAR_SUFFIX
+
+
+def load_document(markdown_file: str, content: Optional[str] = None) -> Document:
+    """Return the parsed document for a Markdown file.
+
+    The sidecar is used when it was parsed from exactly this content;
+    otherwise the Markdown is parsed and the sidecar (re)written.
+    content can be passed when the caller already holds the file's content.
+    """
+    if content is None:
+        with open(markdown_file, "r", encoding="utf-8") as f:
+            content = f.read()
+
+    path = sidecar_path(markdown_file)
+    if path is not None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == DOCUMENT_VERSION and data.get("source_hash") == content_hash(content):
+                return Document(data)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    match = ISSUE_DATE_RE.search(os.path.basename(markdown_file))
+    document = parse_document(content, match.group() if match else None)
+    if path is not None:
+        write_if_changed(path, document.to_json())
+    return document
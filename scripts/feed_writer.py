@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+RSS and Atom feeds for the newsletter archive.
+Keeps each rendered feed item in a cache keyed by the hash of its archive
+entry and page, so publishing renders only new or changed items and splices
+them into the cached rest. Optionally writes a full-content Atom feed built
+from the already-rendered page bodies.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from build_manifest import BuildManifest, write_if_changed
+from ledger import content_hash, file_hash
+
+SITE_URL = "https://yipg.github.io/ainews/"
+PAGE_URL = SITE_URL + "docs/newsletters/"
+FEED_TITLE = "AI技術ニュースレター"
+FEED_DESCRIPTION = "AI技術に関する最新ニュースの日本語翻訳ニュースレター"
+
+RSS_PATH = "docs/feed.xml"
+ATOM_PATH = "docs/atom.xml"
+
+# Rendered items, committed alongside the kept sources
+CACHE_PATH = "content/feed_items.json"
+
+# Bump when the item markup changes so cached items are re-rendered
+ITEM_VERSION = 1
+
+# Items in each feed (at most the archive index head size)
+FEED_ITEMS = 20
+
+
+def full_content_enabled() -> bool:
+    """Whether the full-content Atom feed is written (FULL_CONTENT_FEED=1)."""
+    return os.environ.get("FULL_CONTENT_FEED", "0") not in ("", "0", "false", "no")
+
+
+def _published(date: str) -> datetime:
+    # Issues are dated by day; every issue is stamped 09:00 UTC
+    return datetime.strptime(date, "%Y-%m-%d").replace(hour=9, tzinfo=timezone.utc)
+
+
+def render_rss_item(entry: Dict[str, str]) -> str:
+    """Render one archive entry as an RSS <item>."""
+    url = escape(PAGE_URL + entry["filename"])
+    return f"""    <item>
+      <title>{escape(entry['title'])}</title>
+      <link>{url}</link>
+      <description>{escape(entry['summary'])}</description>
+      <pubDate>{_published(entry['date']).strftime('%a, %d %b %Y %H:%M:%S +0000')}</pubDate>
+      <guid isPermaLink="true">{url}</guid>
+    </item>"""
+
+
+def render_atom_entry(entry: Dict[str, str], content_html: str) -> str:
+    """Render one archive entry and its page body as an Atom <entry>."""
+    url = PAGE_URL + entry["filename"]
+    published = _published(entry["date"]).isoformat()
+    return f"""  <entry>
+    <title>{escape(entry['title'])}</title>
+    <link rel="alternate" type="text/html" href={quoteattr(url)}/>
+    <id>{escape(url)}</id>
+    <published>{published}</published>
+    <updated>{published}</updated>
+    <summary>{escape(entry['summary'])}</summary>
+    <content type="html" xml:base={quoteattr(url)}>{escape(content_html)}</content>
+  </entry>"""
+
+
+class FeedWriter:
+    """RSS (and optional Atom) feed assembled from cached rendered items."""
+
+    def __init__(self, cache_path: str = CACHE_PATH, full_content: Optional[bool] = None) -> None:
+        self.cache_path = cache_path
+        self.full_content = full_content_enabled() if full_content is None else full_content
+        self.items: Dict[str, Dict[str, Optional[str]]] = {}
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == ITEM_VERSION:
+                self.items = data["items"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        self.rendered = 0
+
+    def _key(self, entry: Dict[str, str], page_hash: Optional[str]) -> str:
+        parts = [json.dumps(entry, ensure_ascii=False, sort_keys=True)]
+        if self.full_content:
+            parts.append(page_hash or "")
+        return content_hash("\n".join(parts))
+
+    def update(
+        self,
+        entries: List[Dict[str, str]],
+        page_hash: Callable[[str], Optional[str]],
+        load_body: Callable[[str], Optional[str]],
+    ) -> None:
+        """Render the entries whose item is missing or stale, keeping the newest FEED_ITEMS.
+
+        page_hash(date) identifies the published page, so full-content entries
+        are re-rendered when the page changes; load_body(date) returns its
+        rendered body and is only called for those entries.
+        """
+        for entry in entries:
+            date = entry["date"]
+            key = self._key(entry, page_hash(date) if self.full_content else None)
+            cached = self.items.get(date)
+            if cached and cached["key"] == key and (cached["atom"] is not None or not self.full_content):
+                continue
+            atom = None
+            if self.full_content:
+                body = load_body(date)
+                atom = render_atom_entry(entry, body) if body is not None else None
+            self.items[date] = {"key": key, "rss": render_rss_item(entry), "atom": atom}
+            self.rendered += 1
+
+        newest = sorted(self.items, reverse=True)[:FEED_ITEMS]
+        self.items = {date: self.items[date] for date in newest}
+
+    def write(self, last_updated: Optional[str], manifest: Optional[BuildManifest] = None) -> int:
+        """Write the feeds and the item cache; return the number of files written.
+
+        The build date follows the archive index, so an unchanged archive
+        yields byte-identical feeds.
+        """
+        built = datetime.fromisoformat(last_updated) if last_updated else datetime.now()
+        dates = sorted(self.items, reverse=True)
+        inputs = {"items": content_hash("".join(self.items[date]["key"] for date in dates) + str(last_updated))}
+
+        written = 0
+        if manifest is None or not manifest.is_fresh(RSS_PATH, inputs):
+            rss_items = "\n".join(self.items[date]["rss"] for date in dates)
+            rss = f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
+  <channel>
+    <title>{escape(FEED_TITLE)}</title>
+    <link>{escape(SITE_URL)}</link>
+    <atom:link href={quoteattr(SITE_URL + RSS_PATH)} rel="self" type="application/rss+xml"/>
+    <description>{escape(FEED_DESCRIPTION)}</description>
+    <language>ja</language>
+    <lastBuildDate>{built.strftime('%a, %d %b %Y %H:%M:%S +0000')}</lastBuildDate>
+    <generator>AI Newsletter Archive System</generator>
+{rss_items}
+  </channel>
+</rss>"""
+            written += write_if_changed(RSS_PATH, rss)
+            if manifest is not None:
+                manifest.record(RSS_PATH, inputs, content_hash(rss))
+
+        atom_entries = [self.items[date]["atom"] for date in dates if self.items[date]["atom"]]
+        if self.full_content and (manifest is None or not manifest.is_fresh(ATOM_PATH, inputs)):
+            updated = built.replace(tzinfo=built.tzinfo or timezone.utc).isoformat(timespec="seconds")
+            atom = f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ja">
+  <title>{escape(FEED_TITLE)}</title>
+  <subtitle>{escape(FEED_DESCRIPTION)}</subtitle>
+  <link rel="alternate" type="text/html" href={quoteattr(SITE_URL)}/>
+  <link rel="self" type="application/atom+xml" href={quoteattr(SITE_URL + ATOM_PATH)}/>
+  <id>{escape(SITE_URL)}</id>
+  <updated>{updated}</updated>
+  <author><name>AIニュース</name></author>
+  <generator>AI Newsletter Archive System</generator>
+{chr(10).join(atom_entries)}
+</feed>"""
+            written += write_if_changed(ATOM_PATH, atom)
+            if manifest is not None:
+                manifest.record(ATOM_PATH, inputs, content_hash(atom))
+
+        data = {"version": ITEM_VERSION, "items": self.items}
+        write_if_changed(self.cache_path, json.dumps(data, ensure_ascii=False, indent=1) + "\n")
+        return written
+
+
+def page_hash_from(manifest: Optional[BuildManifest], pages_dir: str) -> Callable[[str], Optional[str]]:
+    """Look up a page's hash in the manifest, falling back to hashing the file."""
+    def page_hash(date: str) -> Optional[str]:
+        path = f"{pages_dir}/{date}.html"
+        target = manifest.targets.get(path) if manifest is not None else None
+        return target["output"] if target else file_hash(path)
+    return page_hash
@@ -4,39 +4,113 @@ RSS feed fetching script with deduplication.
 Fetches latest entry from RSS feed and saves HTML content and metadata.
 """
 
+import argparse
 import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 import feedparser
 import requests
 from dotenv import load_dotenv
 
+from ledger import Ledger, content_hash, open_ledger, run_stage
+from rate_limit import shared_limiter
+
 # Load environment variables from .env file
 load_dotenv()
 
+# ETag / Last-Modified of the last successful feed download
+FEED_STATE_FILE = "feed_state.json"
+
+# Seconds to wait for the feed server
+FEED_TIMEOUT = 30
+
+# Seconds a FEED_CACHE_PATH body is reused before the feed is downloaded again
+DEFAULT_FEED_CACHE_MAX_AGE = 3600
+
+# Default number of issues processed at the same time during backfill
+DEFAULT_BACKFILL_WORKERS = 3
 
-def load_last_guid() -> Optional[str]:
-    """Load the last processed GUID from file."""
+
+def load_feed_state() -> Dict[str, str]:
+    """Load the validators saved from the last feed download."""
     try:
-        with open("latest.txt", "r") as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return None
+        with open(FEED_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_feed_state(state: Dict[str, str]) -> None:
+    """Save the feed validators for the next conditional request.
 
+    Callers save them only once the feed's newest entry is published, so a
+    run that fails after the download gets a full response next time and
+    retries the entry instead of stopping at 304 Not Modified.
+    """
+    if not state:
+        return
+    with open(FEED_STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+        f.write("\n")
 
-def save_last_guid(guid: str) -> None:
-    """Save the current GUID to file."""
-    with open("latest.txt", "w") as f:
-        f.write(guid)
+
+def download_feed(feed_url: str, conditional: bool = True) -> Optional[Tuple[bytes, Dict[str, str]]]:
+    """Download the raw feed body and its validators, or return None on 304 Not Modified.
+
+    The validators are returned rather than saved; see save_feed_state.
+    With FEED_CACHE_PATH set, a cached body younger than FEED_CACHE_MAX_AGE
+    seconds (default 3600) is returned without touching the network or any
+    validators, and every fresh download is written there.
+    """
+    cache_path = os.environ.get("FEED_CACHE_PATH")
+    if cache_path and os.path.exists(cache_path):
+        max_age = float(os.environ.get("FEED_CACHE_MAX_AGE", DEFAULT_FEED_CACHE_MAX_AGE))
+        if time.time() - os.path.getmtime(cache_path) < max_age:
+            print(f"Using cached feed body: {cache_path}")
+            with open(cache_path, "rb") as f:
+                return f.read(), {}
+    
+    headers = {}
+    state = load_feed_state() if conditional else {}
+    if state.get("url") == feed_url:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+    
+    response = requests.get(feed_url, headers=headers, timeout=FEED_TIMEOUT)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    
+    state = {
+        "url": feed_url,
+        "etag": response.headers.get("ETag", ""),
+        "last_modified": response.headers.get("Last-Modified", ""),
+        "fetched_at": datetime.now().isoformat(),
+    }
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(cache_path, "wb") as f:
+            f.write(response.content)
+    
+    return response.content, state
 
 
-def fetch_feed(feed_url: str) -> Dict[str, Any]:
-    """Fetch RSS feed and return parsed data."""
+def fetch_feed(feed_url: str, conditional: bool = True) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+    """Fetch RSS feed and return parsed data with its unsaved validators, or None if it has not changed."""
     try:
-        feed = feedparser.parse(feed_url)
+        downloaded = download_feed(feed_url, conditional)
+        if downloaded is None:
+            return None
+        body, state = downloaded
+        
+        feed = feedparser.parse(body)
         
         if feed.bozo:
             print(f"Warning: Feed parsing issues: {feed.bozo_exception}")
@@ -45,29 +119,46 @@ def fetch_feed(feed_url: str) -> Dict[str, Any]:
             print("No entries found in feed")
             sys.exit(1)
             
-        return feed
+        return feed, state
     except Exception as e:
         print(f"Error fetching feed: {e}")
         sys.exit(1)
 
 
+def entry_to_dict(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the fields we use from a feed entry."""
+    return {
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "guid": entry.get("id", entry.get("guid", "")),
+        "published": entry.get("published", ""),
+        "summary": entry.get("summary", ""),
+        "content": entry.get("content", []),
+        "author": entry.get("author", ""),
+        "tags": [tag.get("term", "") for tag in entry.get("tags", [])],
+    }
+
+
 def get_latest_entry(feed: Dict[str, Any]) -> Dict[str, Any]:
     """Get the latest entry from the feed."""
-    latest_entry = feed.entries[0]
-    
-    # Extract relevant information
-    entry_data = {
-        "title": latest_entry.get("title", ""),
-        "link": latest_entry.get("link", ""),
-        "guid": latest_entry.get("id", latest_entry.get("guid", "")),
-        "published": latest_entry.get("published", ""),
-        "summary": latest_entry.get("summary", ""),
-        "content": latest_entry.get("content", []),
-        "author": latest_entry.get("author", ""),
-        "tags": [tag.get("term", "") for tag in latest_entry.get("tags", [])],
-    }
-    
-    return entry_data
+    return entry_to_dict(feed.entries[0])
+
+
+def get_all_entries(feed: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Get every entry in the feed, newest first."""
+    return [entry_to_dict(entry) for entry in feed.entries]
+
+
+def get_date_prefix(entry: Dict[str, Any]) -> str:
+    """Generate the YYYY-MM-DD file prefix from the RSS published date."""
+    try:
+        # Parse RSS published date (e.g., "Thu, 17 Jul 2025 05:44:39 GMT")
+        published_date = datetime.strptime(entry["published"], "%a, %d %b %Y %H:%M:%S %Z")
+        return published_date.strftime("%Y-%m-%d")
+    except (ValueError, KeyError):
+        # Fallback to system date if parsing fails
+        print("Warning: Could not parse RSS published date, using system date")
+        return datetime.now().strftime("%Y-%m-%d")
 
 
 def extract_html_content(entry: Dict[str, Any]) -> str:
@@ -82,35 +173,172 @@ def extract_html_content(entry: Dict[str, Any]) -> str:
     return entry.get("summary", "")
 
 
-def main() -> None:
-    """Main function to fetch and process RSS feed."""
-    feed_url = os.environ.get("FEED_URL")
-    if not feed_url:
-        print("Error: FEED_URL environment variable is required")
-        sys.exit(1)
+def save_entry(entry: Dict[str, Any], date_prefix: str, html_content: str) -> Dict[str, str]:
+    """Save an entry's HTML and metadata under output/ and return the file paths."""
+    html_filename = f"output/{date_prefix}_issue.html"
+    os.makedirs("output", exist_ok=True)
+    with open(html_filename, "w", encoding="utf-8") as f:
+        f.write(html_content)
     
-    # Fetch the RSS feed
-    feed = fetch_feed(feed_url)
-    latest_entry = get_latest_entry(feed)
+    # Save metadata
+    metadata = {
+        "title": entry["title"],
+        "link": entry["link"],
+        "guid": entry["guid"],
+        "published": entry["published"],
+        "author": entry["author"],
+        "tags": entry["tags"],
+        "processed_at": datetime.now().isoformat(),
+    }
     
-    # Generate date prefix from RSS published date
-    try:
-        # Parse RSS published date (e.g., "Thu, 17 Jul 2025 05:44:39 GMT")
-        published_date = datetime.strptime(latest_entry["published"], "%a, %d %b %Y %H:%M:%S %Z")
-        date_prefix = published_date.strftime("%Y-%m-%d")
-    except (ValueError, KeyError):
-        # Fallback to system date if parsing fails
-        print("Warning: Could not parse RSS published date, using system date")
-        date_prefix = datetime.now().strftime("%Y-%m-%d")
+    meta_filename = f"output/{date_prefix}_meta.json"
+    with open(meta_filename, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
     
-    current_guid = latest_entry["guid"]
-    last_guid = load_last_guid()
+    return {"html": html_filename, "meta": meta_filename}
+
+
+def find_unseen_entries(entries: List[Dict[str, Any]], ledger: Ledger) -> List[Dict[str, Any]]:
+    """Diff feed entries against the ledger and already published pages."""
+    unseen = []
+    for entry in entries:
+        if ledger.is_done(entry["guid"], "publish"):
+            continue
+        # Issues published before the ledger existed only left their page behind
+        if os.path.exists(f"docs/newsletters/{get_date_prefix(entry)}.html"):
+            continue
+        unseen.append(entry)
     
-    # Check if this is a new entry
-    if current_guid == last_guid:
+    return unseen
+
+
+def fetch_entry(entry: Dict[str, Any], date_prefix: str, html_content: str, ledger: Ledger) -> Dict[str, str]:
+    """Save an entry's files, skipping the write if the ledger has this exact content."""
+    paths = {
+        "html": f"output/{date_prefix}_issue.html",
+        "meta": f"output/{date_prefix}_meta.json",
+    }
+    
+    def work(extra: Dict[str, Any]) -> None:
+        save_entry(entry, date_prefix, html_content)
+    
+    ledger.record(entry["guid"], date=date_prefix, title=entry["title"])
+    run_stage(
+        ledger, entry["guid"], "fetch", work,
+        input_hash=content_hash(html_content), output_path=paths["html"],
+    )
+    return paths
+
+
+def process_entry(
+    entry: Dict[str, Any],
+    translate_concurrency: int,
+    ledger: Ledger,
+) -> str:
+    """Run one entry through convert, prune (if enabled) and translate; return the translated file.
+
+    Stages the ledger already shows as complete for the same input are skipped.
+    """
+    # Imported here so the plain fetch path does not load the OpenAI client
+    import prune
+    import translate
+    from convert import convert_file
+    
+    date_prefix = get_date_prefix(entry)
+    html_content = extract_html_content(entry)
+    if not html_content:
+        raise ValueError(f"No HTML content found in entry {entry['guid']}")
+    
+    paths = fetch_entry(entry, date_prefix, html_content, ledger)
+    
+    markdown_file = paths["html"].replace("_issue.html", "_issue.md")
+    convert_file(paths["html"], markdown_file, ledger)
+    
+    if prune.prune_enabled():
+        pruned_file = prune.pruned_path(markdown_file)
+        prune.prune_file(
+            markdown_file, pruned_file, ledger,
+            report_path=paths["html"].replace("_issue.html", "_prune.json"),
+        )
+        markdown_file = pruned_file
+    
+    ja_file = paths["html"].replace("_issue.html", "_issue_ja.md")
+    cache = translate.open_cache_from_env(translate.estimate_tokens)
+    try:
+        translate.translate_file(
+            translate.create_azure_client(), markdown_file, ja_file,
+            translate.load_translation_prompt(),
+            stream=True, concurrency=translate_concurrency, cache=cache, ledger=ledger,
+        )
+    finally:
+        cache.close()
+    
+    return ja_file
+
+
+def backfill(feed: Dict[str, Any], workers: int, translate_concurrency: int, ledger: Ledger) -> None:
+    """Process every unseen feed entry with a bounded worker pool."""
+    unseen = find_unseen_entries(get_all_entries(feed), ledger)
+    if not unseen:
         print("No new entries found. Skipping...")
         print("::set-output name=has_new_content::false")
-        sys.exit(0)
+        return
+    
+    print(f"Backfilling {len(unseen)} entries with {workers} workers...")
+    # Issues share one rate limiter; its starting concurrency is set once for all of them
+    shared_limiter().set_concurrency(max(1, workers) * translate_concurrency)
+    failures = 0
+    translated = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(process_entry, entry, translate_concurrency, ledger): entry
+            for entry in unseen
+        }
+        try:
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    ja_file = future.result()
+                    translated.append(ja_file)
+                    print(f"Translated {get_date_prefix(entry)}: {entry['title']}")
+                except Exception as e:
+                    failures += 1
+                    print(f"Failed to process {entry['guid']}: {e!r}")
+        except BaseException:
+            # translate stops on API errors with sys.exit, and Ctrl-C stops everything:
+            # queue nothing more and let it end the backfill
+            for future in futures:
+                future.cancel()
+            raise
+    
+    # Publish every translated issue in one batch: the index, listings and feed are written once
+    if translated:
+        import publish
+        try:
+            publish.publish_newsletters(sorted(translated), ledger)
+        except Exception as e:
+            failures += len(translated)
+            print(f"Failed to publish the backfilled issues: {e!r}")
+    
+    print(f"Backfill finished: {len(unseen) - failures} processed, {failures} failed")
+    if failures:
+        sys.exit(1)
+
+
+def fetch_latest_issue(feed: Dict[str, Any], ledger: Ledger) -> Optional[Dict[str, Any]]:
+    """Save the newest feed entry unless it is already published.
+
+    Returns the entry, its date prefix, HTML content and saved paths, or None
+    if there is nothing new.
+    """
+    latest_entry = get_latest_entry(feed)
+    
+    # Check if this entry has already been published
+    if ledger.is_done(latest_entry["guid"], "publish"):
+        return None
+    
+    # Generate date prefix from RSS published date
+    date_prefix = get_date_prefix(latest_entry)
     
     # Extract HTML content
     html_content = extract_html_content(latest_entry)
@@ -119,34 +347,71 @@ def main() -> None:
         print("No HTML content found in entry")
         sys.exit(1)
     
-    # Save HTML content with date prefix
-    html_filename = f"output/{date_prefix}_issue.html"
-    os.makedirs("output", exist_ok=True)
-    with open(html_filename, "w", encoding="utf-8") as f:
-        f.write(html_content)
+    # Save HTML content and metadata with date prefix
+    paths = fetch_entry(latest_entry, date_prefix, html_content, ledger)
+    return {"entry": latest_entry, "date": date_prefix, "html": html_content, "paths": paths}
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Fetch new newsletter entries from the RSS feed")
+    parser.add_argument(
+        "--backfill", action="store_true",
+        help="Convert, translate and publish every feed entry not yet processed",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_BACKFILL_WORKERS,
+        help=f"Issues processed at the same time during backfill (default: {DEFAULT_BACKFILL_WORKERS})",
+    )
+    parser.add_argument(
+        "--translate-concurrency", type=int, default=2,
+        help="Chunks translated at the same time per issue during backfill (default: 2)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main function to fetch and process RSS feed."""
+    args = parse_args()
     
-    # Save metadata
-    metadata = {
-        "title": latest_entry["title"],
-        "link": latest_entry["link"],
-        "guid": current_guid,
-        "published": latest_entry["published"],
-        "author": latest_entry["author"],
-        "tags": latest_entry["tags"],
-        "processed_at": datetime.now().isoformat(),
-    }
+    feed_url = os.environ.get("FEED_URL")
+    if not feed_url:
+        print("Error: FEED_URL environment variable is required")
+        sys.exit(1)
     
-    meta_filename = f"output/{date_prefix}_meta.json"
-    with open(meta_filename, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    # Fetch the RSS feed; backfill always needs the full entry list
+    fetched = fetch_feed(feed_url, conditional=not args.backfill)
+    if fetched is None:
+        print("Feed not modified since last fetch (304).")
+        print("No new entries found. Skipping...")
+        print("::set-output name=has_new_content::false")
+        sys.exit(0)
+    feed, feed_state = fetched
+    
+    ledger = open_ledger()
+    if not ledger.guids():
+        # First run after latest.txt was retired: carry its GUID over
+        ledger.import_legacy()
+    
+    if args.backfill:
+        # Exits non-zero if any entry failed, leaving the validators unsaved
+        backfill(feed, args.workers, args.translate_concurrency, ledger)
+        save_feed_state(feed_state)
+        return
     
-    # Save the GUID for deduplication
-    save_last_guid(current_guid)
+    issue = fetch_latest_issue(feed, ledger)
+    if issue is None:
+        # The newest entry is published, so the next run may ask for changes only
+        save_feed_state(feed_state)
+        print("No new entries found. Skipping...")
+        print("::set-output name=has_new_content::false")
+        sys.exit(0)
     
+    latest_entry = issue["entry"]
     print(f"Successfully processed: {latest_entry['title']}")
-    print(f"GUID: {current_guid}")
+    print(f"GUID: {latest_entry['guid']}")
     print(f"Published: {latest_entry['published']}")
-    print(f"Output files: {html_filename}, {meta_filename}")
+    print(f"Output files: {issue['paths']['html']}, {issue['paths']['meta']}")
     print("::set-output name=has_new_content::true")
 
 
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Streaming HTML-to-Markdown conversion into section records.
+Feeds issue HTML through an incremental parser and emits Markdown that is
+already split where translate.py splits (headings, recap titles and rules).
+Each record carries its heading, the IDs and text of its top-level list
+items and the source links it cites, so translation can take the sections
+as they are instead of re-splitting one flat string.
+"""
+
+import json
+import os
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from build_manifest import write_if_changed
+from ledger import content_hash
+
+# Bump when the record layout, item text or Markdown output changes
+SECTIONS_VERSION = 2
+
+# HTML is fed to the parser in pieces of this many characters
+CHUNK_CHARS = 64 * 1024
+
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "main", "nav",
+    "table", "dl", "dt", "dd", "figure", "figcaption", "center", "details", "summary",
+}
+SKIP_TAGS = {"script", "style", "head", "title", "noscript", "template"}
+EMPHASIS = {"strong": "**", "b": "**", "em": "_", "i": "_", "code": "`"}
+
+# Bold recap titles start a section, as markdown_sections.RECAP_RE does for Markdown
+RECAP_RE = re.compile(r'^\s*(\*\*)?AI (Twitter|Reddit|Discord) Recap', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+ESCAPE_RE = re.compile(r'([\\`*_])')
+
+RULE = "* * *"
+
+
+class SectionParser(HTMLParser):
+    """Incremental HTML parser that collects finished section records in ready."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.ready: List[Dict[str, Any]] = []
+        self._count = 0
+        self._heading: Optional[str] = None
+        self._level = 0
+        self._blocks: List[str] = []
+        self._links: List[str] = []
+        self._items: List[Dict[str, Any]] = []
+        # Lines of the current block and pieces of the current line
+        self._lines: List[str] = []
+        self._inline: List[str] = []
+        self._anchors: List[Tuple[int, Optional[str]]] = []
+        # One [ordered, count] per open list
+        self._lists: List[List[Any]] = []
+        self._marker = ""
+        self._item: Optional[Dict[str, Any]] = None
+        # Lines of the current top-level item, kept even when a nested block flushes them
+        self._item_lines: List[str] = []
+        self._quote = 0
+        self._skip = 0
+        self._code = 0
+        self._pre: Optional[List[str]] = None
+        self._heading_tag: Optional[str] = None
+
+    # Sections
+
+    def _has_content(self) -> bool:
+        return bool(self._blocks or self._lines or "".join(self._inline).strip())
+
+    def _close_section(self) -> None:
+        self._end_block()
+        if self._blocks:
+            self._count += 1
+            self.ready.append({
+                "id": f"s{self._count:03d}",
+                "heading": self._heading,
+                "level": self._level,
+                "markdown": "\n\n".join(self._blocks),
+                "links": list(dict.fromkeys(self._links)),
+                "items": self._items,
+            })
+        self._heading = None
+        self._level = 0
+        self._blocks = []
+        self._links = []
+        self._items = []
+
+    def _start_section(self, heading: Optional[str], level: int) -> None:
+        if self._has_content():
+            self._close_section()
+        self._heading = heading
+        self._level = level
+
+    # Lines and blocks
+
+    def _flush_line(self) -> None:
+        text = "".join(self._inline).strip()
+        self._inline = []
+        if not text:
+            return
+        if self._marker:
+            text = self._marker + text
+            self._marker = ""
+        elif self._lists:
+            text = "  " * len(self._lists) + text
+        if self._quote:
+            text = "> " * self._quote + text
+        self._lines.append(text)
+        if self._item is not None:
+            self._item_lines.append(text)
+
+    def _end_block(self) -> None:
+        self._flush_line()
+        if not self._lines:
+            return
+        block = "\n".join(self._lines)
+        self._lines = []
+        if self._blocks and not self._quote and RECAP_RE.match(block):
+            self._start_section(block.strip().strip("*").strip(), 0)
+        self._blocks.append(block)
+
+    def _end_item(self) -> None:
+        self._flush_line()
+        if self._item is not None:
+            self._item["text"] = "\n".join(self._item_lines)
+            self._items.append(self._item)
+            self._item = None
+
+    # Parser callbacks
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in SKIP_TAGS:
+            self._skip += 1
+            return
+        if self._skip or self._pre is not None:
+            return
+        if tag in EMPHASIS:
+            if tag == "code":
+                self._code += 1
+            self._inline.append(EMPHASIS[tag])
+        elif tag == "a":
+            self._anchors.append((len(self._inline), dict(attrs).get("href")))
+        elif tag == "br":
+            self._flush_line()
+        elif tag == "img":
+            attributes = dict(attrs)
+            if attributes.get("src"):
+                self._inline.append(f"![{attributes.get('alt') or ''}]({attributes['src']})")
+        elif tag == "li":
+            self._flush_line()
+            if not self._lists:
+                self._lists.append([False, 0])
+            if len(self._lists) == 1:
+                self._end_item()
+                self._item = {"id": f"s{self._count + 1:03d}-i{len(self._items) + 1:02d}", "links": []}
+                self._item_lines = []
+            current = self._lists[-1]
+            current[1] += 1
+            indent = "  " * (len(self._lists) - 1)
+            self._marker = indent + (f"{current[1]}. " if current[0] else "* ")
+        elif tag in ("ul", "ol"):
+            self._flush_line()
+            self._lists.append([tag == "ol", 0])
+        elif tag in HEADING_LEVELS:
+            self._start_section(None, HEADING_LEVELS[tag])
+            self._heading_tag = tag
+        elif tag == "hr":
+            self._start_section(None, 0)
+            self._blocks.append(RULE)
+        elif tag == "pre":
+            self._end_block()
+            self._pre = []
+        elif tag == "blockquote":
+            self._end_block()
+            self._quote += 1
+        elif tag == "tr":
+            self._flush_line()
+        elif tag in ("td", "th"):
+            if self._inline:
+                self._inline.append(" | ")
+        elif tag in BLOCK_TAGS:
+            if self._lists:
+                self._flush_line()
+            else:
+                self._end_block()
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in ("br", "img", "hr"):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+            return
+        if self._skip:
+            return
+        if self._pre is not None:
+            if tag == "pre":
+                code = "".join(self._pre).strip("\n")
+                self._pre = None
+                self._blocks.append(f"```\n{code}\n```")
+                if self._item is not None:
+                    self._item_lines.append(f"```\n{code}\n```")
+            return
+        if tag in EMPHASIS:
+            marker = EMPHASIS[tag]
+            if tag == "code":
+                self._code = max(self._code - 1, 0)
+            if self._inline and self._inline[-1] == marker:
+                # Drop emphasis that wrapped nothing
+                self._inline.pop()
+            else:
+                self._inline.append(marker)
+        elif tag == "a":
+            if not self._anchors:
+                return
+            start, href = self._anchors.pop()
+            text = "".join(self._inline[start:]).strip()
+            if href and text:
+                self._inline[start:] = [f"[{text}]({href})"]
+                self._links.append(href)
+                if self._item is not None:
+                    self._item["links"].append(href)
+        elif tag == "li":
+            if len(self._lists) == 1:
+                self._end_item()
+            else:
+                self._flush_line()
+        elif tag in ("ul", "ol"):
+            if len(self._lists) == 1:
+                self._end_item()
+            self._flush_line()
+            if self._lists:
+                self._lists.pop()
+            if not self._lists:
+                self._end_block()
+        elif tag in HEADING_LEVELS and self._heading_tag == tag:
+            self._heading_tag = None
+            text = "".join(self._inline).strip()
+            self._inline = []
+            if text:
+                self._heading = text
+                self._blocks.append("#" * self._level + " " + text)
+        elif tag == "blockquote":
+            self._end_block()
+            self._quote = max(self._quote - 1, 0)
+        elif tag == "tr":
+            self._flush_line()
+        elif tag in BLOCK_TAGS:
+            if self._lists:
+                self._flush_line()
+            else:
+                self._end_block()
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+        if self._pre is not None:
+            self._pre.append(data)
+            return
+        text = WHITESPACE_RE.sub(" ", data)
+        if text == " " and (not self._inline or self._inline[-1].endswith(" ")):
+            return
+        self._inline.append(text if self._code else ESCAPE_RE.sub(r"\\\1", text))
+
+    def close(self) -> None:
+        super().close()
+        if self._pre is not None:
+            self.handle_endtag("pre")
+        while self._lists:
+            self.handle_endtag("ul")
+        self._close_section()
+
+    def pop_ready(self) -> List[Dict[str, Any]]:
+        """Return and forget the sections finished so far."""
+        ready, self.ready = self.ready, []
+        return ready
+
+
+def stream_sections(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield section records as soon as the HTML fed in so far completes them."""
+    parser = SectionParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_ready()
+    parser.close()
+    yield from parser.pop_ready()
+
+
+def convert_html_to_sections(html_content: str) -> List[Dict[str, Any]]:
+    """Convert an HTML document into section records."""
+    return list(stream_sections(
+        html_content[start:start + CHUNK_CHARS] for start in range(0, len(html_content), CHUNK_CHARS)
+    ))
+
+
+def sections_markdown(sections: List[Dict[str, Any]]) -> str:
+    """Join section records into the issue's Markdown."""
+    return "\n\n".join(section["markdown"] for section in sections)
+
+
+def sections_path(markdown_file: str) -> str:
+    """Return the section records file for a Markdown file (foo.md -> foo_sections.json)."""
+    return os.path.splitext(markdown_file)[0] + "_sections.json"
+
+
+def write_sections(markdown_file: str, sections: List[Dict[str, Any]], markdown_content: str) -> bool:
+    """Save section records next to the Markdown they were joined into."""
+    data = {
+        "version": SECTIONS_VERSION,
+        "source_hash": content_hash(markdown_content),
+        "sections": sections,
+    }
+    return write_if_changed(sections_path(markdown_file), json.dumps(data, ensure_ascii=False, indent=1) + "\n")
+
+
+def load_sections(markdown_file: str, markdown_content: str) -> Optional[List[Dict[str, Any]]]:
+    """Return the saved section records if they were produced for exactly this Markdown."""
+    try:
+        with open(sections_path(markdown_file), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if data.get("version") != SECTIONS_VERSION or data.get("source_hash") != content_hash(markdown_content):
+        return None
+    return data["sections"]
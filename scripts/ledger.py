@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Processing ledger for newsletter issues.
+Tracks each issue's per-stage status, timings, token counts and content
+hashes in an append-only JSONL file with an in-memory index.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Union
+
+DEFAULT_LEDGER_PATH = "ledger.jsonl"
+
+# Pipeline stages in the order they run
+STAGES = ("fetch", "convert", "translate", "publish", "tweet")
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Files that tracked processed GUIDs before the ledger existed
+LEGACY_GUID_FILES = ("latest.txt", "processed_guids.txt")
+
+DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    """Return a short SHA-256 digest of text or bytes."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def file_hash(path: str) -> Optional[str]:
+    """Return the content hash of a file, or None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+
+class Ledger:
+    """Append-only JSONL ledger with O(1) lookups by GUID and by issue date.
+
+    Every update is one JSON line written with a single append and fsync, so
+    a crash can at worst leave a torn last line, which loading skips.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._issues: Dict[str, Dict[str, Any]] = {}
+        self._by_date: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._apply(event)
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        guid = event["guid"]
+        issue = self._issues.setdefault(guid, {"guid": guid, "stages": {}})
+        for key in ("date", "title"):
+            if event.get(key):
+                issue[key] = event[key]
+        if issue.get("date"):
+            self._by_date[issue["date"]] = guid
+
+        stage = event.get("stage")
+        if stage:
+            fields = {
+                key: value for key, value in event.items()
+                if key not in ("guid", "stage", "date", "title")
+            }
+            issue["stages"][stage] = fields
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        line = (json.dumps(event, ensure_ascii=False, sort_keys=True) + "\n").encode("utf-8")
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._apply(event)
+
+    def get(self, guid: str) -> Optional[Dict[str, Any]]:
+        """Return the issue record for a GUID."""
+        return self._issues.get(guid)
+
+    def guid_for_date(self, date: str) -> Optional[str]:
+        """Return the GUID of the issue published on a YYYY-MM-DD date."""
+        return self._by_date.get(date)
+
+    def guids(self) -> Set[str]:
+        """Return every GUID the ledger knows about."""
+        return set(self._issues)
+
+    def stage(self, guid: str, stage: str) -> Dict[str, Any]:
+        """Return the latest record for one stage of an issue (empty if none)."""
+        issue = self._issues.get(guid)
+        return issue["stages"].get(stage, {}) if issue else {}
+
+    def is_done(self, guid: str, stage: str, input_hash: Optional[str] = None) -> bool:
+        """Check whether a stage completed, optionally for the same input."""
+        record = self.stage(guid, stage)
+        if record.get("status") != STATUS_DONE:
+            return False
+        return input_hash is None or record.get("input_hash") == input_hash
+
+    def record(self, guid: str, stage: Optional[str] = None, **fields: Any) -> None:
+        """Append an event for an issue (and optionally one of its stages)."""
+        event = {"guid": guid, "at": datetime.now().isoformat(), **fields}
+        if stage:
+            event["stage"] = stage
+        self._append(event)
+
+    @contextmanager
+    def track(self, guid: str, stage: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Record a stage as running, then done with its duration or failed.
+
+        The yielded dict can be filled with extra fields (output hash, token
+        counts) to store with the completion record.
+        """
+        extra: Dict[str, Any] = {}
+        self.record(guid, stage, status=STATUS_RUNNING, **fields)
+        started = time.monotonic()
+        try:
+            yield extra
+        except BaseException as e:
+            # sys.exit(0) is a normal early return, not a failure
+            if isinstance(e, SystemExit) and not e.code:
+                raise
+            self.record(
+                guid, stage, status=STATUS_FAILED, error=repr(e),
+                duration=round(time.monotonic() - started, 3), **fields,
+            )
+            raise
+        self.record(
+            guid, stage, status=STATUS_DONE,
+            duration=round(time.monotonic() - started, 3), **{**fields, **extra},
+        )
+
+    def import_legacy(self) -> int:
+        """Seed the ledger from latest.txt / processed_guids.txt; return GUIDs added."""
+        added = 0
+        for legacy_path in LEGACY_GUID_FILES:
+            try:
+                with open(legacy_path, "r") as f:
+                    guids = [line.strip() for line in f if line.strip()]
+            except FileNotFoundError:
+                continue
+            for guid in guids:
+                if guid in self._issues:
+                    continue
+                for stage in STAGES:
+                    self.record(guid, stage, status=STATUS_DONE, migrated=True)
+                added += 1
+        return added
+
+    def compact(self) -> None:
+        """Rewrite the file with one line per stage, replacing it atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for guid, issue in self._issues.items():
+                    header = {"guid": guid}
+                    for key in ("date", "title"):
+                        if issue.get(key):
+                            header[key] = issue[key]
+                    f.write(json.dumps(header, ensure_ascii=False, sort_keys=True) + "\n")
+                    for stage, fields in issue["stages"].items():
+                        event = {"guid": guid, "stage": stage, **fields}
+                        f.write(json.dumps(event, ensure_ascii=False, sort_keys=True) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+def guid_for_file(ledger: Ledger, path: str) -> Optional[str]:
+    """Find the GUID of the issue a dated pipeline file belongs to.
+
+    Looks up the date in the file name, falling back to the GUID stored in
+    the matching output/<date>_meta.json.
+    """
+    match = DATE_RE.search(os.path.basename(path))
+    if not match:
+        return None
+    date = match.group(1)
+
+    guid = ledger.guid_for_date(date)
+    if guid:
+        return guid
+
+    meta_path = os.path.join(os.path.dirname(path) or ".", f"{date}_meta.json")
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("guid") or None
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def open_ledger() -> Ledger:
+    """Open the ledger at LEDGER_PATH (default ledger.jsonl)."""
+    return Ledger(os.environ.get("LEDGER_PATH", DEFAULT_LEDGER_PATH))
+
+
+def stage_is_current(
+    ledger: Ledger,
+    guid: str,
+    stage: str,
+    input_hash: Optional[str] = None,
+    output_path: Optional[str] = None,
+) -> bool:
+    """Check whether a stage completed for this input and its output file is unchanged."""
+    if not ledger.is_done(guid, stage, input_hash):
+        return False
+    recorded = ledger.stage(guid, stage).get("output_hash")
+    return output_path is None or bool(recorded and file_hash(output_path) == recorded)
+
+
+def run_stage(
+    ledger: Ledger,
+    guid: Optional[str],
+    stage: str,
+    work: Callable[[Dict[str, Any]], None],
+    input_hash: Optional[str] = None,
+    output_path: Optional[str] = None,
+) -> bool:
+    """Run a stage unless the ledger shows it already completed.
+
+    A stage is skipped when it is done for the same input hash and its output
+    file still has the recorded hash (or, without an output file, when it is
+    simply done). work receives a dict for extra fields such as token counts.
+    Returns True if the stage ran.
+    """
+    if guid is None:
+        work({})
+        return True
+
+    if stage_is_current(ledger, guid, stage, input_hash, output_path):
+        print(f"Skipping {stage}: already completed for this input", file=sys.stderr)
+        return False
+
+    with ledger.track(guid, stage, input_hash=input_hash) as extra:
+        work(extra)
+        if output_path is not None:
+            extra["output_hash"] = file_hash(output_path)
+    return True
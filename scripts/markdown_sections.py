@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Markdown splitting helpers shared by translate.py and prune.py.
+Pure text functions with no third-party dependencies, so pruning does not
+load the translation client to split sections and estimate tokens.
+"""
+
+import re
+from typing import List
+
+HEADING_RE = re.compile(r'^\s{0,3}(#{1,6}|＃)\s')
+RECAP_RE = re.compile(r'^\s*(\*\*)?AI (Twitter|Reddit|Discord) Recap', re.IGNORECASE)
+RULE_RE = re.compile(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$')
+FENCE_RE = re.compile(r'^\s{0,3}(```|~~~)')
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of text without a tokenizer.
+
+    ASCII text averages about four characters per token, while Japanese and
+    other non-ASCII characters are closer to one token each.
+    """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def is_section_boundary(line: str) -> bool:
+    """Check whether a line starts a new section (heading, recap or rule)."""
+    return bool(HEADING_RE.match(line) or RECAP_RE.match(line) or RULE_RE.match(line))
+
+
+def split_sections(content: str) -> List[str]:
+    """Split markdown at heading and recap boundaries, never inside code fences."""
+    sections = []
+    current: List[str] = []
+    in_fence = False
+    
+    for line in content.split('\n'):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and current and is_section_boundary(line):
+            sections.append('\n'.join(current))
+            current = []
+        current.append(line)
+    
+    if current:
+        sections.append('\n'.join(current))
+    
+    return [section.strip('\n') for section in sections if section.strip()]
+
+
+def split_blocks(section: str) -> List[str]:
+    """Split a section into blank-line separated blocks, keeping code fences whole."""
+    blocks = []
+    current: List[str] = []
+    in_fence = False
+    
+    for line in section.split('\n'):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        if not line.strip() and not in_fence:
+            if current:
+                blocks.append('\n'.join(current))
+                current = []
+            continue
+        current.append(line)
+    
+    if current:
+        blocks.append('\n'.join(current))
+    
+    return blocks
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Placeholder masking for translation requests.
+Swaps URLs, code and social handles for short placeholders before a chunk is
+sent to the model, then restores them and checks that none were lost.
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Match
+
+PLACEHOLDER_RE = re.compile(r'\{\{([CUH])(\d+)\}\}')
+
+FENCED_CODE_RE = re.compile(r'^( {0,3})(```|~~~)[^\n]*\n.*?^\1\2[ \t]*$', re.MULTILINE | re.DOTALL)
+INLINE_CODE_RE = re.compile(r'(`+)(?!`)(.+?)(?<!`)\1(?!`)')
+URL_RE = re.compile(r'https?://[^\s<>()\[\]"\']+(?:\([^\s<>()]*\)[^\s<>()\[\]"\']*)*')
+HANDLE_RE = re.compile(r'(?<![\w@/.])@[A-Za-z0-9_]{1,30}\b(?!\.\w)')
+
+# Trailing punctuation usually belongs to the sentence, not the URL
+URL_TRAILING = '.,;:!?'
+
+MASK_PROMPT = """
+
+プレースホルダー：
+- `{{U1}}`、`{{C1}}`、`{{H1}}` のような二重波括弧の記号はURL・コード・アカウント名の置き換えです。翻訳や変更をせず、そのまま出力してください"""
+
+
+class MaskStats:
+    """Masked request counts and the characters masking kept out of requests in this run."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.placeholders = 0
+        self.saved_chars = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def add(self, mask: "Mask") -> None:
+        """Count one masked request body."""
+        with self._lock:
+            self.requests += 1
+            self.placeholders += sum(mask.counts.values())
+            self.saved_chars += mask.saved_chars()
+
+    def fallback(self) -> None:
+        """Count a chunk retranslated unmasked because placeholders were lost."""
+        with self._lock:
+            self.fallbacks += 1
+
+    def summary(self) -> str:
+        """Format the counters as a one-line report."""
+        return (
+            f"Masking: {self.requests} requests masked, {self.placeholders} placeholders, "
+            f"{self.saved_chars} characters (~{self.saved_chars // 4} tokens) kept out of requests, "
+            f"{self.fallbacks} retranslated unmasked"
+        )
+
+
+class Mask:
+    """Placeholder table for one request body."""
+
+    def __init__(self) -> None:
+        self.values: Dict[str, str] = {}
+        self._by_value: Dict[str, str] = {}
+        self.counts: Counter = Counter()
+
+    def _placeholder(self, kind: str, value: str) -> str:
+        key = f"{kind}\0{value}"
+        if key not in self._by_value:
+            placeholder = f"{{{{{kind}{len(self.values) + 1}}}}}"
+            self._by_value[key] = placeholder
+            self.values[placeholder] = value
+        placeholder = self._by_value[key]
+        self.counts[placeholder] += 1
+        return placeholder
+
+    def apply(self, text: str) -> str:
+        """Return text with code, URLs and handles replaced by placeholders.
+
+        Text that already contains placeholder-like tokens is left untouched
+        so restoring can never confuse the two.
+        """
+        if PLACEHOLDER_RE.search(text):
+            return text
+
+        text = FENCED_CODE_RE.sub(lambda m: self._placeholder("C", m.group(0)), text)
+        text = INLINE_CODE_RE.sub(lambda m: self._placeholder("C", m.group(0)), text)
+        text = URL_RE.sub(self._mask_url, text)
+        text = HANDLE_RE.sub(lambda m: self._placeholder("H", m.group(0)), text)
+        return text
+
+    def _mask_url(self, match: Match[str]) -> str:
+        url = match.group(0)
+        stripped = url.rstrip(URL_TRAILING)
+        return self._placeholder("U", stripped) + url[len(stripped):]
+
+    def verify(self, translated: str) -> List[str]:
+        """List placeholders that went missing or were invented in translated text."""
+        found = Counter(match.group(0) for match in PLACEHOLDER_RE.finditer(translated))
+        problems = []
+        for placeholder, count in self.counts.items():
+            if found[placeholder] < count:
+                problems.append(f"missing {placeholder}")
+        for placeholder in found:
+            if placeholder not in self.values:
+                problems.append(f"unknown {placeholder}")
+        return problems
+
+    def restore(self, translated: str) -> str:
+        """Put the original URLs, code and handles back."""
+        return PLACEHOLDER_RE.sub(
+            lambda m: self.values.get(m.group(0), m.group(0)), translated
+        )
+
+    def saved_chars(self) -> int:
+        """Characters removed from the request body by masking."""
+        return sum(
+            (len(value) - len(placeholder)) * self.counts[placeholder]
+            for placeholder, value in self.values.items()
+        )
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Single-process pipeline orchestrator.
+Runs fetch, convert, prune, translate, publish, compress, summarize and tweet in one
+interpreter, passing the issue between stages in memory and timing each stage.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from document import Document, load_document
+from ledger import Ledger, open_ledger
+
+STAGES = ("fetch", "convert", "prune", "translate", "publish", "compress", "summarize", "tweet")
+
+OUTPUT_DIR = "output"
+
+
+class NoNewContent(Exception):
+    """Raised by the fetch stage when there is nothing new to process."""
+
+
+class Issue:
+    """One newsletter issue as it moves through the pipeline.
+
+    Contents produced by an earlier stage in the same run are kept in memory;
+    when the run starts later in the pipeline they are read from the output
+    files on first use.
+    """
+
+    def __init__(self, date: str, guid: Optional[str] = None, title: Optional[str] = None) -> None:
+        self.date = date
+        self.guid = guid
+        self.title = title
+        self._contents: Dict[str, str] = {}
+        self._document: Optional[Document] = None
+
+    def path(self, kind: str) -> str:
+        """Return the output file of one kind: html, md, pruned, prune, ja, document, meta, qc or summary."""
+        suffixes = {
+            "html": "_issue.html",
+            "md": "_issue.md",
+            "pruned": "_issue_pruned.md",
+            "prune": "_prune.json",
+            "ja": "_issue_ja.md",
+            "document": "_issue_ja.json",
+            "meta": "_meta.json",
+            "qc": "_qc.json",
+            "summary": "_summary.txt",
+        }
+        return os.path.join(OUTPUT_DIR, f"{self.date}{suffixes[kind]}")
+
+    def content(self, kind: str) -> str:
+        """Return a stage's output, reading it from disk if this run did not produce it."""
+        if kind not in self._contents:
+            try:
+                with open(self.path(kind), "r", encoding="utf-8") as f:
+                    self._contents[kind] = f.read()
+            except FileNotFoundError:
+                print(f"Error: {self.path(kind)} not found; run the earlier stages first")
+                sys.exit(1)
+        return self._contents[kind]
+
+    def set_content(self, kind: str, content: str) -> None:
+        """Keep a stage's output in memory for later stages."""
+        self._contents[kind] = content
+        if kind == "ja":
+            self._document = None
+
+    def document(self) -> Document:
+        """Return the parsed translation, from its sidecar when that is current."""
+        if self._document is None:
+            self._document = load_document(self.path("ja"), self.content("ja"))
+        return self._document
+
+    @classmethod
+    def from_output(cls, date: Optional[str] = None) -> "Issue":
+        """Load an issue saved by an earlier fetch (the newest one if no date is given)."""
+        if date is None:
+            metas = sorted(glob.glob(os.path.join(OUTPUT_DIR, "*_meta.json")))
+            if not metas:
+                print(f"Error: No fetched issue found in {OUTPUT_DIR}/")
+                sys.exit(1)
+            date = os.path.basename(metas[-1])[:-len("_meta.json")]
+
+        issue = cls(date)
+        try:
+            with open(issue.path("meta"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            issue.guid = meta.get("guid")
+            issue.title = meta.get("title")
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return issue
+
+
+class PipelineRun:
+    """Settings and shared state for one orchestrated run."""
+
+    def __init__(self, args: argparse.Namespace, ledger: Ledger) -> None:
+        self.args = args
+        self.ledger = ledger
+        self.issue: Optional[Issue] = None
+        self.timings: List[Tuple[str, float]] = []
+        # Feed validators, saved only once the fetched issue is published
+        self.feed_state: Dict[str, str] = {}
+
+
+def run_fetch(run: PipelineRun) -> None:
+    """Save the newest feed entry, or stop the run if it is already published."""
+    import fetch
+
+    feed_url = os.environ.get("FEED_URL")
+    if not feed_url:
+        print("Error: FEED_URL environment variable is required")
+        sys.exit(1)
+
+    downloaded = fetch.fetch_feed(feed_url)
+    if downloaded is None:
+        print("Feed not modified since last fetch (304).")
+        raise NoNewContent()
+    feed, run.feed_state = downloaded
+
+    fetched = fetch.fetch_latest_issue(feed, run.ledger)
+    if fetched is None:
+        fetch.save_feed_state(run.feed_state)
+        raise NoNewContent()
+
+    entry = fetched["entry"]
+    run.issue = Issue(fetched["date"], entry["guid"], entry["title"])
+    run.issue.set_content("html", fetched["html"])
+    print(f"Fetched: {entry['title']} ({entry['guid']})")
+
+
+def run_convert(run: PipelineRun) -> None:
+    """Convert the fetched HTML to Markdown."""
+    from convert import convert_file
+
+    issue = run.issue
+    markdown = convert_file(
+        issue.path("html"), issue.path("md"), run.ledger, html_content=issue.content("html")
+    )
+    issue.set_content("md", markdown)
+
+
+def run_prune(run: PipelineRun) -> None:
+    """Drop duplicate bullets and repeated link lists before translation (with --prune)."""
+    if not run.args.prune:
+        print("Skipping prune (enable with --prune or PRUNE=1)", file=sys.stderr)
+        return
+    from prune import prune_file
+
+    issue = run.issue
+    pruned = prune_file(
+        issue.path("md"), issue.path("pruned"), run.ledger,
+        content=issue.content("md"), report_path=issue.path("prune"),
+    )
+    issue.set_content("pruned", pruned)
+
+
+def plan_translate(run: PipelineRun, source: str, cache: Any) -> Tuple[int, int]:
+    """Pick chunk size and concurrency with the token budget planner (with --auto-plan).
+
+    Values given explicitly with --chunk-tokens or --concurrency are kept,
+    and the report estimates the run with them.
+    """
+    import token_budget
+    from html_sections import load_sections
+    from translate import load_translation_prompt
+
+    args = run.args
+    issue = run.issue
+    content = issue.content(source)
+    records = load_sections(issue.path(source), content)
+    system_prompt = load_translation_prompt()
+    counter = token_budget.TokenCounter()
+    limits = token_budget.Limits()
+    plans = token_budget.plan_translation(
+        content, system_prompt, counter, limits,
+        [record["markdown"] for record in records] if records else None,
+        token_budget.cache_lookup(cache, system_prompt) if cache is not None else None,
+        (args.chunk_tokens,) if args.chunk_tokens else token_budget.CHUNK_OPTIONS,
+        args.concurrency,
+    )
+    print(token_budget.format_report(plans, content, counter, limits), file=sys.stderr)
+    chosen = plans[0]
+    return chosen.chunk_tokens, args.concurrency or chosen.concurrency
+
+
+def run_translate(run: PipelineRun) -> None:
+    """Translate the Markdown with streaming output and optional quality checks."""
+    import translate
+
+    args = run.args
+    issue = run.issue
+    source = "pruned" if args.prune else "md"
+    chunk_tokens = args.chunk_tokens or translate.DEFAULT_CHUNK_TOKENS
+    concurrency = args.concurrency or translate.DEFAULT_CONCURRENCY
+    qc_threshold = args.qc_threshold or translate.QUALITY_THRESHOLD
+    client = translate.create_azure_client()
+    cache = None if args.no_cache else translate.open_cache_from_env(translate.estimate_tokens)
+    if args.auto_plan:
+        chunk_tokens, concurrency = plan_translate(run, source, cache)
+    translate.shared_limiter().set_concurrency(concurrency)
+    quality_gate = None
+    if args.qc:
+        quality_gate = translate.QualityGate(client, concurrency, qc_threshold)
+    try:
+        translate.translate_file(
+            client, issue.path(source), issue.path("ja"), translate.load_translation_prompt(),
+            stream=True,
+            max_tokens=chunk_tokens,
+            concurrency=concurrency,
+            cache=cache,
+            quality_gate=quality_gate,
+            qc_threshold=qc_threshold,
+            qc_report=issue.path("qc") if args.qc else None,
+            ledger=run.ledger,
+            content=issue.content(source),
+        )
+        # Parse the translation once; later stages and the workflow read the sidecar
+        document = issue.document()
+        print(f"Parsed {issue.path('ja')}: {document.title} ({len(document.sections)} sections)", file=sys.stderr)
+    finally:
+        if cache is not None:
+            print(cache.stats.summary(), file=sys.stderr)
+            cache.close()
+
+
+def run_publish(run: PipelineRun) -> None:
+    """Render the translation to GitHub Pages."""
+    from publish import publish_newsletter
+
+    issue = run.issue
+    publish_newsletter(issue.path("ja"), run.ledger, markdown_content=issue.content("ja"))
+
+
+def run_compress(run: PipelineRun) -> None:
+    """Write .gz/.br siblings for site files the publish stage changed (with --compress)."""
+    if not run.args.compress:
+        print("Skipping compress (enable with --compress or COMPRESS=1)", file=sys.stderr)
+        return
+    from compress import compress_site
+
+    print(compress_site().summary())
+
+
+def run_summarize(run: PipelineRun) -> None:
+    """Write the Discord summary block next to the other outputs."""
+    from summarize import format_summary
+
+    issue = run.issue
+    summary = format_summary(issue.document())
+    with open(issue.path("summary"), "w", encoding="utf-8") as f:
+        f.write(summary + "\n")
+    issue.set_content("summary", summary)
+
+
+def run_tweet(run: PipelineRun) -> None:
+    """Post the issue's tweet."""
+    from tweet import tweet_issue
+
+    issue = run.issue
+    if not tweet_issue(issue.document(), issue.date, issue.guid, run.ledger):
+        sys.exit(1)
+
+
+STAGE_RUNNERS: Dict[str, Callable[[PipelineRun], None]] = {
+    "fetch": run_fetch,
+    "convert": run_convert,
+    "prune": run_prune,
+    "translate": run_translate,
+    "publish": run_publish,
+    "compress": run_compress,
+    "summarize": run_summarize,
+    "tweet": run_tweet,
+}
+
+
+def format_timings(timings: List[Tuple[str, float]]) -> str:
+    """Format per-stage durations as a small table."""
+    lines = ["Stage timings:"]
+    for stage, duration in timings:
+        lines.append(f"  {stage:<10} {duration:8.2f}s")
+    lines.append(f"  {'total':<10} {sum(duration for _, duration in timings):8.2f}s")
+    return '\n'.join(lines)
+
+
+def run_pipeline(run: PipelineRun, stages: List[str]) -> bool:
+    """Run the given stages in order; return False if fetch found nothing new."""
+    if stages[0] != "fetch":
+        run.issue = Issue.from_output(run.args.date)
+        print(f"Resuming {run.issue.date} from {stages[0]}")
+
+    try:
+        for stage in stages:
+            print(f"==> {stage}", file=sys.stderr)
+            started = time.monotonic()
+            try:
+                STAGE_RUNNERS[stage](run)
+            finally:
+                run.timings.append((stage, time.monotonic() - started))
+    except NoNewContent:
+        return False
+    finally:
+        print(format_timings(run.timings), file=sys.stderr)
+    return True
+
+
+def env_int(name: str) -> Optional[int]:
+    """Read an optional integer from the environment."""
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run the newsletter pipeline in a single process",
+        epilog="Example: python pipeline.py --to-stage summarize --qc",
+    )
+    parser.add_argument(
+        "--from-stage", choices=STAGES, default=STAGES[0],
+        help="First stage to run (default: fetch)",
+    )
+    parser.add_argument(
+        "--to-stage", choices=STAGES, default=STAGES[-1],
+        help="Last stage to run (default: tweet)",
+    )
+    parser.add_argument(
+        "--date",
+        help="Issue date (YYYY-MM-DD) to resume when not starting at fetch (default: newest in output/)",
+    )
+    # Translation defaults live in translate.py, which is only imported if needed
+    parser.add_argument(
+        "--concurrency", type=int, default=env_int("TRANSLATE_CONCURRENCY"),
+        help="Translation requests in flight at the start; the rate limiter adapts it (default: translate.py's)",
+    )
+    parser.add_argument(
+        "--chunk-tokens", type=int, default=env_int("TRANSLATE_CHUNK_TOKENS"),
+        help="Approximate maximum input tokens per translation chunk (default: translate.py's)",
+    )
+    parser.add_argument(
+        "--qc", action="store_true",
+        help="Score translated chunks and fail below --qc-threshold",
+    )
+    parser.add_argument(
+        "--qc-threshold", type=float,
+        help="Minimum chunk quality score (default: translate.py's)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the translation memory",
+    )
+    parser.add_argument(
+        "--prune", action="store_true", default=os.environ.get("PRUNE", "0") not in ("", "0", "false", "no"),
+        help="Drop near-duplicate bullets and repeated link lists before translating",
+    )
+    parser.add_argument(
+        "--compress", action="store_true", default=os.environ.get("COMPRESS", "0") not in ("", "0", "false", "no"),
+        help="Write .gz/.br siblings of changed site files, for hosts that serve precompressed files",
+    )
+    parser.add_argument(
+        "--auto-plan", action="store_true",
+        default=os.environ.get("TRANSLATE_AUTO_PLAN", "0") not in ("", "0", "false", "no"),
+        help="Choose chunk size and concurrency from token, cost and rate-limit estimates",
+    )
+    args = parser.parse_args()
+    if STAGES.index(args.from_stage) > STAGES.index(args.to_stage):
+        parser.error("--from-stage must not come after --to-stage")
+    return args
+
+
+def main() -> None:
+    """Main function to run the pipeline stages."""
+    args = parse_args()
+
+    ledger = open_ledger()
+    if not ledger.guids():
+        # First run after latest.txt was retired: carry its GUID over
+        ledger.import_legacy()
+
+    stages = list(STAGES[STAGES.index(args.from_stage):STAGES.index(args.to_stage) + 1])
+    run = PipelineRun(args, ledger)
+    has_new_content = run_pipeline(run, stages)
+    if run.feed_state and run.issue is not None and ledger.is_done(run.issue.guid, "publish"):
+        from fetch import save_feed_state
+
+        save_feed_state(run.feed_state)
+    # One line per stage keeps the committed ledger from growing with every run
+    ledger.compact()
+
+    if stages[0] == "fetch":
+        if not has_new_content:
+            print("No new entries found. Skipping...")
+        print(f"::set-output name=has_new_content::{str(has_new_content).lower()}")
+
+
+if __name__ == "__main__":
+    main()
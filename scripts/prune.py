@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Pre-translation pruning of redundant newsletter content.
+Drops near-duplicate bullets (word shingles, MinHash candidates confirmed by
+exact Jaccard similarity) and link lists whose links were all cited earlier,
+then caps each section's estimated token count. Every dropped piece is
+recorded, so the report shows exactly what was not translated.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from html_sections import load_sections, write_sections
+from ledger import Ledger, content_hash, guid_for_file, open_ledger, run_stage
+from markdown_sections import FENCE_RE, estimate_tokens, is_section_boundary, split_blocks, split_sections
+
+# Bullets at least this similar (Jaccard over word shingles) to an earlier one are dropped
+DEFAULT_SIMILARITY = float(os.environ.get("PRUNE_SIMILARITY", "0.8"))
+
+# Estimated tokens kept per section; 0 disables the cap
+DEFAULT_SECTION_TOKENS = int(os.environ.get("PRUNE_SECTION_TOKENS", "6000"))
+
+# Words per shingle, and the fewest words a bullet needs to be compared at all
+SHINGLE_WORDS = 3
+MIN_WORDS = 6
+
+# 32 MinHash values in 8 bands of 4: pairs above ~0.6 similarity become candidates.
+# Each shingle's 64-byte digest is read as 32 independent 16-bit hashes.
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+HASH_FORMAT = f"<{NUM_HASHES}H"
+
+LIST_ITEM_RE = re.compile(r'^(\s*)([*+-]|\d+[.)])\s')
+LINK_RE = re.compile(r'!?\[([^\]]*)\]\(([^)\s]+)[^)]*\)')
+BARE_URL_RE = re.compile(r'https?://[^\s)>\]]+')
+WORD_RE = re.compile(r'\w+')
+
+# A line with at most this many words outside its links counts as part of a link list
+LINK_LINE_WORDS = 3
+
+
+def prune_enabled() -> bool:
+    """Whether the pipeline and backfill prune before translating (PRUNE=1)."""
+    return os.environ.get("PRUNE", "0") not in ("", "0", "false", "no")
+
+
+def split_items(block: str) -> List[str]:
+    """Split a list block into its top-level items (marker line plus continuation lines)."""
+    indents = [len(match.group(1)) for match in map(LIST_ITEM_RE.match, block.split("\n")) if match]
+    top = min(indents)
+    items: List[str] = []
+    for line in block.split("\n"):
+        match = LIST_ITEM_RE.match(line)
+        if (match and len(match.group(1)) == top) or not items:
+            items.append(line)
+        else:
+            items[-1] += "\n" + line
+    return items
+
+
+def link_urls(text: str) -> List[str]:
+    """Return the URLs a piece of Markdown links to, in order."""
+    urls = [match.group(2) for match in LINK_RE.finditer(text)]
+    return urls + BARE_URL_RE.findall(LINK_RE.sub(" ", text))
+
+
+def words(text: str) -> List[str]:
+    """Lowercase words of the text with link targets removed."""
+    return WORD_RE.findall(BARE_URL_RE.sub(" ", LINK_RE.sub(r"\1", text)).lower())
+
+
+def is_link_list(text: str) -> bool:
+    """Check whether every line of the text is essentially just links."""
+    lines = [line for line in text.split("\n") if line.strip()]
+    return bool(lines) and all(
+        link_urls(line) and len(WORD_RE.findall(BARE_URL_RE.sub(" ", LINK_RE.sub(" ", line)))) <= LINK_LINE_WORDS
+        for line in lines
+    )
+
+
+def shingles(tokens: List[str]) -> Set[bytes]:
+    """Hash every run of SHINGLE_WORDS consecutive words."""
+    return {
+        hashlib.blake2b(" ".join(tokens[i:i + SHINGLE_WORDS]).encode("utf-8"), digest_size=2 * NUM_HASHES).digest()
+        for i in range(len(tokens) - SHINGLE_WORDS + 1)
+    }
+
+
+def minhash(values: Set[bytes]) -> List[int]:
+    """MinHash signature of a shingle set: the minimum of each hash over all shingles."""
+    return list(map(min, zip(*(struct.unpack(HASH_FORMAT, value) for value in values))))
+
+
+def jaccard(first: Set[bytes], second: Set[bytes]) -> float:
+    return len(first & second) / len(first | second)
+
+
+class Unit:
+    """One droppable piece of a section: a top-level bullet or a whole block."""
+
+    def __init__(self, section: int, text: str, is_item: bool) -> None:
+        self.section = section
+        self.text = text
+        self.is_item = is_item
+        self.dropped: Optional[Dict[str, Any]] = None
+
+
+class Pruner:
+    """Finds near-duplicate bullets across the whole issue using MinHash banding."""
+
+    def __init__(self, similarity: float = DEFAULT_SIMILARITY) -> None:
+        self.similarity = similarity
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self.kept: List[Tuple[Unit, Set[bytes]]] = []
+        self.seen_urls: Set[str] = set()
+
+    def duplicate_of(self, values: Set[bytes]) -> Tuple[Optional[Unit], float]:
+        """Return the most similar earlier bullet at or above the threshold."""
+        signature = minhash(values)
+        candidates: Set[int] = set()
+        keys = [(band, tuple(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+        for key in keys:
+            candidates.update(self.buckets.get(key, ()))
+        best: Tuple[Optional[Unit], float] = (None, 0.0)
+        for index in sorted(candidates):
+            unit, other = self.kept[index]
+            score = jaccard(values, other)
+            if score >= self.similarity and score > best[1]:
+                best = (unit, score)
+        if best[0] is None:
+            for key in keys:
+                self.buckets.setdefault(key, []).append(len(self.kept))
+        return best
+
+    def check(self, unit: Unit, section_urls: Set[str]) -> None:
+        """Mark a unit as dropped if it repeats earlier content; remember it otherwise.
+
+        section_urls holds the links of the units kept so far in the current
+        section; links only count as seen issue-wide once commit_links runs.
+        """
+        urls = link_urls(unit.text)
+        if urls and is_link_list(unit.text) and all(url in self.seen_urls or url in section_urls for url in urls):
+            unit.dropped = {"reason": "repeated_links"}
+            return
+
+        tokens = words(unit.text)
+        if not unit.is_item or len(tokens) < MIN_WORDS:
+            return
+        values = shingles(tokens)
+        original, score = self.duplicate_of(values)
+        if original is not None:
+            unit.dropped = {
+                "reason": "near_duplicate",
+                "similarity": round(score, 3),
+                "duplicate_of": {"section": original.section, "text": original.text[:120]},
+            }
+            return
+        self.kept.append((unit, values))
+
+    def commit_links(self, units: List[Unit]) -> None:
+        """Record the links of a section's finally kept units, in document order.
+
+        A link list dropped as repeated is restored when the units that cited
+        its links were dropped after all (as duplicates or by the section cap),
+        so no source disappears from the issue.
+        """
+        for unit in units:
+            urls = link_urls(unit.text)
+            if unit.dropped is not None and unit.dropped["reason"] == "repeated_links" and not set(urls) <= self.seen_urls:
+                unit.dropped = None
+            if unit.dropped is None:
+                self.seen_urls.update(urls)
+
+
+def section_units(index: int, section: str) -> Tuple[List[List[Unit]], List[bool]]:
+    """Split a section into blocks of units; returns the blocks and which may be dropped."""
+    blocks: List[List[Unit]] = []
+    droppable: List[bool] = []
+    for number, block in enumerate(split_blocks(section)):
+        first = block.split("\n", 1)[0]
+        if LIST_ITEM_RE.match(first):
+            blocks.append([Unit(index, item, True) for item in split_items(block)])
+            droppable.append(True)
+        else:
+            blocks.append([Unit(index, block, False)])
+            # Headings, rules and code are structure, never pruned
+            droppable.append(not (number == 0 or is_section_boundary(first) or FENCE_RE.match(first)))
+    return blocks, droppable
+
+
+def join_blocks(blocks: List[List[Unit]]) -> str:
+    kept = ["\n".join(unit.text for unit in units if unit.dropped is None) for units in blocks]
+    return "\n\n".join(block for block in kept if block)
+
+
+def prune_sections(
+    sections: List[str],
+    similarity: float = DEFAULT_SIMILARITY,
+    section_tokens: int = DEFAULT_SECTION_TOKENS,
+) -> Tuple[List[Optional[str]], List[Dict[str, Any]]]:
+    """Prune sections in document order; return what is kept of each and what was dropped.
+
+    The kept text is None for a section that lost everything. Sections with
+    nothing dropped are returned byte-for-byte, so their translations stay
+    cached.
+    """
+    pruner = Pruner(similarity)
+    pruned: List[Optional[str]] = []
+    dropped: List[Dict[str, Any]] = []
+    for index, section in enumerate(sections):
+        blocks, droppable = section_units(index, section)
+        section_urls: Set[str] = set()
+        for units, allowed in zip(blocks, droppable):
+            for unit in units:
+                if allowed:
+                    pruner.check(unit, section_urls)
+                if unit.dropped is None:
+                    section_urls.update(link_urls(unit.text))
+
+        # Over the cap: drop the last remaining pieces until the section fits
+        if section_tokens:
+            candidates = [unit for units, allowed in zip(blocks, droppable) if allowed for unit in units]
+            tokens = estimate_tokens(join_blocks(blocks))
+            for unit in reversed(candidates):
+                if tokens <= section_tokens:
+                    break
+                if unit.dropped is None:
+                    unit.dropped = {"reason": "section_cap"}
+                    tokens -= estimate_tokens(unit.text)
+        pruner.commit_links([unit for units in blocks for unit in units])
+
+        removed = [unit for units in blocks for unit in units if unit.dropped is not None]
+        if not removed:
+            pruned.append(section)
+            continue
+        pruned.append(join_blocks(blocks) or None)
+        heading = section.split("\n", 1)[0]
+        for unit in removed:
+            dropped.append({
+                "section": index,
+                "heading": heading[:120],
+                **unit.dropped,
+                "tokens": estimate_tokens(unit.text),
+                "text": unit.text,
+            })
+    return pruned, dropped
+
+
+def prune_records(records: List[Dict[str, Any]], pruned: List[Optional[str]]) -> List[Dict[str, Any]]:
+    """Carry converter section records over to the pruned sections."""
+    kept = []
+    for record, text in zip(records, pruned):
+        if text is None:
+            continue
+        if text != record["markdown"]:
+            record = dict(
+                record,
+                markdown=text,
+                items=[item for item in record["items"] if item["text"] in text],
+                links=[link for link in record["links"] if link in text],
+            )
+        kept.append(record)
+    return kept
+
+
+def prune_report(content: str, pruned_content: str, dropped: List[Dict[str, Any]], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a pruning run for the JSON report."""
+    reasons: Dict[str, int] = {}
+    for entry in dropped:
+        reasons[entry["reason"]] = reasons.get(entry["reason"], 0) + 1
+    return {
+        "source_hash": content_hash(content),
+        "settings": settings,
+        "tokens_before": estimate_tokens(content),
+        "tokens_after": estimate_tokens(pruned_content),
+        "dropped_count": reasons,
+        "dropped": dropped,
+    }
+
+
+def prune_file(
+    markdown_file: str,
+    output_file: str,
+    ledger: Optional[Ledger] = None,
+    content: Optional[str] = None,
+    report_path: Optional[str] = None,
+    similarity: float = DEFAULT_SIMILARITY,
+    section_tokens: int = DEFAULT_SECTION_TOKENS,
+) -> str:
+    """Write the pruned Markdown (and its report), skipping unchanged input.
+
+    Converter section records for the input are used as the sections and
+    carried over to the output. Returns the pruned Markdown.
+    """
+    if content is None:
+        try:
+            with open(markdown_file, "r", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            print(f"Error: File '{markdown_file}' not found")
+            sys.exit(1)
+
+    settings = {"similarity": similarity, "section_tokens": section_tokens}
+    result = {}
+
+    def work(extra: Dict[str, Any]) -> None:
+        records = load_sections(markdown_file, content)
+        sections = [record["markdown"] for record in records] if records else split_sections(content)
+        pruned, dropped = prune_sections(sections, similarity, section_tokens)
+        pruned_content = "\n\n".join(text for text in pruned if text is not None) + "\n"
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(pruned_content)
+        if records:
+            write_sections(output_file, prune_records(records, pruned), pruned_content)
+
+        report = prune_report(content, pruned_content, dropped, settings)
+        if report_path:
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=1)
+                f.write("\n")
+        extra["input_tokens"] = report["tokens_before"]
+        extra["output_tokens"] = report["tokens_after"]
+        extra["dropped"] = len(dropped)
+        print(
+            f"Pruned {len(dropped)} pieces ({report['dropped_count']}): "
+            f"~{report['tokens_before']} -> ~{report['tokens_after']} tokens",
+            file=sys.stderr,
+        )
+        result["content"] = pruned_content
+
+    ledger = ledger or open_ledger()
+    run_stage(
+        ledger, guid_for_file(ledger, markdown_file), "prune", work,
+        input_hash=content_hash(f"{content}\0{json.dumps(settings, sort_keys=True)}"),
+        output_path=output_file,
+    )
+    if "content" in result:
+        return result["content"]
+    with open(output_file, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def pruned_path(markdown_file: str) -> str:
+    """Return the pruned Markdown path for a source file (foo_issue.md -> foo_issue_pruned.md)."""
+    return os.path.splitext(markdown_file)[0] + "_pruned.md"
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Drop near-duplicate bullets and repeated link lists before translation",
+        epilog="Example: python prune.py output/2024-01-15_issue.md --report output/2024-01-15_prune.json",
+    )
+    parser.add_argument("markdown_file", help="Converted Markdown to prune")
+    parser.add_argument("-o", "--output", help="Pruned Markdown file (default: <name>_pruned.md)")
+    parser.add_argument("--report", help="Write what was dropped to this JSON file")
+    parser.add_argument(
+        "--similarity", type=float, default=DEFAULT_SIMILARITY,
+        help=f"Shingle similarity at which a bullet counts as a duplicate (default: {DEFAULT_SIMILARITY})",
+    )
+    parser.add_argument(
+        "--section-tokens", type=int, default=DEFAULT_SECTION_TOKENS,
+        help=f"Estimated tokens kept per section, 0 for no cap (default: {DEFAULT_SECTION_TOKENS})",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main function to prune a converted issue."""
+    args = parse_args()
+    prune_file(
+        args.markdown_file, args.output or pruned_path(args.markdown_file),
+        report_path=args.report,
+        similarity=args.similarity,
+        section_tokens=args.section_tokens,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,505 +4,198 @@ Newsletter publishing script for GitHub Pages.
 Converts translated markdown to HTML and updates the archive.
 """
 
+import argparse
+import glob
 import json
 import re
 import os
 import sys
 import subprocess
-from datetime import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from html import unescape
 from pathlib import Path
 import markdown
 from markdown.extensions import codehilite, tables, toc
 
+from archive_index import open_archive_index
+from build_manifest import BuildManifest, publish_lock, write_if_changed
+from document import load_document, parse_document
+from feed_writer import FEED_ITEMS, FeedWriter, page_hash_from
+from ledger import content_hash, file_hash, guid_for_file, open_ledger, stage_is_current
+from search_index import SearchIndex, index_page
+from site_pages import SitePages
+from stylesheet import publish_stylesheet, stylesheet_head
+from templating import render_template, template_environment, templates_version
+
+# Translated Markdown is kept here so pages can be rebuilt later
+CONTENT_DIR = "content/newsletters"
+NEWSLETTERS_DIR = "docs/newsletters"
+
+ISSUE_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Bump when create_markdown, render_markdown, render_page or the title
+# rules change page HTML; every page is then rebuilt
+PAGE_VERSION = 1
+
+# Pages published before sources were kept are rebuilt from their own body
+PAGE_TITLE_RE = re.compile(r'<title>(.*) \| AIニュース</title>')
+PAGE_MAIN_RE = re.compile(r'<main>\n        (.*)\n    </main>', re.DOTALL)
+
+# Converter reused by every page a rebuild worker renders
+_worker_markdown = None
+
 def extract_title_and_summary(markdown_content):
     """Extract title and create a summary from markdown content."""
-    lines = markdown_content.strip().split('\n')
-    
-    # Find the title (handles headers, bold, and italic formats)
-    title = "AI技術ニュースレター"
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Check for header format (# title or ＃ title)
-        if line.startswith('＃ ') or line.startswith('# '):
-            title = line.replace('＃ ', '').replace('# ', '').strip()
-            break
-        
-        # Check for bold format (**title**)
-        if line.startswith('**') and line.endswith('**') and len(line) > 4:
-            title = line[2:-2].strip()
-            break
-            
-        # Check for italic format (*title*)
-        if line.startswith('*') and line.endswith('*') and len(line) > 2 and not line.startswith('**'):
-            title = line[1:-1].strip()
-            break
-        
-        # If it's the first non-empty line and none of the above, use it as title
-        title = line
-        break
-    
-    # Create summary from first few meaningful paragraphs
-    summary_lines = []
-    char_count = 0
-    max_chars = 150
-    
-    for line in lines:
-        line = line.strip()
-        # Skip headers, images, bullet points, and empty lines, but allow paragraphs with links
-        if (line.startswith('#') or line.startswith('＃') or 
-            line.startswith('![') or 
-            line.startswith('- ') or line.startswith('* ') or line.startswith('> ') or
-            not line):
-            continue
-        
-        # Clean up markdown formatting for display
-        clean_line = line
-        # Remove markdown links: [text](url) -> text
-        clean_line = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', clean_line)
-        # Remove bold markdown: **text** -> text
-        clean_line = re.sub(r'\*\*([^*]+)\*\*', r'\1', clean_line)
-        
-        # Check if adding this line would exceed the limit
-        if char_count + len(clean_line) > max_chars:
-            # If we have some content already, break
-            if summary_lines:
-                break
-            # If this is the first line and it's too long, truncate it
-            clean_line = clean_line[:max_chars - char_count - 3] + '...'
-            summary_lines.append(clean_line)
-            break
-            
-        summary_lines.append(clean_line)
-        char_count += len(clean_line)
-        
-        if char_count > 100:  # Minimum summary length
-            break
-    
-    summary = ' '.join(summary_lines)
-    if len(summary) > max_chars:
-        summary = summary[:max_chars] + '...'
-    elif summary and not summary.endswith('...'):
-        summary = summary + '...'
-    
-    return title, summary
-
+    document = parse_document(markdown_content)
+    return document.title, document.summary
 
 
-def markdown_to_html(markdown_content, title, date):
-    """Convert markdown content to HTML with custom styling."""
-    
-    # Preprocess markdown to convert full-width # to regular #
-    processed_content = markdown_content.replace('＃', '#')
-    
-    # Configure markdown extensions
-    md = markdown.Markdown(extensions=[
+def create_markdown():
+    """Create the configured Markdown converter."""
+    return markdown.Markdown(extensions=[
         'codehilite',
         'tables',
         'toc',
         'fenced_code'
     ])
-    
-    # Convert markdown to HTML
-    content_html = md.convert(processed_content)
-    
-    # Create full HTML page with improved accessibility and bearblog-inspired design
-    html_template = f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} | AIニュース</title>
-    <meta name="description" content="{title} - AIニュース {date}。最新のAI技術動向を日本語でお届け。">
-    <meta name="keywords" content="AI,人工知能,ニュースレター,{date},機械学習,深層学習,日本語">
-    <meta name="author" content="AIニュース">
-    <link rel="canonical" href="https://yipg.github.io/ainews/docs/newsletters/{date}.html">
-    
-    <!-- Open Graph meta tags -->
-    <meta property="og:title" content="{title} | AIニュース">
-    <meta property="og:description" content="{title} - AIニュース {date}。最新のAI技術動向を日本語でお届け。">
-    <meta property="og:type" content="article">
-    <meta property="og:url" content="https://yipg.github.io/ainews/docs/newsletters/{date}.html">
-    <meta property="og:image" content="https://yipg.github.io/ainews/newsletters/og/{date}.png">
-    <meta property="og:image:width" content="1200">
-    <meta property="og:image:height" content="630">
-    <meta property="og:image:type" content="image/png">
-    <meta property="og:site_name" content="AIニュース">
-    <meta property="og:locale" content="ja_JP">
-    <meta property="article:published_time" content="{date}T09:00:00+00:00">
-    <meta property="article:author" content="AIニュース">
-    <meta property="article:section" content="AI技術ニュース">
-    
-    <!-- Twitter Card meta tags -->
-    <meta name="twitter:card" content="summary_large_image">
-    <meta name="twitter:title" content="{title} | AIニュース">
-    <meta name="twitter:description" content="{title} - AIニュース {date}。最新のAI技術動向を日本語でお届け。">
-    <meta name="twitter:image" content="https://yipg.github.io/ainews/newsletters/og/{date}.png">
-    
-    <!-- Favicon -->
-    <link rel="icon" type="image/svg+xml" href="data:image/svg+xml,<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 100 100'><text y='.9em' font-size='90'>✏️</text></svg>">
-    <link rel="alternate icon" href="data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAACAAAAAgCAYAAABzenr0AAAACXBIWXMAAA7EAAAOxAGVKw4bAAAA">
-    
-    <!-- RSS Feed -->
-    <link rel="alternate" type="application/rss+xml" title="AIニュース RSS Feed" href="../feed.xml">
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: Verdana, Geneva, sans-serif;
-            font-size: 1em;
-            line-height: 1.7;
-            letter-spacing: 0.02em;
-            max-width: 720px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #fff;
-            color: #111;
-            word-wrap: break-word;
-        }}
-        
-        nav {{
-            margin-bottom: 25px;
-            padding-bottom: 15px;
-            border-bottom: 1px solid #ddd;
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            flex-wrap: nowrap;
-        }}
-        
-        .site-title {{
-            font-size: 1.1em;
-            font-weight: bold;
-            color: #111;
-            text-decoration: none;
-            flex-shrink: 0;
-        }}
-        
-        .site-title:hover {{
-            text-decoration: underline;
-        }}
-        
-        .nav-links {{
-            font-size: 0.85em;
-            white-space: nowrap;
-        }}
-        
-        .nav-links a {{
-            color: #111;
-            text-decoration: none;
-            margin-left: 12px;
-        }}
-        
-        .nav-links a:hover {{
-            text-decoration: underline;
-        }}
-        
-        
-        h1, h2, h3, h4, h5, h6 {{
-            margin: 35px 0 20px 0;
-            line-height: 1.3;
-            color: #111;
-            letter-spacing: 0.01em;
-        }}
-        
-        h1 {{ font-size: 1.5em; }}
-        h2 {{ font-size: 1.3em; }}
-        h3 {{ font-size: 1.1em; }}
-        
-        p {{
-            margin: 20px 0;
-        }}
-        
-        a {{
-            color: #0969da;
-            text-decoration: none;
-        }}
-        
-        a:hover {{
-            text-decoration: underline;
-        }}
-        
-        ul, ol {{
-            margin: 20px 0;
-            padding-left: 30px;
-        }}
-        
-        li {{
-            margin: 8px 0;
-        }}
-        
-        blockquote {{
-            border-left: 3px solid #ccc;
-            margin: 25px 0;
-            padding: 0 25px;
-            color: #555;
-            font-style: italic;
-        }}
-        
-        code {{
-            background-color: #f6f8fa;
-            padding: 2px 4px;
-            border-radius: 3px;
-            font-family: 'Courier New', Courier, monospace;
-            font-size: 0.9em;
-        }}
-        
-        pre {{
-            background-color: #f6f8fa;
-            border-radius: 6px;
-            padding: 20px;
-            overflow-x: auto;
-            margin: 25px 0;
-        }}
-        
-        pre code {{
-            background: none;
-            padding: 0;
-        }}
-        
-        img {{
-            max-width: 100%;
-            height: auto;
-            margin: 25px 0;
-            border-radius: 3px;
-        }}
-        
-        hr {{
-            border: none;
-            border-top: 1px solid #ddd;
-            margin: 35px 0;
-        }}
-        
-        footer {{
-            margin-top: 40px;
-            padding-top: 15px;
-            border-top: 1px solid #ddd;
-            text-align: center;
-            color: #555;
-            font-size: 0.85em;
-        }}
-        
-        footer a {{
-            color: #555;
-            text-decoration: none;
-            margin: 0 8px;
-        }}
-        
-        footer a:hover {{
-            text-decoration: underline;
-        }}
-        
-        @media (max-width: 600px) {{
-            body {{
-                padding: 15px;
-                font-size: 0.95em;
-            }}
-            
-            nav {{
-                flex-direction: column;
-                align-items: flex-start;
-                gap: 10px;
-            }}
-            
-            .nav-links {{
-                font-size: 0.8em;
-            }}
-            
-            .nav-links a {{
-                margin-left: 0;
-                margin-right: 12px;
-            }}
-            
-            .article-title {{
-                font-size: 1.4em;
-            }}
-        }}
-        
-        @media (max-width: 480px) {{
-            body {{
-                font-size: 0.9em;
-                padding: 12px;
-            }}
-            
-            .site-title {{
-                font-size: 1em;
-            }}
-            
-            .nav-links {{
-                font-size: 0.75em;
-            }}
-            
-            .article-title {{
-                font-size: 1.3em;
-            }}
-        }}
-        
-        @media (prefers-color-scheme: dark) {{
-            body {{
-                background-color: #111;
-                color: #eee;
-            }}
-            
-            nav {{
-                border-bottom-color: #444;
-            }}
-            
-            .site-title, .nav-links a, .article-title, h1, h2, h3, h4, h5, h6 {{
-                color: #eee;
-            }}
-            
-            .article-date {{
-                color: #ccc;
-            }}
-            
-            blockquote {{
-                border-left-color: #555;
-                color: #ccc;
-            }}
-            
-            code {{
-                background-color: #2d3748;
-                color: #e2e8f0;
-            }}
-            
-            pre {{
-                background-color: #2d3748;
-            }}
-            
-            hr, footer {{
-                border-color: #444;
-            }}
-            
-            footer, footer a {{
-                color: #ccc;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <nav>
-        <a href="../index.html" class="site-title">✏️ AIニュース</a>
-        <div class="nav-links">
-            <a href="../index.html">ホーム</a>
-            <a href="./archive.html">アーカイブ</a>
-            <a href="../feed.xml">RSS</a>
-            <a href="https://github.com/YIPG/ainews">GitHub</a>
-        </div>
-    </nav>
-
-    <main>
-        {content_html}
-    </main>
-
-    <footer>
-        <p>
-            <a href="https://github.com/YIPG/ainews">GitHub</a>
-            <a href="https://news.smol.ai/">news.smol.ai</a>
-        </p>
-    </footer>
-</body>
-</html>"""
-    
-    return html_template
 
-def update_archive_index(date, title, summary, filename):
-    """Update the archive index JSON file."""
-    index_path = Path("docs/newsletters/index.json")
+
+def render_markdown(markdown_content, md=None):
+    """Convert markdown content to an HTML fragment.
+
+    An existing converter can be passed in; it is reset before use.
+    """
+    # Preprocess markdown to convert full-width # to regular #
+    processed_content = markdown_content.replace('＃', '#')
     
-    # Load existing data
-    if index_path.exists():
-        with open(index_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    if md is None:
+        md = create_markdown()
     else:
-        data = {"newsletters": [], "lastUpdated": None, "totalCount": 0}
-    
-    # Check if this newsletter already exists
-    existing = None
-    for i, newsletter in enumerate(data["newsletters"]):
-        if newsletter["date"] == date:
-            existing = i
-            break
+        md.reset()
     
-    newsletter_entry = {
+    # Convert markdown to HTML
+    return md.convert(processed_content)
+
+
+def markdown_to_html(markdown_content, title, date, md=None):
+    """Convert markdown content to HTML with custom styling."""
+    return render_page(render_markdown(markdown_content, md), title, date)
+
+
+def render_page(content_html, title, date):
+    """Wrap an HTML fragment in the full newsletter page."""
+    return render_template(
+        "newsletter.html", content=content_html, title=title, date=date, root="..", pages=".",
+    )
+
+@lru_cache(maxsize=None)
+def template_version():
+    """Hash of PAGE_VERSION, the page templates, stylesheet and Markdown version; changes invalidate every page."""
+    return content_hash(
+        str(PAGE_VERSION) + templates_version("newsletter.html") + stylesheet_head() + markdown.__version__
+    )
+
+
+def update_archive_entries(entries, manifest=None, full=False):
+    """Merge newsletter entries into the sharded archive index; return its head.
+
+    With a manifest, the month and tag pages the entries touched are
+    re-rendered along with the archive page and sitemap (every listing page
+    with full).
+    """
+    index = open_archive_index()
+    head = index.update(entries)
+    if manifest is not None:
+        pages = SitePages(index, manifest)
+        if full:
+            pages.build()
+        else:
+            pages.build(index.changed_months, index.changed_tags)
+    return head
+
+
+def update_archive_index(date, title, summary, filename, tags=None, manifest=None):
+    """Update the archive index JSON file."""
+    entry = {
         "date": date,
         "title": title,
         "summary": summary,
         "filename": filename
     }
-    
-    if existing is not None:
-        # Update existing entry
-        data["newsletters"][existing] = newsletter_entry
-    else:
-        # Add new entry
-        data["newsletters"].append(newsletter_entry)
-    
-    # Update metadata
-    data["lastUpdated"] = datetime.now().isoformat()
-    data["totalCount"] = len(data["newsletters"])
-    
-    # Save updated data
-    with open(index_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if tags:
+        entry["tags"] = tags
+    return update_archive_entries([entry], manifest)
 
-def generate_rss_feed():
-    """Generate RSS feed for the newsletters."""
-    index_path = Path("docs/newsletters/index.json")
-    
-    if not index_path.exists():
-        return
-    
-    with open(index_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Sort newsletters by date (newest first)
-    newsletters = sorted(data["newsletters"], key=lambda x: x["date"], reverse=True)
+
+def load_issue_tags(date):
+    """Return an issue's feed tags, from its fetch metadata or the copy kept with its source."""
+    for path in (f"output/{date}_meta.json", f"{CONTENT_DIR}/{date}.json"):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return [tag for tag in json.load(f).get("tags", []) if tag]
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+    return []
+
+
+def generate_rss_feed(manifest=None, data=None):
+    """Update the RSS feed (and the full-content Atom feed, if enabled).
+
+    Only items whose archive entry or page changed are rendered; the rest
+    come from the feed item cache.
+    """
+    if data is None:
+        data = open_archive_index().load_head()
+        if not data["newsletters"]:
+            return
+    
+    feed = FeedWriter()
+    feed.update(
+        data["newsletters"][:FEED_ITEMS],
+        page_hash_from(manifest, NEWSLETTERS_DIR),
+        load_page_body,
+    )
+    feed.write(data.get("lastUpdated"), manifest)
+    return feed.rendered
+
+
+def build_page(date, markdown_content, manifest, document=None):
+    """Render one issue page unless the manifest shows it is up to date.
+
+    document is the issue's parsed model, parsed here if not given.
+    Returns the archive index entry and whether the page was rendered.
+    """
+    output_filename = f"{date}.html"
+    output_path = f"{NEWSLETTERS_DIR}/{output_filename}"
     
-    # Take only the latest 20 for RSS
-    newsletters = newsletters[:20]
+    document = document or parse_document(markdown_content, date)
+    title = document.title
+    entry = {
+        "date": date,
+        "title": title,
+        "summary": document.summary,
+        "filename": output_filename
+    }
     
-    rss_items = []
-    for newsletter in newsletters:
-        rss_items.append(f"""    <item>
-      <title>{newsletter['title']}</title>
-      <link>https://yipg.github.io/ainews/docs/newsletters/{newsletter['filename']}</link>
-      <description><![CDATA[{newsletter['summary']}]]></description>
-      <pubDate>{datetime.strptime(newsletter['date'], '%Y-%m-%d').strftime('%a, %d %b %Y 09:00:00 +0000')}</pubDate>
-      <guid>https://yipg.github.io/ainews/docs/newsletters/{newsletter['filename']}</guid>
-    </item>""")
+    inputs = {"source": content_hash(markdown_content), "template": template_version()}
+    if manifest.is_fresh(output_path, inputs):
+        return entry, False
     
-    rss_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0">
-  <channel>
-    <title>AI技術ニュースレター</title>
-    <link>https://yipg.github.io/ainews/</link>
-    <description>AI技術に関する最新ニュースの日本語翻訳ニュースレター</description>
-    <language>ja</language>
-    <lastBuildDate>{datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0000')}</lastBuildDate>
-    <generator>AI Newsletter Archive System</generator>
-{chr(10).join(rss_items)}
-  </channel>
-</rss>"""
+    # Convert to HTML
+    html_content = markdown_to_html(markdown_content, title, date)
     
-    with open("docs/feed.xml", 'w', encoding='utf-8') as f:
-        f.write(rss_content)
+    # Write HTML file only if its bytes changed
+    write_if_changed(output_path, html_content)
+    manifest.record(output_path, inputs, content_hash(html_content))
+    return entry, True
 
-def main():
-    """Main publishing function."""
-    if len(sys.argv) != 2:
-        print("Usage: python publish.py <translated_markdown_file>")
-        sys.exit(1)
-    
-    markdown_file = sys.argv[1]
-    
-    if not os.path.exists(markdown_file):
+
+def read_issue(markdown_file, markdown_content=None):
+    """Return the date and content of a translated markdown file."""
+    if markdown_content is None and not os.path.exists(markdown_file):
         print(f"Error: File {markdown_file} does not exist")
         sys.exit(1)
     
@@ -513,36 +206,269 @@ def main():
         print(f"Error: Could not extract date from filename {markdown_file}")
         sys.exit(1)
     
-    date = date_match.group(1)
-    output_filename = f"{date}.html"
-    output_path = f"docs/newsletters/{output_filename}"
-    
     # Read markdown content
-    with open(markdown_file, 'r', encoding='utf-8') as f:
-        markdown_content = f.read()
-    
-    # Extract title and summary
-    title, summary = extract_title_and_summary(markdown_content)
-    
-    # Convert to HTML
-    html_content = markdown_to_html(markdown_content, title, date)
-    
-    # Ensure output directory exists
-    os.makedirs("docs/newsletters", exist_ok=True)
+    if markdown_content is None:
+        with open(markdown_file, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
     
-    # Write HTML file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    # Update archive index
-    update_archive_index(date, title, summary, output_filename)
-    
-    # Generate RSS feed
-    generate_rss_feed()
+    return date_match.group(1), markdown_content
+
+
+def publish_newsletters(markdown_files, ledger=None, markdown_contents=None):
+    """Render translated markdown files, then update the archive index, listing
+    pages, search index and feed once for the whole batch.
+
+    Issues the ledger shows as already published with this exact translation
+    are skipped. The rest are only marked as published once the shared files
+    are written, and the whole batch runs under the publish lock.
+    markdown_contents can be passed when the caller already holds the files'
+    content.
+    """
+    if markdown_contents is None:
+        markdown_contents = [None] * len(markdown_files)
+    issues = [
+        (markdown_file, *read_issue(markdown_file, markdown_content))
+        for markdown_file, markdown_content in zip(markdown_files, markdown_contents)
+    ]
+    ledger = ledger or open_ledger()
+    
+    with publish_lock(), ExitStack() as pending:
+        manifest = BuildManifest()
+        publish_stylesheet()
+        entries = []
+        tracked = []
+        for markdown_file, date, markdown_content in issues:
+            output_path = f"{NEWSLETTERS_DIR}/{date}.html"
+            guid = guid_for_file(ledger, markdown_file)
+            input_hash = content_hash(markdown_content + template_version())
+            if guid is not None:
+                if stage_is_current(ledger, guid, "publish", input_hash, output_path):
+                    print(f"Skipping publish of {date}: already completed for this input", file=sys.stderr)
+                    continue
+                # Recorded as done (or failed) when the batch is committed below
+                extra = pending.enter_context(ledger.track(guid, "publish", input_hash=input_hash))
+                tracked.append((extra, output_path))
+            
+            # Keep the translation (and its tags) so the page can be rebuilt from source later
+            write_if_changed(f"{CONTENT_DIR}/{date}.md", markdown_content)
+            tags = load_issue_tags(date)
+            if tags:
+                write_if_changed(f"{CONTENT_DIR}/{date}.json", json.dumps({"tags": tags}, ensure_ascii=False) + "\n")
+            
+            # Parsed once per translation and shared with summarize and tweet via the sidecar
+            document = load_document(markdown_file, markdown_content)
+            entry, rendered = build_page(date, markdown_content, manifest, document)
+            if tags:
+                entry["tags"] = tags
+            entries.append(entry)
+            
+            print(f"{'Published' if rendered else 'Up to date'}: {output_path}")
+            print(f"Title: {entry['title']}")
+            print(f"Summary: {entry['summary'][:100]}...")
+        
+        if not entries:
+            return
+        
+        # Update archive index and listing pages, search index and RSS feed once
+        data = update_archive_entries(entries, manifest)
+        update_search_index([entry["date"] for entry in entries])
+        generate_rss_feed(manifest, data)
+        manifest.save()
+        
+        for extra, output_path in tracked:
+            extra["output_hash"] = file_hash(output_path)
+
+
+def publish_newsletter(markdown_file, ledger=None, markdown_content=None):
+    """Render a translated markdown file and update the archive index and feed.
+
+    Skipped when the ledger shows this exact translation is already published.
+    markdown_content can be passed when the caller already holds the file's
+    content.
+    """
+    publish_newsletters([markdown_file], ledger, [markdown_content])
+
+
+def extract_page_content(page_html):
+    """Return the title and rendered body of a published page, or None."""
+    title_match = PAGE_TITLE_RE.search(page_html)
+    main_match = PAGE_MAIN_RE.search(page_html)
+    if not title_match or not main_match:
+        return None
+    # Titles are escaped by the template; undo it so re-wrapping doesn't double-escape
+    return unescape(title_match.group(1)), main_match.group(1)
+
+
+def load_page_body(date):
+    """Return the rendered body of a published issue page, or None."""
+    try:
+        with open(f"{NEWSLETTERS_DIR}/{date}.html", 'r', encoding='utf-8') as f:
+            extracted = extract_page_content(f.read())
+    except FileNotFoundError:
+        return None
+    return extracted[1] if extracted else None
+
+
+def update_search_index(dates):
+    """Index the published pages for the given dates; unchanged pages are skipped."""
+    index = SearchIndex()
+    updated = 0
+    for date in dates:
+        try:
+            with open(f"{NEWSLETTERS_DIR}/{date}.html", 'r', encoding='utf-8') as f:
+                extracted = extract_page_content(f.read())
+        except FileNotFoundError:
+            continue
+        if extracted:
+            updated += index_page(index, date, *extracted)
+    index.save()
+    return updated
+
+
+def init_render_worker():
+    """Give a rebuild worker process its own Markdown converter and loaded page template."""
+    global _worker_markdown
+    _worker_markdown = create_markdown()
+    template_environment().get_template("newsletter.html")
+
+
+def render_archive_page(job):
+    """Render one page in a rebuild worker; return its date and output hash."""
+    date, kind, source, title = job
+    if kind == "markdown":
+        html_content = markdown_to_html(source, title, date, _worker_markdown)
+    else:
+        html_content = render_page(source, title, date)
+    write_if_changed(f"{NEWSLETTERS_DIR}/{date}.html", html_content)
+    return date, content_hash(html_content)
+
+
+def plan_archive(manifest, force=False):
+    """Collect render jobs for stale pages and index entries for every source.
+
+    Issues kept in CONTENT_DIR are rendered from Markdown. Pages without a
+    kept source are re-wrapped from the body of the published page.
+    """
+    jobs = []
+    inputs = {}
+    entries = []
+    skipped = 0
+    version = template_version()
+    
+    sources = {
+        Path(path).stem: path for path in glob.glob(f"{CONTENT_DIR}/*.md")
+        if ISSUE_DATE_RE.fullmatch(Path(path).stem)
+    }
+    pages = {
+        Path(path).stem: path for path in glob.glob(f"{NEWSLETTERS_DIR}/*.html")
+        if ISSUE_DATE_RE.fullmatch(Path(path).stem)
+    }
+    for date in sorted(set(sources) | set(pages)):
+        output_path = f"{NEWSLETTERS_DIR}/{date}.html"
+        if date in sources:
+            with open(sources[date], 'r', encoding='utf-8') as f:
+                markdown_content = f.read()
+            document = parse_document(markdown_content, date)
+            title = document.title
+            entry = {
+                "date": date,
+                "title": title,
+                "summary": document.summary,
+                "filename": f"{date}.html"
+            }
+            tags = load_issue_tags(date)
+            if tags:
+                entry["tags"] = tags
+            entries.append(entry)
+            job = (date, "markdown", markdown_content, title)
+            inputs[date] = {"source": content_hash(markdown_content), "template": version}
+        else:
+            with open(pages[date], 'r', encoding='utf-8') as f:
+                extracted = extract_page_content(f.read())
+            if extracted is None:
+                print(f"Skipping {output_path}: no source and no recognizable page body")
+                skipped += 1
+                continue
+            title, content_html = extracted
+            job = (date, "html", content_html, title)
+            inputs[date] = {"body": content_hash(content_html), "template": version}
+        
+        if force or not manifest.is_fresh(output_path, inputs[date]):
+            jobs.append(job)
+    
+    return jobs, inputs, entries, skipped
+
+
+def rebuild_archive(workers=None, force=False):
+    """Re-render every stale page on a process pool, then write the index, listings and feed once."""
+    with publish_lock():
+        started = time.monotonic()
+        manifest = BuildManifest()
+        jobs, inputs, entries, skipped = plan_archive(manifest, force)
+        publish_stylesheet()
+        
+        if workers == 1 or len(jobs) <= 1:
+            init_render_worker()
+            results = map(render_archive_page, jobs)
+            for date, output_hash in results:
+                manifest.record(f"{NEWSLETTERS_DIR}/{date}.html", inputs[date], output_hash)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker) as executor:
+                chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+                for date, output_hash in executor.map(render_archive_page, jobs, chunksize=chunksize):
+                    manifest.record(f"{NEWSLETTERS_DIR}/{date}.html", inputs[date], output_hash)
+        render_seconds = time.monotonic() - started
+        
+        # Index, listing pages and feed are written once for the whole archive
+        data = update_archive_entries(entries, manifest, full=True)
+        searched = update_search_index(sorted(inputs))
+        generate_rss_feed(manifest, data)
+        manifest.save()
+        
+        # Every page now links the current stylesheet, so older fingerprints can go
+        if not skipped:
+            publish_stylesheet(prune=True)
+        
+        elapsed = time.monotonic() - started
+        rate = len(jobs) / render_seconds if jobs and render_seconds else 0.0
+        print(
+            f"Rebuilt archive: {len(jobs)} rendered, {len(inputs) - len(jobs)} up to date, "
+            f"{searched} reindexed for search in {elapsed:.2f}s ({rate:.1f} pages/sec)"
+        )
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Publish translated newsletters to GitHub Pages")
+    parser.add_argument(
+        "markdown_files", nargs="*",
+        help="Translated Markdown files to publish; the index and feed are updated once for all of them",
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="Rebuild every stale page in docs/newsletters/ and write the index, listing pages and feed once",
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="Worker processes for --all (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="With --all, re-render pages even if the manifest shows them up to date",
+    )
+    args = parser.parse_args()
+    if bool(args.markdown_files) == args.all:
+        parser.error("pass either markdown files or --all")
+    return args
+
+def main():
+    """Main publishing function."""
+    args = parse_args()
     
-    print(f"Published newsletter: {output_path}")
-    print(f"Title: {title}")
-    print(f"Summary: {summary[:100]}...")
+    if args.all:
+        rebuild_archive(args.workers, args.force)
+    else:
+        publish_newsletters(args.markdown_files)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
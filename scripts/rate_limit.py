@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Client-side rate limiting for Azure OpenAI calls.
+One limiter per process is shared by translation and quality checks. It
+paces requests with token buckets for the deployment's tokens-per-minute
+and requests-per-minute quotas, honors Retry-After on 429 responses and
+adapts the number of requests in flight AIMD-style: it grows by about one
+slot per round of successful requests and halves on throttling.
+"""
+
+import email.utils
+import os
+import random
+import sys
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TPM = 150_000
+
+# Azure grants 6 requests per minute for every 1000 TPM by default
+RPM_PER_1000_TPM = 6
+
+# Upper bound on requests in flight while concurrency ramps up
+DEFAULT_MAX_CONCURRENCY = 16
+
+# Attempts per request before a throttled call gives up
+DEFAULT_MAX_RETRIES = 6
+
+# Azure enforces quotas over short windows, so buckets hold 10 seconds of quota
+BURST_SECONDS = 10
+
+# Backoff cap when a 429 carries no Retry-After header
+MAX_BACKOFF_SECONDS = 60
+
+
+def env_tpm() -> float:
+    """Deployment tokens-per-minute quota from AOAI_TPM."""
+    value = os.environ.get("AOAI_TPM")
+    return float(value) if value else DEFAULT_TPM
+
+
+def env_rpm() -> float:
+    """Deployment requests-per-minute quota from AOAI_RPM (default derived from the TPM)."""
+    value = os.environ.get("AOAI_RPM")
+    return float(value) if value else env_tpm() * RPM_PER_1000_TPM / 1000
+
+
+def env_max_concurrency() -> int:
+    """Ceiling for adaptive concurrency from AOAI_MAX_CONCURRENCY."""
+    value = os.environ.get("AOAI_MAX_CONCURRENCY")
+    return int(value) if value else DEFAULT_MAX_CONCURRENCY
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Check whether an API error is a 429 throttling response."""
+    return getattr(error, "status_code", None) == 429 or "429" in str(error)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay in seconds a throttling response asked for, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Bucket:
+    """Token bucket refilled continuously at rate_per_minute.
+
+    Requests larger than the bucket wait for a full bucket and leave it in
+    debt, so they are paced instead of blocked forever.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = BURST_SECONDS) -> None:
+        self.rate = max(rate_per_minute, 1.0) / 60
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount (capped at the capacity) is available."""
+        need = min(amount, self.capacity)
+        return 0.0 if self.level >= need else (need - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+
+class RateLimiter:
+    """Token buckets for TPM and RPM plus an adaptive cap on requests in flight."""
+
+    def __init__(
+        self,
+        tpm: float,
+        rpm: float,
+        concurrency: int = 4,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ) -> None:
+        self.tokens = Bucket(tpm)
+        self.requests = Bucket(rpm)
+        self.max_concurrency = max(1, max_concurrency, concurrency)
+        self.limit = float(max(1, concurrency))
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.paused_until = 0.0
+        # Throttles within one pause come from the same burst and halve the limit once
+        self.decrease_after = 0.0
+        self.sent = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._cond = threading.Condition()
+
+    def set_concurrency(self, concurrency: int) -> None:
+        """Start adapting from concurrency requests in flight (raising the ceiling if needed)."""
+        with self._cond:
+            self.max_concurrency = max(self.max_concurrency, concurrency)
+            self.limit = float(max(1, concurrency))
+            self._cond.notify_all()
+
+    def _wait_time(self, now: float, tokens: float) -> Optional[float]:
+        if self.in_flight >= int(self.limit):
+            return None
+        return max(
+            self.paused_until - now,
+            self.tokens.wait_time(tokens),
+            self.requests.wait_time(1),
+        )
+
+    def acquire(self, tokens: float) -> None:
+        """Block until a slot is free and both quotas can take the request."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self.tokens.refill(now)
+                self.requests.refill(now)
+                wait = self._wait_time(now, tokens)
+                if wait is not None and wait <= 0:
+                    break
+                self._cond.wait(wait)
+            self.tokens.take(tokens)
+            self.requests.take(1)
+            self.in_flight += 1
+            self.sent += 1
+            self.waited += time.monotonic() - start
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def succeed(self) -> None:
+        """Additive increase: about one more slot per limit successful requests."""
+        with self._cond:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def throttle(self, delay: Optional[float], attempt: int) -> float:
+        """Multiplicative decrease and a shared pause; returns the pause in seconds."""
+        if delay is None:
+            delay = min(MAX_BACKOFF_SECONDS, 2 ** attempt) + random.random()
+        now = time.monotonic()
+        with self._cond:
+            self.throttled += 1
+            if now >= self.decrease_after:
+                previous = self.limit
+                self.limit = max(1.0, self.limit / 2)
+                self.decrease_after = now + delay
+                print(
+                    f"Rate limited, pausing {delay:.1f}s; concurrency {int(previous)} -> {int(self.limit)}",
+                    file=sys.stderr,
+                )
+            self.paused_until = max(self.paused_until, now + delay)
+            self._cond.notify_all()
+        return delay
+
+    def call(
+        self,
+        tokens: float,
+        request: Callable[[], T],
+        on_retry: Optional[Callable[[], None]] = None,
+        max_retries: Optional[int] = None,
+    ) -> T:
+        """Run request under the limits, retrying it when it is throttled.
+
+        tokens is what the request counts against the TPM quota: Azure
+        reserves the prompt plus max_tokens when a request is accepted.
+        on_retry is called before each retry. Other errors, and a 429 on
+        the last attempt, are raised.
+        """
+        attempts = max_retries or self.max_retries
+        for attempt in range(attempts):
+            self.acquire(tokens)
+            try:
+                result = request()
+            except Exception as e:
+                self.release()
+                if not is_rate_limited(e) or attempt == attempts - 1:
+                    raise
+                self.throttle(retry_after(e), attempt)
+                if on_retry is not None:
+                    on_retry()
+                continue
+            self.release()
+            self.succeed()
+            return result
+        raise RuntimeError("max_retries must be at least 1")
+
+    def summary(self) -> str:
+        """Format request, throttle and wait counts for the log."""
+        return (
+            f"Rate limiter: {self.sent} requests, {self.throttled} throttled, "
+            f"{self.waited:.1f}s queued, concurrency {int(self.limit)} (max {self.max_concurrency})"
+        )
+
+
+_shared: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    """Return the process-wide limiter, configured from AOAI_* variables on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            retries = os.environ.get("AOAI_MAX_RETRIES")
+            _shared = RateLimiter(
+                env_tpm(), env_rpm(),
+                max_concurrency=env_max_concurrency(),
+                max_retries=int(retries) if retries else DEFAULT_MAX_RETRIES,
+            )
+        return _shared
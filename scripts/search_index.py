@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Client-side full-text search index for the archive.
+Builds an inverted index over issue titles and bodies, tokenizing Japanese
+into character bigrams and English into words, and shards it by term prefix
+so the browser only loads the shards a query needs.
+"""
+
+import html
+import json
+import os
+import re
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Set
+
+from build_manifest import write_if_changed
+from ledger import content_hash
+
+SEARCH_DIR = "docs/search"
+DOCS_FILE = "docs.json"
+
+# Build-side state: each document's id, text hash and the shards it appears in
+STATE_PATH = "content/search_state.json"
+
+INDEX_VERSION = 1
+
+# Kana and kanji runs are split into bigrams; Latin letters and digits into words
+TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]+')
+TAG_RE = re.compile(r'<[^>]+>')
+
+# Non-Latin terms are spread over this many shards by their first character
+CJK_SHARDS = 64
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Yield search terms: Latin words (2+ chars), numbers and Japanese bigrams.
+
+    docs/newsletters/archive.html implements the same rules in JavaScript.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    for run in TOKEN_RE.findall(text):
+        if run.isascii():
+            if len(run) >= 2 or run.isdigit():
+                yield run
+        elif len(run) == 1:
+            yield run
+        else:
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+
+
+def shard_key(term: str) -> str:
+    """Return the shard a term belongs to, derived from its first character."""
+    first = term[0]
+    if "a" <= first <= "z":
+        return first
+    if first.isascii() and first.isdigit():
+        return "0"
+    return f"x{ord(first) % CJK_SHARDS:02x}"
+
+
+def html_to_text(fragment: str) -> str:
+    """Strip tags from an HTML fragment and unescape entities."""
+    return html.unescape(TAG_RE.sub(" ", fragment))
+
+
+class SearchIndex:
+    """Prefix-sharded inverted index, updated one document at a time.
+
+    Shards are loaded on first use and written by save() only if they changed.
+    """
+
+    def __init__(self, search_dir: str = SEARCH_DIR, state_path: str = STATE_PATH) -> None:
+        self.search_dir = search_dir
+        self.state_path = state_path
+        self.state: Dict[str, Dict] = {}
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.state = data["docs"]
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        self._shards: Dict[str, Dict[str, List[int]]] = {}
+        self._dirty: Set[str] = set()
+        self._docs_dirty = False
+
+    def _shard(self, key: str) -> Dict[str, List[int]]:
+        if key not in self._shards:
+            try:
+                with open(os.path.join(self.search_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+                    self._shards[key] = json.load(f)["terms"]
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._shards[key] = {}
+        return self._shards[key]
+
+    def _next_id(self) -> int:
+        return max((doc["id"] for doc in self.state.values()), default=-1) + 1
+
+    def is_current(self, date: str, text: str) -> bool:
+        """Check whether a document is indexed with exactly this text."""
+        doc = self.state.get(date)
+        return doc is not None and doc["hash"] == content_hash(text)
+
+    def update(self, date: str, title: str, text: str) -> bool:
+        """Index (or reindex) one issue; return False if it was already current."""
+        if self.is_current(date, text) and self.state[date]["title"] == title:
+            return False
+
+        previous = self.state.get(date)
+        doc_id = previous["id"] if previous else self._next_id()
+        if previous:
+            # Drop the old postings from every shard the document was in
+            for key in previous["shards"]:
+                shard = self._shard(key)
+                for term in [term for term, ids in shard.items() if doc_id in ids]:
+                    shard[term].remove(doc_id)
+                    if not shard[term]:
+                        del shard[term]
+                self._dirty.add(key)
+
+        terms = set(tokenize(f"{title}\n{text}"))
+        shards = set()
+        for term in terms:
+            key = shard_key(term)
+            postings = self._shard(key).setdefault(term, [])
+            postings.append(doc_id)
+            postings.sort()
+            shards.add(key)
+        self._dirty |= shards
+
+        self.state[date] = {
+            "id": doc_id,
+            "title": title,
+            "hash": content_hash(text),
+            "shards": sorted(shards),
+        }
+        self._docs_dirty = True
+        return True
+
+    def save(self) -> int:
+        """Write changed shards and the document list; return the shards written."""
+        written = 0
+        for key in sorted(self._dirty):
+            shard = self._shards[key]
+            data = {"terms": dict(sorted(shard.items()))}
+            written += write_if_changed(
+                os.path.join(self.search_dir, f"{key}.json"),
+                json.dumps(data, ensure_ascii=False, separators=(",", ":")),
+            )
+        self._dirty.clear()
+
+        if self._docs_dirty:
+            docs = sorted(self.state.items(), key=lambda item: item[1]["id"])
+            # The browser maps posting ids back to pages through this list
+            public = {
+                "version": INDEX_VERSION,
+                "cjkShards": CJK_SHARDS,
+                "docs": [[date, doc["title"]] for date, doc in docs],
+            }
+            write_if_changed(
+                os.path.join(self.search_dir, DOCS_FILE),
+                json.dumps(public, ensure_ascii=False, separators=(",", ":")),
+            )
+            write_if_changed(
+                self.state_path,
+                json.dumps({"version": INDEX_VERSION, "docs": dict(docs)}, ensure_ascii=False, indent=1),
+            )
+            self._docs_dirty = False
+        return written
+
+
+def index_page(index: SearchIndex, date: str, title: str, content_html: Optional[str]) -> bool:
+    """Index an issue from its rendered body; return True if the index changed."""
+    if content_html is None:
+        return False
+    return index.update(date, title, html_to_text(content_html))
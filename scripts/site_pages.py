@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Archive, month and tag listing pages and the sitemap.
+Renders them from the sharded archive index in one pass. After publishing an
+issue, only the month and tags it touched are re-rendered, together with the
+archive page and the sitemap.
+"""
+
+import glob
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from archive_index import ArchiveIndex
+from build_manifest import BuildManifest, write_if_changed
+from feed_writer import SITE_URL
+from ledger import content_hash
+from templating import render_template, templates_version
+
+NEWSLETTERS_DIR = "docs/newsletters"
+ARCHIVE_PATH = f"{NEWSLETTERS_DIR}/archive.html"
+MONTHS_DIR = f"{NEWSLETTERS_DIR}/months"
+TAGS_DIR = f"{NEWSLETTERS_DIR}/tags"
+SITEMAP_PATH = "docs/sitemap.xml"
+
+ISSUE_PAGE_RE = re.compile(r'\d{4}-\d{2}-\d{2}\.html')
+
+
+def month_label(month: str) -> str:
+    """Format YYYY-MM as a Japanese month heading."""
+    year, number = month.split("-")
+    return f"{year}年{int(number)}月"
+
+
+class SitePages:
+    """Listing pages and sitemap built from one archive index."""
+
+    def __init__(self, index: ArchiveIndex, manifest: BuildManifest) -> None:
+        self.index = index
+        self.manifest = manifest
+        self.tags = index.load_tags()
+        self._months: Dict[str, List[Dict[str, Any]]] = {}
+        self.written = 0
+
+    def _month(self, month: str) -> List[Dict[str, Any]]:
+        # Each shard is read at most once per run, whichever pages need it
+        if month not in self._months:
+            self._months[month] = self.index.load_shard(month)
+        return self._months[month]
+
+    def _render(self, path: str, template: str, data: Any, **context: Any) -> None:
+        inputs = {
+            "data": content_hash(json.dumps(data, ensure_ascii=False, sort_keys=True)),
+            "template": templates_version(template),
+        }
+        if self.manifest.is_fresh(path, inputs):
+            return
+        content = render_template(template, site_url=SITE_URL, **context)
+        self.written += write_if_changed(path, content)
+        self.manifest.record(path, inputs, content_hash(content))
+
+    def _remove(self, path: str) -> None:
+        if os.path.exists(path):
+            os.remove(path)
+            self.written += 1
+        self.manifest.targets.pop(path, None)
+
+    def build_month(self, month: str, months: List[str]) -> None:
+        """Render one month's listing, linking its neighbours in months (newest first)."""
+        path = f"{MONTHS_DIR}/{month}.html"
+        newsletters = self._month(month)
+        if not newsletters:
+            self._remove(path)
+            return
+        position = months.index(month)
+        newer = months[position - 1] if position > 0 else None
+        older = months[position + 1] if position + 1 < len(months) else None
+        self._render(
+            path, "month.html", [newsletters, newer, older],
+            month=month, month_label=month_label(month), newsletters=newsletters,
+            newer=newer, older=older, root="../..", pages="..",
+        )
+
+    def build_tag(self, slug: str) -> None:
+        """Render one tag's listing from the shards of the months it appears in."""
+        path = f"{TAGS_DIR}/{slug}.html"
+        tag = self.tags.get(slug)
+        if not tag:
+            self._remove(path)
+            return
+        newsletters = [
+            newsletter
+            for date in tag["dates"]
+            for newsletter in self._month(date[:7])
+            if newsletter["date"] == date
+        ]
+        self._render(
+            path, "tag.html", [tag["name"], newsletters],
+            tag=tag["name"], slug=slug, newsletters=newsletters, root="../..", pages="..",
+        )
+
+    def build_archive(self) -> None:
+        """Render the archive page with its month and tag links."""
+        months = self.index.manifest["shards"]
+        tags = sorted(
+            ({"slug": slug, "name": tag["name"], "count": len(tag["dates"])} for slug, tag in self.tags.items()),
+            key=lambda tag: (-tag["count"], tag["name"]),
+        )
+        self._render(
+            ARCHIVE_PATH, "archive.html", [[(m["month"], m["count"]) for m in months], tags],
+            months=months, tags=tags, root="..", pages=".",
+        )
+
+    def build_sitemap(self) -> None:
+        """List the home, archive, issue, month and tag pages in sitemap.xml.
+
+        GitHub Pages serves docs/ at SITE_URL, so paths are relative to docs/.
+        """
+        pages: List[Dict[str, Optional[str]]] = [
+            {"path": "index.html", "lastmod": None},
+            {"path": "newsletters/archive.html", "lastmod": None},
+        ]
+        issue_dates = sorted(
+            (Path(path).stem for path in glob.glob(f"{NEWSLETTERS_DIR}/*.html")
+             if ISSUE_PAGE_RE.fullmatch(Path(path).name)),
+            reverse=True,
+        )
+        pages += [{"path": f"newsletters/{date}.html", "lastmod": date} for date in issue_dates]
+        pages += [
+            {"path": f"newsletters/months/{shard['month']}.html", "lastmod": None}
+            for shard in self.index.manifest["shards"]
+        ]
+        pages += [
+            {"path": f"newsletters/tags/{slug}.html", "lastmod": tag["dates"][0]}
+            for slug, tag in sorted(self.tags.items())
+        ]
+        self._render(SITEMAP_PATH, "sitemap.xml", pages, pages=pages)
+
+    def build(self, months: Optional[Iterable[str]] = None, tags: Optional[Iterable[str]] = None) -> int:
+        """Render the given months and tag slugs (default: all), the archive and the sitemap.
+
+        Returns the number of files written or removed.
+        """
+        all_months = [shard["month"] for shard in self.index.manifest["shards"]]
+        if months is None:
+            months = set(all_months)
+        else:
+            # Neighbouring months link to each other, so a new month updates their links
+            months = set(months)
+            for month in list(months):
+                if month in all_months:
+                    position = all_months.index(month)
+                    months.update(all_months[max(position - 1, 0):position + 2])
+        for month in sorted(months, reverse=True):
+            self.build_month(month, all_months)
+        for slug in sorted(self.tags if tags is None else tags):
+            self.build_tag(slug)
+        self.build_archive()
+        self.build_sitemap()
+        return self.written
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Local structural checks for translated newsletter sections.
+Compares a source Markdown section with its Japanese translation to decide
+cheaply whether it clearly passes, clearly fails or needs an LLM judge.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Set
+
+PASS = "pass"
+FAIL = "fail"
+UNCERTAIN = "uncertain"
+
+URL_RE = re.compile(r'https?://[^\s)\]>"\']+')
+LINK_RE = re.compile(r'\[[^\]]*\]\([^)]+\)')
+HEADING_RE = re.compile(r'^\s{0,3}(#{1,6}|＃)\s', re.MULTILINE)
+LIST_ITEM_RE = re.compile(r'^\s*([-*+]|\d+[.)])\s+', re.MULTILINE)
+FENCE_RE = re.compile(r'^\s{0,3}(```|~~~)', re.MULTILINE)
+CODE_RE = re.compile(r'```.*?```|`[^`\n]+`', re.DOTALL)
+NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)*')
+JAPANESE_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]')
+LATIN_RE = re.compile(r'[A-Za-z]')
+
+# The translation prompt drops references to the source newsletter
+IGNORED_URL_RE = re.compile(r'https?://(?:[\w-]+\.)*smol\.ai\b')
+
+# A translated section must be mostly Japanese once URLs and code are removed
+MIN_JAPANESE_RATIO = 0.05
+PASS_JAPANESE_RATIO = 0.3
+
+# Sections with fewer source letters than this are not judged on language
+MIN_PROSE_LETTERS = 40
+
+# Recall of source URLs / numbers that the translation must keep
+FAIL_URL_RECALL = 0.8
+PASS_NUMBER_RECALL = 0.9
+
+# Japanese runs roughly 0.3-0.6 characters per English character
+MIN_LENGTH_RATIO = 0.15
+PASS_LENGTH_RATIO = (0.25, 1.5)
+
+
+class StructureCheck:
+    """Verdict of a structural comparison with the reasons behind it."""
+
+    def __init__(self, verdict: str, reasons: List[str], metrics: Dict[str, float]) -> None:
+        self.verdict = verdict
+        self.reasons = reasons
+        self.metrics = metrics
+
+    def __repr__(self) -> str:
+        return f"StructureCheck({self.verdict!r}, {self.reasons!r})"
+
+
+def extract_urls(text: str) -> Set[str]:
+    """Return the set of URLs in text, ignoring links to the source newsletter."""
+    return {
+        url.rstrip('.,;:') for url in URL_RE.findall(text) if not IGNORED_URL_RE.match(url)
+    }
+
+
+def prose_text(text: str) -> str:
+    """Strip code and URLs so only human-readable text remains."""
+    return URL_RE.sub(' ', CODE_RE.sub(' ', text))
+
+
+def japanese_ratio(text: str) -> float:
+    """Fraction of letters in text that are kana or kanji."""
+    prose = prose_text(text)
+    japanese = len(JAPANESE_RE.findall(prose))
+    latin = len(LATIN_RE.findall(prose))
+    return japanese / (japanese + latin) if japanese + latin else 0.0
+
+
+def count_numbers(text: str) -> Counter:
+    """Count numeric tokens outside URLs, ignoring thousands separators."""
+    return Counter(number.replace(',', '') for number in NUMBER_RE.findall(URL_RE.sub(' ', text)))
+
+
+def recall(expected: Counter, actual: Counter) -> float:
+    """Fraction of expected items (with multiplicity) present in actual."""
+    total = sum(expected.values())
+    if not total:
+        return 1.0
+    return sum(min(count, actual[item]) for item, count in expected.items()) / total
+
+
+def check_structure(source: str, translated: str) -> StructureCheck:
+    """Compare a source section with its translation.
+
+    Returns FAIL when the translation is clearly broken (empty, untranslated,
+    truncated, or missing links, headings or code), PASS when every structural
+    signal lines up, and UNCERTAIN otherwise.
+    """
+    if not translated.strip():
+        return StructureCheck(FAIL, ["empty translation"], {})
+
+    source_urls = extract_urls(source)
+    translated_urls = extract_urls(translated)
+    source_letters = len(LATIN_RE.findall(prose_text(source)))
+    metrics = {
+        "headings": len(HEADING_RE.findall(translated)) - len(HEADING_RE.findall(source)),
+        "links": len(LINK_RE.findall(translated)) - len(LINK_RE.findall(source)),
+        "list_items": len(LIST_ITEM_RE.findall(translated)) - len(LIST_ITEM_RE.findall(source)),
+        "code_fences": len(FENCE_RE.findall(translated)) - len(FENCE_RE.findall(source)),
+        "url_recall": recall(Counter(source_urls), Counter(translated_urls)),
+        "extra_urls": len(translated_urls - source_urls),
+        "number_recall": recall(count_numbers(source), count_numbers(translated)),
+        "japanese_ratio": japanese_ratio(translated),
+        "length_ratio": len(translated.strip()) / max(1, len(source.strip())),
+    }
+    has_prose = source_letters >= MIN_PROSE_LETTERS
+
+    failures = []
+    if has_prose and metrics["japanese_ratio"] < MIN_JAPANESE_RATIO:
+        failures.append(f"not translated (Japanese ratio {metrics['japanese_ratio']:.2f})")
+    if metrics["length_ratio"] < MIN_LENGTH_RATIO:
+        failures.append(f"likely truncated (length ratio {metrics['length_ratio']:.2f})")
+    if metrics["url_recall"] < FAIL_URL_RECALL:
+        failures.append(f"lost URLs (recall {metrics['url_recall']:.2f})")
+    if metrics["code_fences"]:
+        failures.append(f"code fence count off by {metrics['code_fences']}")
+    if abs(metrics["headings"]) > 1:
+        failures.append(f"heading count off by {metrics['headings']}")
+    if failures:
+        return StructureCheck(FAIL, failures, metrics)
+
+    doubts = []
+    for name in ("headings", "links", "list_items"):
+        if metrics[name]:
+            doubts.append(f"{name} count off by {metrics[name]}")
+    if metrics["url_recall"] < 1.0 or metrics["extra_urls"]:
+        doubts.append("URL sets differ")
+    if metrics["number_recall"] < PASS_NUMBER_RECALL:
+        doubts.append(f"numbers changed (recall {metrics['number_recall']:.2f})")
+    if has_prose and metrics["japanese_ratio"] < PASS_JAPANESE_RATIO:
+        doubts.append(f"low Japanese ratio {metrics['japanese_ratio']:.2f}")
+    low, high = PASS_LENGTH_RATIO
+    if has_prose and not low <= metrics["length_ratio"] <= high:
+        doubts.append(f"unusual length ratio {metrics['length_ratio']:.2f}")
+    if doubts:
+        return StructureCheck(UNCERTAIN, doubts, metrics)
+
+    return StructureCheck(PASS, [], metrics)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Shared stylesheet for newsletter pages.
+Publishes templates/style.css under a content-fingerprinted name so pages can
+link one long-cacheable file, and extracts the critical above-the-fold rules
+for optional inlining.
+"""
+
+import glob
+import os
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+
+from build_manifest import write_if_changed
+from ledger import content_hash
+
+STYLESHEET_SOURCE = "templates/style.css"
+ASSETS_DIR = "docs/assets"
+
+# Rules needed to paint the navigation and the first screen of an issue
+CRITICAL_SELECTORS = {
+    "*", "body", "nav", ".site-title", ".nav-links", ".nav-links a",
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "a", ".article-title",
+}
+
+
+@lru_cache(maxsize=None)
+def load_stylesheet() -> str:
+    """Read the page stylesheet source."""
+    with open(STYLESHEET_SOURCE, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def stylesheet_name(css: str) -> str:
+    """Return the fingerprinted file name for a stylesheet."""
+    return f"style.{content_hash(css)[:10]}.css"
+
+
+def inline_critical_enabled() -> bool:
+    """Whether pages inline the critical rules (INLINE_CRITICAL_CSS=1)."""
+    return os.environ.get("INLINE_CRITICAL_CSS", "0") not in ("", "0", "false", "no")
+
+
+def css_blocks(css: str) -> Iterator[Tuple[str, str]]:
+    """Yield (prelude, body) for each top-level block of a stylesheet."""
+    depth = 0
+    start = 0
+    prelude = ""
+    for i, char in enumerate(css):
+        if char == "{":
+            if depth == 0:
+                prelude = css[start:i].strip()
+                start = i + 1
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:i]
+                start = i + 1
+
+
+def critical_css(css: str) -> str:
+    """Keep only rules (including inside @media) that match CRITICAL_SELECTORS."""
+    kept: List[str] = []
+    for prelude, body in css_blocks(css):
+        if prelude.startswith("@media"):
+            inner = critical_css(body)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+            continue
+        selectors = {selector.strip() for selector in prelude.split(",")}
+        if selectors & CRITICAL_SELECTORS:
+            declarations = " ".join(line.strip() for line in body.strip().splitlines())
+            kept.append(f"{prelude}{{{declarations}}}")
+    return "".join(kept)
+
+
+def stylesheet_head(root: str = "..") -> str:
+    """Return the <head> markup that loads the stylesheet from a page.
+
+    By default the page links the fingerprinted file. With
+    INLINE_CRITICAL_CSS=1 the critical rules are inlined and the full file is
+    loaded without blocking the first paint.
+    """
+    css = load_stylesheet()
+    href = f"{root}/assets/{stylesheet_name(css)}"
+    if not inline_critical_enabled():
+        return f'<link rel="stylesheet" href="{href}">'
+    return (
+        f"<style>{critical_css(css)}</style>\n"
+        f'    <link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        f'    <noscript><link rel="stylesheet" href="{href}"></noscript>'
+    )
+
+
+def publish_stylesheet(prune: bool = False) -> str:
+    """Write the fingerprinted stylesheet to docs/assets and return its path.
+
+    With prune, older fingerprinted copies are deleted; only do that once
+    every page links the current one.
+    """
+    css = load_stylesheet()
+    path = os.path.join(ASSETS_DIR, stylesheet_name(css))
+    write_if_changed(path, css)
+    if prune:
+        # Also matches precompressed .gz/.br siblings
+        for old_path in glob.glob(os.path.join(ASSETS_DIR, "style.*.css*")):
+            if not old_path.startswith(path):
+                os.remove(old_path)
+    return path
+
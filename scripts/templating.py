@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Jinja page templates for the static site.
+Loads the shared layout, partials and page templates from templates/ into one
+environment, so each template is compiled once per process, and keeps the
+compiled bytecode in a cache directory so later runs and rebuild workers skip
+compiling altogether.
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, List, Set
+
+import jinja2
+import jinja2.meta
+from markupsafe import Markup
+
+from archive_index import tag_slug
+from ledger import content_hash
+from stylesheet import stylesheet_head
+
+TEMPLATE_DIR = "templates"
+
+# Compiled template bytecode; safe to delete at any time
+BYTECODE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", ".cache/jinja")
+
+
+@lru_cache(maxsize=None)
+def template_environment() -> jinja2.Environment:
+    """Return the shared template environment, creating it on first use."""
+    os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=jinja2.FileSystemBytecodeCache(BYTECODE_CACHE_DIR),
+        autoescape=jinja2.select_autoescape(["html", "xml"]),
+        # Templates only change between runs, so skip the per-render mtime check
+        auto_reload=False,
+    )
+    env.globals["stylesheet_head"] = lambda root="..": Markup(stylesheet_head(root))
+    env.globals["tag_slug"] = tag_slug
+    return env
+
+
+def render_template(name: str, **context: Any) -> str:
+    """Render a template; values passed as content are inserted unescaped."""
+    if "content" in context:
+        context["content"] = Markup(context["content"])
+    return template_environment().get_template(name).render(**context)
+
+
+def template_dependencies(name: str) -> List[str]:
+    """Return name and every template it extends, includes or imports, recursively."""
+    env = template_environment()
+    seen: Set[str] = set()
+    pending = [name]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        source = env.loader.get_source(env, current)[0]
+        for referenced in jinja2.meta.find_referenced_templates(env.parse(source)):
+            # Dynamic references (None) do not occur in these templates
+            if referenced is not None:
+                pending.append(referenced)
+    return sorted(seen)
+
+
+@lru_cache(maxsize=None)
+def templates_version(name: str) -> str:
+    """Hash of one template and the templates it uses, for invalidating pages built from it.
+
+    Editing another page's template leaves this version unchanged.
+    """
+    sources = []
+    for dependency in template_dependencies(name):
+        with open(os.path.join(TEMPLATE_DIR, dependency), "r", encoding="utf-8") as f:
+            sources.append(f"{dependency}\n{f.read()}")
+    return content_hash("\n".join(sources) + jinja2.__version__)
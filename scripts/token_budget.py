@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Token budget planner for translation.
+Counts an issue's tokens locally, reproduces the requests translate.py would
+send at several chunk sizes, and estimates input and output tokens, cost and
+wall-clock time for each. Picks the chunk size and concurrency that fit the
+deployment's TPM/RPM limits. Makes no API calls.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; counts fall back to the character estimate
+    tiktoken = None
+
+from html_sections import load_sections
+from rate_limit import env_max_concurrency, env_rpm, env_tpm
+from translate import (
+    MAX_COMPLETION_TOKENS,
+    SEGMENT_MARKER_PROMPT,
+    completion_budget,
+    estimate_tokens,
+    group_pending,
+    join_segments,
+    load_translation_prompt,
+    read_markdown_file,
+    segment_markdown,
+)
+from translation_cache import DEFAULT_CACHE_PATH, TranslationCache, hash_prompt, open_cache_from_env
+
+# Chunk sizes (estimated input tokens, as --chunk-tokens) the planner compares
+CHUNK_OPTIONS = (1000, 1500, 2000, 3000, 4000, 6000)
+
+# Plans this close to the fastest are compared on cost instead
+TIME_TOLERANCE = 1.1
+
+
+def env_float(name: str, default: float) -> float:
+    """Read an optional number from the environment."""
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+class Limits:
+    """Deployment rate limits, prices and throughput, from AOAI_* variables.
+
+    Price defaults are GPT-5 list prices in USD per million tokens; set them
+    for the actual deployment.
+    """
+
+    def __init__(self) -> None:
+        self.tpm = env_tpm()
+        self.rpm = env_rpm()
+        # Upper bound on the concurrency the planner suggests, as for the rate limiter
+        self.max_concurrency = env_max_concurrency()
+        self.input_cost = env_float("AOAI_INPUT_COST_PER_M", 1.25)
+        self.output_cost = env_float("AOAI_OUTPUT_COST_PER_M", 10.0)
+        self.output_rate = env_float("AOAI_OUTPUT_TOKENS_PER_SEC", 50.0)
+        self.first_token = env_float("AOAI_FIRST_TOKEN_SECONDS", 2.0)
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed, else with estimate_tokens."""
+
+    def __init__(self, encoding: Optional[str] = None) -> None:
+        self.encoding = None
+        self.name = "estimate"
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding(encoding or os.environ.get("TOKENIZER_ENCODING", "o200k_base"))
+                self.name = self.encoding.name
+            except Exception as e:
+                print(f"tiktoken encoding unavailable ({e}); using the character estimate", file=sys.stderr)
+        # Japanese output per English input token; the character estimate counts kana and kanji as one each
+        self.output_ratio = env_float("TRANSLATE_OUTPUT_RATIO", 1.4 if self.encoding else 2.5)
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return estimate_tokens(text)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+class Plan:
+    """Estimated requests, tokens, cost and time for one chunk size."""
+
+    def __init__(self, chunk_tokens: int, segments: int, cached: int) -> None:
+        self.chunk_tokens = chunk_tokens
+        self.segments = segments
+        self.cached = cached
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        # Prompt plus max_tokens: what Azure reserves against the TPM limit
+        self.reserved_tokens = 0
+        self.durations: List[float] = []
+        self.truncation_risk = 0
+        self.concurrency = 1
+        self.seconds = 0.0
+        self.limited_by = "latency"
+        self.cost = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "chunk_tokens": self.chunk_tokens,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "segments": self.segments,
+            "cached_segments": self.cached,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost": round(self.cost, 4),
+            "seconds": round(self.seconds, 1),
+            "limited_by": self.limited_by,
+            "truncation_risk": self.truncation_risk,
+        }
+
+
+def makespan(durations: List[float], workers: int) -> float:
+    """Wall time when requests start in order on the first free of workers slots."""
+    free = [0.0] * max(1, workers)
+    for duration in durations:
+        slot = free.index(min(free))
+        free[slot] += duration
+    return max(free)
+
+
+def schedule(plan: Plan, limits: Limits, concurrency: Optional[int] = None) -> None:
+    """Pick the highest concurrency the rate limits sustain (or use the given one) and estimate the wall time."""
+    if not plan.requests:
+        return
+    if concurrency:
+        plan.concurrency = max(1, min(concurrency, plan.requests))
+    else:
+        mean_duration = sum(plan.durations) / plan.requests
+        mean_reserved = plan.reserved_tokens / plan.requests
+        # Each slot issues one request per mean_duration seconds
+        by_tpm = limits.tpm * mean_duration / (60 * mean_reserved)
+        by_rpm = limits.rpm * mean_duration / 60
+        plan.concurrency = max(1, min(int(by_tpm), int(by_rpm), limits.max_concurrency, plan.requests))
+
+    bounds = {
+        "latency": makespan(plan.durations, plan.concurrency),
+        "TPM": 60 * plan.reserved_tokens / limits.tpm,
+        "RPM": 60 * plan.requests / limits.rpm,
+    }
+    plan.limited_by = max(bounds, key=lambda name: bounds[name])
+    plan.seconds = bounds[plan.limited_by]
+
+
+def evaluate(
+    content: str,
+    chunk_tokens: int,
+    system_prompt: str,
+    counter: TokenCounter,
+    limits: Limits,
+    sections: Optional[List[str]] = None,
+    cached: Optional[Callable[[str], bool]] = None,
+    concurrency: Optional[int] = None,
+) -> Plan:
+    """Estimate the requests translate.py would send for one chunk size.
+
+    concurrency fixes the requests in flight instead of deriving them from the limits.
+    """
+    segments = segment_markdown(content, chunk_tokens, sections)
+    translations: List[Optional[str]] = [
+        "" if cached is not None and cached(segment) else None for segment in segments
+    ]
+    plan = Plan(chunk_tokens, len(segments), sum(1 for value in translations if value is not None))
+    prompt_tokens = counter.count(system_prompt)
+    marker_prompt_tokens = counter.count(SEGMENT_MARKER_PROMPT)
+
+    for group in group_pending(segments, translations, chunk_tokens):
+        body = join_segments([segments[index] for index in group])
+        body_tokens = counter.count(body)
+        input_tokens = prompt_tokens + body_tokens + (marker_prompt_tokens if len(group) > 1 else 0)
+        output_tokens = math.ceil(body_tokens * counter.output_ratio)
+        max_tokens = completion_budget(body)
+        plan.requests += 1
+        plan.input_tokens += input_tokens
+        plan.output_tokens += output_tokens
+        plan.reserved_tokens += input_tokens + max_tokens
+        plan.durations.append(limits.first_token + output_tokens / limits.output_rate)
+        if output_tokens > max_tokens:
+            # translate_chunk would hit the limit, then split and resend the chunk
+            plan.truncation_risk += 1
+
+    plan.cost = (plan.input_tokens * limits.input_cost + plan.output_tokens * limits.output_cost) / 1_000_000
+    schedule(plan, limits, concurrency)
+    return plan
+
+
+def plan_translation(
+    content: str,
+    system_prompt: str,
+    counter: Optional[TokenCounter] = None,
+    limits: Optional[Limits] = None,
+    sections: Optional[List[str]] = None,
+    cached: Optional[Callable[[str], bool]] = None,
+    options: tuple = CHUNK_OPTIONS,
+    concurrency: Optional[int] = None,
+) -> List[Plan]:
+    """Evaluate every chunk size in options; the chosen plan comes first.
+
+    Plans that risk truncated completions lose to plans that do not; among
+    the rest, the cheapest plan within TIME_TOLERANCE of the fastest wins.
+    With concurrency, every plan is estimated at that many requests in flight.
+    """
+    counter = counter or TokenCounter()
+    limits = limits or Limits()
+    plans = [
+        evaluate(content, size, system_prompt, counter, limits, sections, cached, concurrency)
+        for size in options
+    ]
+    safe = [plan for plan in plans if not plan.truncation_risk] or plans
+    fastest = min(plan.seconds for plan in safe)
+    chosen = min(
+        (plan for plan in safe if plan.seconds <= fastest * TIME_TOLERANCE),
+        key=lambda plan: (plan.truncation_risk, plan.cost, plan.seconds),
+    )
+    return [chosen] + [plan for plan in plans if plan is not chosen]
+
+
+def format_report(plans: List[Plan], content: str, counter: TokenCounter, limits: Limits) -> str:
+    """Render the dry-run report for a list of plans (the chosen one first)."""
+    chosen = plans[0]
+    lines = [
+        f"Issue: ~{counter.count(content)} tokens ({counter.name}), output ratio {counter.output_ratio}",
+        f"Deployment: {limits.tpm:.0f} TPM, {limits.rpm:.0f} RPM, "
+        f"${limits.input_cost}/M input, ${limits.output_cost}/M output, "
+        f"{limits.output_rate:.0f} output tokens/s, max_tokens cap {MAX_COMPLETION_TOKENS}",
+        "",
+        f"  {'chunk':>6} {'conc':>4} {'reqs':>4} {'cached':>6} {'input':>8} {'output':>8} "
+        f"{'cost $':>8} {'time s':>7} {'limit':>7} {'trunc':>5}",
+    ]
+    for plan in sorted(plans, key=lambda plan: plan.chunk_tokens):
+        lines.append(
+            f"{'*' if plan is chosen else ' '} {plan.chunk_tokens:>6} {plan.concurrency:>4} {plan.requests:>4} "
+            f"{plan.cached:>6} {plan.input_tokens:>8} {plan.output_tokens:>8} {plan.cost:>8.4f} "
+            f"{plan.seconds:>7.1f} {plan.limited_by:>7} {plan.truncation_risk:>5}"
+        )
+    lines += [
+        "",
+        f"Plan: --chunk-tokens {chosen.chunk_tokens} --concurrency {chosen.concurrency} "
+        f"({chosen.requests} requests, ~${chosen.cost:.4f}, ~{chosen.seconds:.0f}s)",
+    ]
+    return "\n".join(lines)
+
+
+def cache_lookup(cache: TranslationCache, system_prompt: str) -> Callable[[str], bool]:
+    """Check segments against the translation memory without touching it."""
+    prompt_hash = hash_prompt(system_prompt)
+    deployment = os.environ.get("AOAI_DEPLOYMENT", "gpt4-1-translation")
+    return lambda segment: cache.peek(segment, prompt_hash, deployment) is not None
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Estimate translation tokens, cost and time, and pick a chunking plan (no API calls)",
+        epilog="Example: python token_budget.py output/2024-01-15_issue.md",
+    )
+    parser.add_argument("markdown_file", help="Converted (or pruned) Markdown to plan")
+    parser.add_argument(
+        "--chunk-tokens", type=int, nargs="+", default=list(CHUNK_OPTIONS),
+        help=f"Chunk sizes to compare (default: {' '.join(map(str, CHUNK_OPTIONS))})",
+    )
+    parser.add_argument(
+        "--concurrency", type=int,
+        help="Estimate at this many requests in flight (default: the most the limits sustain)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Ignore the translation memory when counting requests",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the plans as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main function to print the dry-run report."""
+    args = parse_args()
+    content = read_markdown_file(args.markdown_file)
+    if not content.strip():
+        print("Error: Markdown file is empty")
+        sys.exit(1)
+
+    records = load_sections(args.markdown_file, content)
+    sections = [record["markdown"] for record in records] if records else None
+    system_prompt = load_translation_prompt()
+    cache = None
+    # Only an existing store is consulted; a dry run never creates one
+    if not args.no_cache and os.path.exists(os.environ.get("TRANSLATION_CACHE_PATH", DEFAULT_CACHE_PATH)):
+        cache = open_cache_from_env(estimate_tokens)
+    try:
+        counter = TokenCounter()
+        limits = Limits()
+        plans = plan_translation(
+            content, system_prompt, counter, limits, sections,
+            cache_lookup(cache, system_prompt) if cache is not None else None,
+            tuple(args.chunk_tokens), args.concurrency,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if args.json:
+        print(json.dumps({"chosen": plans[0].to_dict(), "plans": [plan.to_dict() for plan in plans]}, indent=1))
+    else:
+        print(format_report(plans, content, counter, limits))
+
+
+if __name__ == "__main__":
+    main()
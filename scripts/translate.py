@@ -4,16 +4,56 @@ Translation script using Azure OpenAI.
 Translates English markdown content to Japanese with quality checks.
 """
 
+import argparse
+import hashlib
+import json
 import os
+import re
 import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from openai import AzureOpenAI
 from dotenv import load_dotenv
 
+from html_sections import load_sections
+from ledger import Ledger, content_hash, guid_for_file, open_ledger, run_stage
+from markdown_sections import HEADING_RE, RECAP_RE, estimate_tokens, split_blocks, split_sections
+from masking import MASK_PROMPT, Mask, MaskStats
+from rate_limit import shared_limiter
+from structure_check import FAIL, PASS, check_structure
+from translation_cache import TranslationCache, hash_prompt, open_cache_from_env
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Hard ceiling on completion tokens for a single request
+MAX_COMPLETION_TOKENS = int(os.environ.get("AOAI_MAX_COMPLETION_TOKENS", 16384))
+
+# Default chunk budget (estimated input tokens) for parallel translation
+DEFAULT_CHUNK_TOKENS = 3000
+
+# Default number of chunks translated at the same time
+DEFAULT_CONCURRENCY = 4
+
+# Minimum quality score for a translated chunk
+QUALITY_THRESHOLD = 0.95
+
+# Separator placed between segments that share one request, so the translation
+# can be split back into per-segment entries for the translation cache
+SEGMENT_MARKER = '<!-- seg -->'
+SEGMENT_MARKER_RE = re.compile(r'\s*<!--\s*seg\s*-->\s*')
+SEGMENT_MARKER_PROMPT = f"""
+
+区切りマーカー：
+- `{SEGMENT_MARKER}` は区切りマーカーです。翻訳せず、同じ位置にそのまま出力してください"""
+
+
+class TranslationTruncated(Exception):
+    """Raised when a completion stops because it ran out of max_tokens."""
+
 
 def load_translation_prompt() -> str:
     """Load the translation system prompt."""
@@ -38,50 +78,130 @@ def create_azure_client() -> AzureOpenAI:
         print("Error: AOAI_ENDPOINT and AOAI_KEY environment variables are required")
         sys.exit(1)
     
+    # Throttled requests are retried by the shared rate limiter, not the SDK
     return AzureOpenAI(
         azure_endpoint=endpoint,
         api_key=api_key,
-        api_version="2025-04-01-preview"
+        api_version="2025-04-01-preview",
+        max_retries=0,
     )
 
 
-def translate_with_retry(client: AzureOpenAI, content: str, system_prompt: str, max_retries: int = 3) -> str:
-    """Translate content with exponential backoff retry."""
-    deployment_name = os.environ.get("AOAI_DEPLOYMENT", "gpt4-1-translation")
-    
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=deployment_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": content}
-                ],
-                temperature=0.2,
-                max_tokens=16384,
-                top_p=1.0,
-                frequency_penalty=0,
-                presence_penalty=0
+def build_completion_request(content: str, system_prompt: str, max_tokens: int) -> Dict[str, Any]:
+    """Build the chat completion arguments shared by all translation requests."""
+    return {
+        "model": os.environ.get("AOAI_DEPLOYMENT", "gpt4-1-translation"),
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": content}
+        ],
+        "temperature": 0.2,
+        "max_tokens": max_tokens,
+        "top_p": 1.0,
+        "frequency_penalty": 0,
+        "presence_penalty": 0,
+    }
+
+
+def request_tokens(content: str, system_prompt: str, max_tokens: int) -> int:
+    """Tokens a request counts against the TPM quota: the prompt plus max_tokens."""
+    return estimate_tokens(system_prompt) + estimate_tokens(content) + max_tokens
+
+
+def translate_with_retry(
+    client: AzureOpenAI,
+    content: str,
+    system_prompt: str,
+    max_retries: Optional[int] = None,
+    max_tokens: int = MAX_COMPLETION_TOKENS,
+    fail_on_truncation: bool = False,
+) -> str:
+    """Translate content through the shared rate limiter, retrying when throttled.
+
+    When fail_on_truncation is set, a completion cut off by max_tokens raises
+    TranslationTruncated instead of being returned partially.
+    """
+    def request() -> str:
+        response = client.chat.completions.create(
+            **build_completion_request(content, system_prompt, max_tokens)
+        )
+        
+        choice = response.choices[0]
+        if fail_on_truncation and choice.finish_reason == "length":
+            raise TranslationTruncated(
+                f"Completion hit max_tokens={max_tokens}"
             )
-            
-            translated_content = response.choices[0].message.content
-            if not translated_content:
-                raise Exception("Empty response from translation API")
-            
-            return translated_content.strip()
-            
-        except Exception as e:
-            if "429" in str(e) and attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"Rate limit hit, waiting {wait_time} seconds before retry...")
-                time.sleep(wait_time)
+        
+        translated_content = choice.message.content
+        if not translated_content:
+            raise Exception("Empty response from translation API")
+        
+        return translated_content.strip()
+    
+    try:
+        return shared_limiter().call(
+            request_tokens(content, system_prompt, max_tokens), request, max_retries=max_retries
+        )
+    except TranslationTruncated:
+        raise
+    except Exception as e:
+        print(f"Translation failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def stream_with_retry(
+    client: AzureOpenAI,
+    content: str,
+    system_prompt: str,
+    on_delta: Callable[[str], None],
+    on_reset: Callable[[], None],
+    max_retries: Optional[int] = None,
+    max_tokens: int = MAX_COMPLETION_TOKENS,
+) -> str:
+    """Stream a translation, passing each text delta to on_delta as it arrives.
+
+    The request holds a rate limiter slot until the stream ends. Before a
+    retry on_reset is called so the caller can discard partial output.
+    A completion cut off by max_tokens raises TranslationTruncated.
+    """
+    def request() -> str:
+        parts: List[str] = []
+        stream = client.chat.completions.create(
+            stream=True, **build_completion_request(content, system_prompt, max_tokens)
+        )
+        
+        finish_reason = None
+        for event in stream:
+            # Azure sends content filter results as events without choices
+            if not event.choices:
                 continue
-            else:
-                print(f"Translation failed after {attempt + 1} attempts: {e}")
-                sys.exit(1)
+            choice = event.choices[0]
+            delta = choice.delta.content if choice.delta else None
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+        
+        if finish_reason == "length":
+            raise TranslationTruncated(f"Completion hit max_tokens={max_tokens}")
+        
+        translated_content = ''.join(parts)
+        if not translated_content.strip():
+            raise Exception("Empty response from translation API")
+        
+        return translated_content.strip()
     
-    print("Translation failed after all retries")
-    sys.exit(1)
+    try:
+        return shared_limiter().call(
+            request_tokens(content, system_prompt, max_tokens), request,
+            on_retry=on_reset, max_retries=max_retries,
+        )
+    except TranslationTruncated:
+        raise
+    except Exception as e:
+        print(f"Translation failed: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 def quality_check(client: AzureOpenAI, original: str, translated: str) -> float:
@@ -106,29 +226,796 @@ def quality_check(client: AzureOpenAI, original: str, translated: str) -> float:
 
 スコア："""
     
+    prompt = quality_prompt.format(original=original, translated=translated)
     try:
-        response = client.chat.completions.create(
-            model=deployment_name,
-            messages=[
-                {"role": "user", "content": quality_prompt.format(original=original, translated=translated)}
-            ],
-            temperature=0.1,
-            max_tokens=100
+        response = shared_limiter().call(
+            estimate_tokens(prompt) + 100,
+            lambda: client.chat.completions.create(
+                model=deployment_name,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                max_tokens=100
+            ),
         )
         
         score_text = response.choices[0].message.content.strip()
-        try:
-            score = float(score_text)
-            return score
-        except ValueError:
-            print(f"Invalid score format: {score_text}")
+        match = re.search(r'\d+(?:\.\d+)?', score_text)
+        if not match:
+            print(f"Invalid score format: {score_text}", file=sys.stderr)
             return 0.0
+        return min(1.0, float(match.group()))
             
     except Exception as e:
-        print(f"Quality check failed: {e}")
+        print(f"Quality check failed: {e}", file=sys.stderr)
         return 0.0
 
 
+def split_oversized(section: str, max_tokens: int) -> List[str]:
+    """Break a section larger than max_tokens into paragraph, then line, pieces."""
+    pieces = []
+    for block in split_blocks(section):
+        if estimate_tokens(block) <= max_tokens:
+            pieces.append(block)
+            continue
+        # A single huge block (usually a long bullet list): fall back to lines
+        pieces.extend(pack_pieces(block.split('\n'), max_tokens, separator='\n'))
+    
+    return pack_pieces(pieces, max_tokens, separator='\n\n')
+
+
+def pack_pieces(pieces: List[str], max_tokens: int, separator: str) -> List[str]:
+    """Greedily merge consecutive pieces into chunks of at most max_tokens."""
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append(separator.join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    
+    if current:
+        chunks.append(separator.join(current))
+    
+    return chunks
+
+
+def segment_markdown(
+    content: str, max_tokens: int = DEFAULT_CHUNK_TOKENS, sections: Optional[List[str]] = None
+) -> List[str]:
+    """Split markdown into ordered segments that each fit within max_tokens.
+
+    sections, when the converter already split the content, are used instead
+    of splitting it again.
+    """
+    segments = []
+    for section in split_sections(content) if sections is None else sections:
+        if estimate_tokens(section) > max_tokens:
+            segments.extend(split_oversized(section, max_tokens))
+        else:
+            segments.append(section)
+    
+    return segments
+
+
+def completion_budget(chunk: str) -> int:
+    """Pick max_tokens for a chunk: Japanese output runs about 2-3x the English input."""
+    return min(MAX_COMPLETION_TOKENS, max(1024, estimate_tokens(chunk) * 3))
+
+
+def masking_enabled() -> bool:
+    """Check whether URLs, code and handles should be masked before translation."""
+    return os.environ.get("TRANSLATE_MASKING", "1").lower() not in ("0", "false", "no")
+
+
+# Masking counters for this process, reported next to the rate limiter summary
+MASK_STATS = MaskStats()
+
+
+def prepare_body(chunk: str, system_prompt: str, use_mask: bool) -> Tuple[str, str, Optional[Mask]]:
+    """Mask a request body if enabled, returning (body, prompt, mask)."""
+    if not use_mask or not masking_enabled():
+        return chunk, system_prompt, None
+    mask = Mask()
+    body = mask.apply(chunk)
+    if not mask.values:
+        return chunk, system_prompt, None
+    MASK_STATS.add(mask)
+    return body, system_prompt + MASK_PROMPT, mask
+
+
+def translate_chunk(
+    client: AzureOpenAI, chunk: str, system_prompt: str, use_mask: bool = True
+) -> str:
+    """Translate one chunk, halving it whenever the completion gets truncated.
+
+    URLs, code and handles are masked with placeholders for the request; if
+    any placeholder fails to round-trip the chunk is translated again unmasked.
+    """
+    body, prompt, mask = prepare_body(chunk, system_prompt, use_mask)
+    try:
+        translated = translate_with_retry(
+            client, body, prompt,
+            max_tokens=completion_budget(body),
+            fail_on_truncation=True,
+        )
+    except TranslationTruncated:
+        halves = split_oversized(chunk, max(1, estimate_tokens(chunk) // 2))
+        if len(halves) < 2:
+            print("Error: Chunk cannot be split further without truncation", file=sys.stderr)
+            sys.exit(1)
+        print(f"Chunk truncated, retrying as {len(halves)} smaller chunks...", file=sys.stderr)
+        return '\n\n'.join(
+            translate_chunk(client, half, system_prompt, use_mask) for half in halves
+        )
+    
+    if mask is None:
+        return translated
+    
+    problems = mask.verify(translated)
+    if problems:
+        print(
+            f"Warning: Placeholders did not round-trip ({', '.join(problems[:5])}), "
+            "retranslating unmasked",
+            file=sys.stderr,
+        )
+        MASK_STATS.fallback()
+        return translate_chunk(client, chunk, system_prompt, use_mask=False)
+    
+    return mask.restore(translated)
+
+
+def translate_segments(
+    client: AzureOpenAI, segments: List[str], system_prompt: str, use_mask: bool = True
+) -> Tuple[List[str], bool]:
+    """Translate a group of segments in one request and split the result back.
+
+    Returns the per-segment translations and whether the markers round-tripped.
+    If they did not, the whole translation is returned as the first element.
+    """
+    if len(segments) == 1:
+        return [translate_chunk(client, segments[0], system_prompt, use_mask)], True
+    
+    translated = translate_chunk(
+        client, join_segments(segments), system_prompt + SEGMENT_MARKER_PROMPT, use_mask
+    )
+    return split_translation(translated, len(segments))
+
+
+def join_segments(segments: List[str]) -> str:
+    """Join segments into one request body separated by segment markers."""
+    return f'\n\n{SEGMENT_MARKER}\n\n'.join(segments)
+
+
+def split_translation(translated: str, count: int) -> Tuple[List[str], bool]:
+    """Split a marked-up translation back into count segments."""
+    parts = [part.strip() for part in SEGMENT_MARKER_RE.split(translated)]
+    
+    if len(parts) != count:
+        print(
+            f"Warning: Segment markers did not round-trip ({len(parts)}/{count}), "
+            "not caching this chunk",
+            file=sys.stderr,
+        )
+        return [SEGMENT_MARKER_RE.sub('\n\n', translated).strip()], False
+    
+    return parts, True
+
+
+def group_pending(
+    segments: List[str], translations: List[Optional[str]], max_tokens: int
+) -> List[List[int]]:
+    """Pack runs of untranslated segment indexes into token-bounded request groups."""
+    groups: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    
+    for index, segment in enumerate(segments):
+        if translations[index] is not None:
+            # A cached segment ends the run so groups stay contiguous
+            if current:
+                groups.append(current)
+                current, current_tokens = [], 0
+            continue
+        
+        segment_tokens = estimate_tokens(segment)
+        if current and current_tokens + segment_tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += segment_tokens
+    
+    if current:
+        groups.append(current)
+    
+    return groups
+
+
+def section_label(source: str) -> str:
+    """Describe a chunk in reports by its first heading or opening words."""
+    lines = [line.strip() for line in source.split('\n') if line.strip()]
+    for line in lines:
+        if HEADING_RE.match(line) or RECAP_RE.match(line):
+            return line.lstrip('#＃* ').rstrip('* ')[:60]
+    return lines[0][:60] if lines else ''
+
+
+def pool_size(concurrency: int) -> int:
+    """Worker threads for a pool whose requests the shared rate limiter admits.
+
+    The pool is sized for the limiter's ceiling so concurrency can ramp up;
+    the limiter decides how many requests are actually in flight. Its
+    starting point is set once per process by the entry point
+    (set_concurrency), not per file, so issues translated side by side do
+    not reset each other's adaptation.
+    """
+    return max(1, concurrency, shared_limiter().max_concurrency)
+
+
+class QualityGate:
+    """Scores translated chunks on a background pool while translation continues.
+
+    Chunks are submitted as soon as they are translated. Each one first goes
+    through the local structural check: clear passes skip the LLM judge and
+    clear failures are retranslated straight away. Only uncertain chunks are
+    sent to quality_check, and only chunks below the threshold are
+    retranslated, keeping whichever version scored better.
+    """
+
+    def __init__(
+        self,
+        client: AzureOpenAI,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        threshold: float = QUALITY_THRESHOLD,
+        use_heuristics: bool = True,
+    ) -> None:
+        self.client = client
+        self.threshold = threshold
+        self.use_heuristics = use_heuristics
+        self.executor = ThreadPoolExecutor(max_workers=pool_size(concurrency))
+        self.sources: Dict[int, str] = {}
+        self.futures: Dict[int, Future] = {}
+        self.sections: List[Dict[str, Any]] = []
+
+    def submit(
+        self,
+        key: int,
+        source: str,
+        translation: str,
+        retranslate: Callable[[int], Tuple[List[str], bool]],
+    ) -> None:
+        """Queue a translated chunk for scoring (and retranslation if it fails)."""
+        self.sources[key] = source
+        self.futures[key] = self.executor.submit(
+            self._assess, key, source, translation, retranslate
+        )
+
+    def review(self, results: Dict[int, Tuple[List[str], bool]]) -> Dict[int, bool]:
+        """Wait for all chunks to be assessed and report which passed.
+
+        results maps each submitted key to its translation and is updated in
+        place when a retranslation scored better.
+        """
+        self.sections = []
+        passed = {}
+        for key in sorted(self.futures):
+            result, score, method, reasons = self.futures[key].result()
+            if result is not None:
+                results[key] = result
+            passed[key] = score >= self.threshold
+            self.sections.append({
+                "section": section_label(self.sources[key]),
+                "tokens": estimate_tokens(self.sources[key]),
+                "score": score,
+                "method": method,
+                "reasons": reasons,
+                "retranslated": result is not None,
+            })
+        return passed
+
+    def _score(self, source: str, translation: str) -> Tuple[float, str, List[str]]:
+        """Score a chunk, using the LLM judge only when the local check is unsure."""
+        if self.use_heuristics:
+            check = check_structure(source, translation)
+            if check.verdict == PASS:
+                return 1.0, "heuristic", []
+            if check.verdict == FAIL:
+                return 0.0, "heuristic", check.reasons
+            reasons = check.reasons
+        else:
+            reasons = []
+        return quality_check(self.client, source, translation), "llm", reasons
+
+    def _assess(
+        self,
+        key: int,
+        source: str,
+        translation: str,
+        retranslate: Callable[[int], Tuple[List[str], bool]],
+    ) -> Tuple[Optional[Tuple[List[str], bool]], float, str, List[str]]:
+        score, method, reasons = self._score(source, translation)
+        if score >= self.threshold:
+            return None, score, method, reasons
+        
+        print(
+            f"Quality check: retranslating '{section_label(source)}' "
+            f"({method} score {score:.2f})",
+            file=sys.stderr,
+        )
+        result = retranslate(key)
+        new_score, new_method, new_reasons = self._score(source, '\n\n'.join(result[0]))
+        if new_score > score:
+            return result, new_score, new_method, new_reasons
+        return None, score, method, reasons
+
+    @property
+    def score(self) -> float:
+        """Issue score: chunk scores weighted by their source token counts.
+
+        Chunks settled by a clean structural check count as 1.0.
+        """
+        total_tokens = sum(section["tokens"] for section in self.sections)
+        if not total_tokens:
+            return 1.0
+        return sum(section["score"] * section["tokens"] for section in self.sections) / total_tokens
+
+    def summary(self) -> str:
+        """Format the issue score and per-section breakdown for the log."""
+        judged = sum(1 for section in self.sections if section["method"] == "llm")
+        lines = [
+            f"Quality score: {self.score:.3f} over {len(self.sections)} chunks "
+            f"({len(self.sections) - judged} settled locally, {judged} sent to the LLM judge)"
+        ]
+        for section in self.sections:
+            flag = "" if section["score"] >= self.threshold else "  (below threshold)"
+            note = " [retranslated]" if section["retranslated"] else ""
+            lines.append(
+                f"  {section['score']:.2f} {section['method']:<9} {section['section']}{note}{flag}"
+            )
+            if section["reasons"] and section["score"] < self.threshold:
+                lines.append(f"       {'; '.join(section['reasons'])}")
+        return '\n'.join(lines)
+
+    def write_report(self, path: str) -> None:
+        """Write the score and per-section breakdown as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "score": self.score,
+                "threshold": self.threshold,
+                "passed": all(section["score"] >= self.threshold for section in self.sections),
+                "sections": self.sections,
+            }, f, indent=2, ensure_ascii=False)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def translate_parallel(
+    client: AzureOpenAI,
+    content: str,
+    system_prompt: str,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: Optional[TranslationCache] = None,
+    quality_gate: Optional[QualityGate] = None,
+    sections: Optional[List[str]] = None,
+) -> str:
+    """Translate markdown chunk by chunk with bounded concurrency, preserving order.
+
+    Segments found in the translation cache are reused without an API call.
+    With a quality gate, each chunk is scored as soon as it is translated and
+    only chunks that pass are stored in the cache. sections are the
+    converter's section texts, if it saved them.
+    """
+    deployment_name = os.environ.get("AOAI_DEPLOYMENT", "gpt4-1-translation")
+    prompt_hash = hash_prompt(system_prompt)
+    segments = segment_markdown(content, max_tokens, sections)
+    translations: List[Optional[str]] = [None] * len(segments)
+    
+    if cache is not None:
+        for index, segment in enumerate(segments):
+            translations[index] = cache.get(segment, prompt_hash, deployment_name)
+    
+    groups = group_pending(segments, translations, max_tokens)
+    print(
+        f"Translating {len(groups)} chunks ({len(segments)} segments) "
+        f"with concurrency {concurrency}...",
+        file=sys.stderr,
+    )
+    
+    def group_sources(key: int) -> List[str]:
+        return [segments[index] for index in groups[key]]
+    
+    results: Dict[int, Tuple[List[str], bool]] = {}
+    with ThreadPoolExecutor(max_workers=pool_size(concurrency)) as executor:
+        futures = {
+            executor.submit(translate_segments, client, group_sources(key), system_prompt): key
+            for key in range(len(groups))
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            results[key] = future.result()
+            if quality_gate is not None:
+                quality_gate.submit(
+                    key, '\n\n'.join(group_sources(key)), '\n\n'.join(results[key][0]),
+                    lambda key: translate_segments(client, group_sources(key), system_prompt),
+                )
+    
+    passed = {key: True for key in results}
+    if quality_gate is not None:
+        passed = quality_gate.review(results)
+    
+    for key, group in enumerate(groups):
+        parts, aligned = results[key]
+        store_translations(
+            translations, segments, group, parts, aligned,
+            cache if passed[key] else None, prompt_hash, deployment_name,
+        )
+    
+    return '\n\n'.join(part for part in translations if part)
+
+
+def store_translations(
+    translations: List[Optional[str]],
+    segments: List[str],
+    group: List[int],
+    parts: List[str],
+    aligned: bool,
+    cache: Optional[TranslationCache],
+    prompt_hash: str,
+    deployment_name: str,
+) -> None:
+    """Place a group's translation into the segment list and the cache."""
+    if not aligned:
+        translations[group[0]] = parts[0]
+        for index in group[1:]:
+            translations[index] = ''
+        return
+    
+    for index, part in zip(group, parts):
+        translations[index] = part
+        if cache is not None:
+            cache.put(segments[index], prompt_hash, deployment_name, part)
+
+
+class StreamSlot:
+    """Collects the streamed output of one request for the in-order writer."""
+
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.deltas: List[str] = []
+        self.generation = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.mask: Optional[Mask] = None
+
+    def append(self, delta: str) -> None:
+        with self.cond:
+            self.deltas.append(delta)
+            self.cond.notify_all()
+
+    def reset(self) -> None:
+        """Discard everything streamed so far (before a retry or fallback)."""
+        with self.cond:
+            self.deltas = []
+            self.generation += 1
+            self.cond.notify_all()
+
+    def restart(self, mask: Optional[Mask]) -> None:
+        """Discard streamed output and switch the placeholder table for the next attempt."""
+        with self.cond:
+            self.deltas = []
+            self.generation += 1
+            self.mask = mask
+            self.cond.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+
+class MarkerFilter:
+    """Cleans streamed text: replaces segment markers and restores placeholders.
+
+    Text that could still grow into a marker or placeholder is held back
+    until the next delta. Leading and trailing whitespace is trimmed so
+    streamed output matches the stripped text of the non-streaming path.
+    """
+
+    def __init__(self, mask: Optional[Mask] = None) -> None:
+        self.mask = mask
+        self.pending = ''
+        self.started = False
+
+    def feed(self, text: str) -> str:
+        self.pending = SEGMENT_MARKER_RE.sub('\n\n', self.pending + text)
+        cut = len(self.pending)
+        # Hold back anything from a '<' that could still grow into a marker
+        angle = self.pending.rfind('<')
+        if angle != -1 and '>' not in self.pending[angle:]:
+            cut = angle
+        # ...and anything that could still grow into a placeholder
+        if self.mask is not None:
+            brace = self.pending.rfind('{{')
+            if brace != -1 and '}}' not in self.pending[brace:]:
+                cut = min(cut, brace)
+            elif self.pending.endswith('{'):
+                cut = min(cut, len(self.pending) - 1)
+        output, self.pending = self.pending[:cut], self.pending[cut:]
+        
+        if not self.started:
+            output = output.lstrip()
+            self.started = bool(output)
+        # Trailing whitespace is only written once more text follows it
+        trimmed = output.rstrip()
+        self.pending = output[len(trimmed):] + self.pending
+        return self._restore(trimmed)
+
+    def flush(self) -> str:
+        output, self.pending = SEGMENT_MARKER_RE.sub('\n\n', self.pending), ''
+        output = output.strip() if not self.started else output.rstrip()
+        return self._restore(output)
+
+    def _restore(self, text: str) -> str:
+        return self.mask.restore(text) if self.mask is not None else text
+
+
+def checkpoint_path(output_path: str) -> str:
+    """Return the checkpoint sidecar path for a streamed output file."""
+    return f"{output_path}.checkpoint.json"
+
+
+def load_checkpoint(output_path: str, fingerprint: str) -> Tuple[int, int]:
+    """Return (completed segments, byte offset) to resume from, or (0, 0)."""
+    try:
+        with open(checkpoint_path(output_path), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0, 0
+    
+    if checkpoint.get("fingerprint") != fingerprint or not os.path.exists(output_path):
+        return 0, 0
+    if os.path.getsize(output_path) < checkpoint.get("offset", 0):
+        return 0, 0
+    
+    return checkpoint.get("completed_segments", 0), checkpoint.get("offset", 0)
+
+
+def save_checkpoint(output_path: str, fingerprint: str, completed: int, total: int, offset: int) -> None:
+    """Atomically record how many segments are safely written to the output file."""
+    path = checkpoint_path(output_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": fingerprint,
+            "completed_segments": completed,
+            "total_segments": total,
+            "offset": offset,
+            "updated_at": time.time(),
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def stream_group(
+    client: AzureOpenAI, slot: StreamSlot, segments: List[str], system_prompt: str
+) -> Tuple[List[str], bool]:
+    """Stream one request group into its slot.
+
+    Falls back to the non-streaming path (which splits the chunk) on
+    truncation, and to an unmasked retranslation if placeholders are lost.
+    """
+    try:
+        if len(segments) == 1:
+            body, prompt = segments[0], system_prompt
+        else:
+            body, prompt = join_segments(segments), system_prompt + SEGMENT_MARKER_PROMPT
+        body, prompt, mask = prepare_body(body, prompt, use_mask=True)
+        slot.restart(mask)
+        try:
+            translated = stream_with_retry(
+                client, body, prompt, slot.append, slot.reset,
+                max_tokens=completion_budget(body),
+            )
+            problems = mask.verify(translated) if mask is not None else []
+            if problems:
+                print(
+                    f"Warning: Placeholders did not round-trip ({', '.join(problems[:5])}), "
+                    "retranslating unmasked",
+                    file=sys.stderr,
+                )
+                MASK_STATS.fallback()
+                slot.restart(None)
+                result = translate_segments(client, segments, system_prompt, use_mask=False)
+                slot.append('\n\n'.join(result[0]))
+            else:
+                if mask is not None:
+                    translated = mask.restore(translated)
+                result = split_translation(translated, len(segments)) if len(segments) > 1 else ([translated], True)
+        except TranslationTruncated:
+            print("Streamed chunk truncated, retranslating in smaller chunks...", file=sys.stderr)
+            slot.restart(None)
+            result = translate_segments(client, segments, system_prompt)
+            slot.append('\n\n'.join(result[0]))
+    except BaseException as e:
+        slot.finish(e)
+        raise
+    
+    slot.finish()
+    return result
+
+
+def translate_streaming(
+    client: AzureOpenAI,
+    content: str,
+    system_prompt: str,
+    output_path: str,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: Optional[TranslationCache] = None,
+    quality_gate: Optional[QualityGate] = None,
+    sections: Optional[List[str]] = None,
+) -> None:
+    """Translate with streamed responses, writing text to output_path as it arrives.
+
+    Chunks are still translated concurrently, but the head chunk streams
+    straight into the file and later chunks are written once they reach the
+    head. After every chunk a checkpoint records how many segments are on
+    disk, so a rerun resumes after the last completed chunk. With a quality
+    gate, chunks are scored once written and any chunk that is retranslated
+    is spliced back into the file at the end. sections are the converter's
+    section texts, if it saved them.
+    """
+    deployment_name = os.environ.get("AOAI_DEPLOYMENT", "gpt4-1-translation")
+    prompt_hash = hash_prompt(system_prompt)
+    segments = segment_markdown(content, max_tokens, sections)
+    # Segments split from the converter's records may differ, so they resume separately
+    parts = [content, prompt_hash, deployment_name, str(max_tokens)] + (["sections"] if sections else [])
+    fingerprint = hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+    
+    completed, offset = load_checkpoint(output_path, fingerprint)
+    if completed:
+        print(f"Resuming after {completed}/{len(segments)} segments", file=sys.stderr)
+    
+    # Segments already on disk are marked done so they are never re-requested
+    translations: List[Optional[str]] = [''] * completed + [None] * (len(segments) - completed)
+    if cache is not None:
+        for index in range(completed, len(segments)):
+            translations[index] = cache.get(segments[index], prompt_hash, deployment_name)
+    
+    groups = {group[0]: group for group in group_pending(segments, translations, max_tokens)}
+    units = sorted(
+        list(groups.values())
+        + [[index] for index in range(completed, len(segments)) if translations[index] is not None],
+        key=lambda unit: unit[0],
+    )
+    slots = {key: StreamSlot() for key in groups}
+    print(
+        f"Streaming {len(groups)} chunks ({len(segments) - completed} segments) "
+        f"with concurrency {concurrency} to {output_path}...",
+        file=sys.stderr,
+    )
+    
+    def group_sources(key: int) -> List[str]:
+        return [segments[index] for index in groups[key]]
+    
+    results: Dict[int, Tuple[List[str], bool]] = {}
+    spans: Dict[int, Tuple[int, int]] = {}
+    mode = "r+" if completed else "w"
+    with open(output_path, mode, encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=pool_size(concurrency)) as executor:
+        out.seek(offset)
+        out.truncate()
+        futures = {
+            key: executor.submit(stream_group, client, slots[key], group_sources(key), system_prompt)
+            for key in groups
+        }
+        
+        for unit in units:
+            if out.tell():
+                out.write('\n\n')
+            body_start = out.tell()
+            
+            if unit[0] in slots:
+                write_slot(out, slots[unit[0]], body_start)
+                results[unit[0]] = futures[unit[0]].result()
+                spans[unit[0]] = (body_start, out.tell())
+                if quality_gate is not None:
+                    quality_gate.submit(
+                        unit[0], '\n\n'.join(group_sources(unit[0])),
+                        '\n\n'.join(results[unit[0]][0]),
+                        lambda key: translate_segments(client, group_sources(key), system_prompt),
+                    )
+            else:
+                out.write(translations[unit[0]] or '')
+            
+            out.flush()
+            os.fsync(out.fileno())
+            save_checkpoint(output_path, fingerprint, unit[-1] + 1, len(segments), out.tell())
+        
+        out.write('\n')
+    
+    passed = {key: True for key in results}
+    if quality_gate is not None:
+        written = dict(results)
+        passed = quality_gate.review(results)
+        replaced = {key: results[key] for key in results if results[key] is not written[key]}
+        if replaced:
+            splice_output(output_path, spans, replaced)
+    
+    for key, group in groups.items():
+        parts, aligned = results[key]
+        store_translations(
+            translations, segments, group, parts, aligned,
+            cache if passed[key] else None, prompt_hash, deployment_name,
+        )
+    
+    os.remove(checkpoint_path(output_path))
+
+
+def splice_output(
+    output_path: str,
+    spans: Dict[int, Tuple[int, int]],
+    replaced: Dict[int, Tuple[List[str], bool]],
+) -> None:
+    """Swap retranslated chunks into the written file and replace it atomically."""
+    with open(output_path, "rb") as f:
+        data = f.read()
+    
+    # Splice from the end so earlier byte offsets stay valid
+    for key in sorted(replaced, reverse=True):
+        start, end = spans[key]
+        text = '\n\n'.join(replaced[key][0]).encode('utf-8')
+        data = data[:start] + text + data[end:]
+    
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output_path)
+
+
+def write_slot(out: Any, slot: StreamSlot, body_start: int) -> None:
+    """Copy a slot's streamed deltas into the output file until it finishes."""
+    marker_filter: Optional[MarkerFilter] = None
+    generation = slot.generation
+    position = 0
+    
+    while True:
+        with slot.cond:
+            while (not slot.done and len(slot.deltas) == position
+                   and slot.generation == generation):
+                slot.cond.wait()
+            if slot.generation != generation:
+                # The request was restarted: drop what was written for it
+                generation, position = slot.generation, 0
+                marker_filter = None
+                out.seek(body_start)
+                out.truncate()
+                continue
+            if marker_filter is None:
+                marker_filter = MarkerFilter(slot.mask)
+            new_deltas = slot.deltas[position:]
+            position = len(slot.deltas)
+            done, error = slot.done, slot.error
+        
+        out.write(marker_filter.feed(''.join(new_deltas)))
+        out.flush()
+        if done:
+            if error is not None:
+                raise error
+            out.write(marker_filter.flush())
+            return
+
+
 def read_markdown_file(file_path: str) -> str:
     """Read markdown content from file."""
     try:
@@ -142,34 +1029,213 @@ def read_markdown_file(file_path: str) -> str:
         sys.exit(1)
 
 
-def main() -> None:
-    """Main function to translate markdown content."""
-    if len(sys.argv) != 2:
-        print("Usage: python translate.py <markdown_file>")
-        print("Example: python translate.py 2024-01-15_issue.md")
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Translate English markdown to Japanese",
+        epilog="Example: python translate.py 2024-01-15_issue.md",
+    )
+    parser.add_argument("markdown_file", help="Markdown file to translate")
+    parser.add_argument(
+        "--parallel", action="store_true",
+        help="Split at section boundaries and translate chunks concurrently",
+    )
+    parser.add_argument(
+        "--concurrency", type=int,
+        default=int(os.environ.get("TRANSLATE_CONCURRENCY", DEFAULT_CONCURRENCY)),
+        help=f"Chunks in flight at the start; adapts up to AOAI_MAX_CONCURRENCY (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--chunk-tokens", type=int,
+        default=int(os.environ.get("TRANSLATE_CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS)),
+        help=f"Estimated input tokens per chunk (default: {DEFAULT_CHUNK_TOKENS})",
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Stream responses into --output with a resumable checkpoint (implies --parallel)",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the translation to this file instead of stdout (required with --stream)",
+    )
+    parser.add_argument(
+        "--qc", action="store_true",
+        help="Score each chunk while translation continues and retranslate chunks below the threshold",
+    )
+    parser.add_argument(
+        "--qc-threshold", type=float, default=QUALITY_THRESHOLD,
+        help=f"Minimum chunk quality score (default: {QUALITY_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--no-heuristics", action="store_true",
+        help="Send every chunk to the LLM judge instead of settling clear cases locally",
+    )
+    parser.add_argument(
+        "--qc-report",
+        help="Write the quality score and per-section breakdown to this JSON file",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the translation memory in parallel mode",
+    )
+    args = parser.parse_args()
+    if args.stream and not args.output:
+        parser.error("--stream requires --output")
+    if args.qc and not (args.parallel or args.stream):
+        parser.error("--qc requires --parallel or --stream")
+    return args
+
+
+def finish_quality_gate(
+    quality_gate: "QualityGate", threshold: float, report_path: Optional[str] = None
+) -> None:
+    """Wait for pending checks, report the score and exit if it is below threshold."""
+    quality_gate.close()
+    print(quality_gate.summary(), file=sys.stderr)
+    if report_path:
+        quality_gate.write_report(report_path)
+    if quality_gate.score < threshold:
+        print(
+            f"Error: Quality score {quality_gate.score:.3f} is below {threshold}",
+            file=sys.stderr,
+        )
         sys.exit(1)
-    
-    markdown_file = sys.argv[1]
-    
-    # Read markdown content
-    content = read_markdown_file(markdown_file)
+
+
+def translate_file(
+    client: AzureOpenAI,
+    markdown_file: str,
+    output_path: Optional[str],
+    system_prompt: str,
+    stream: bool = False,
+    parallel: bool = False,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: Optional[TranslationCache] = None,
+    quality_gate: Optional["QualityGate"] = None,
+    qc_threshold: float = QUALITY_THRESHOLD,
+    qc_report: Optional[str] = None,
+    ledger: Optional[Ledger] = None,
+    content: Optional[str] = None,
+) -> bool:
+    """Translate a Markdown file into output_path and record it in the ledger.
+
+    The stage is skipped when the ledger shows the same source, prompt and
+    deployment already produced the current output file. Without an
+    output_path the translation is printed to stdout and the ledger is left
+    alone. content can be passed when the caller already holds the file's
+    content. Returns True if the file was translated.
+    """
+    if content is None:
+        content = read_markdown_file(markdown_file)
     
     if not content.strip():
         print("Error: Markdown file is empty")
         sys.exit(1)
     
+    deployment_name = os.environ.get("AOAI_DEPLOYMENT", "gpt4-1-translation")
+    input_hash = content_hash('\0'.join([content, hash_prompt(system_prompt), deployment_name]))
+    
+    # Section records saved by the stream converter for exactly this Markdown
+    records = load_sections(markdown_file, content)
+    sections = [record["markdown"] for record in records] if records else None
+    
+    def work(extra: Dict[str, Any]) -> None:
+        if sections is not None:
+            print(f"Using {len(sections)} converter sections", file=sys.stderr)
+        translated_content = None
+        if stream:
+            translate_streaming(
+                client, content, system_prompt, output_path,
+                max_tokens=max_tokens,
+                concurrency=concurrency,
+                cache=cache,
+                quality_gate=quality_gate,
+                sections=sections,
+            )
+        elif parallel:
+            translated_content = translate_parallel(
+                client, content, system_prompt,
+                max_tokens=max_tokens,
+                concurrency=concurrency,
+                cache=cache,
+                quality_gate=quality_gate,
+                sections=sections,
+            )
+        else:
+            # One request, split in halves like a parallel chunk if it gets truncated
+            translated_content = translate_chunk(client, content, system_prompt, use_mask=False)
+        if translated_content is not None and output_path is not None:
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(translated_content + '\n')
+        
+        if quality_gate is not None:
+            finish_quality_gate(quality_gate, qc_threshold, qc_report)
+            extra["qc_score"] = round(quality_gate.score, 4)
+        
+        if stream or parallel:
+            print(shared_limiter().summary(), file=sys.stderr)
+            print(MASK_STATS.summary(), file=sys.stderr)
+        
+        if output_path is None:
+            print(translated_content)
+            return
+        
+        # Estimates only; the streaming path does not see usage totals
+        extra["input_tokens"] = estimate_tokens(content)
+        extra["output_tokens"] = estimate_tokens(read_markdown_file(output_path))
+        print(f"Translation written to {output_path}", file=sys.stderr)
+    
+    if output_path is None:
+        work({})
+        return True
+    
+    ledger = ledger or open_ledger()
+    return run_stage(
+        ledger, guid_for_file(ledger, markdown_file), "translate", work,
+        input_hash=input_hash, output_path=output_path,
+    )
+
+
+def main() -> None:
+    """Main function to translate markdown content."""
+    args = parse_args()
+    
     # Load translation prompt
     system_prompt = load_translation_prompt()
     
     # Create Azure OpenAI client
     client = create_azure_client()
+    shared_limiter().set_concurrency(args.concurrency)
     
     # Translate content
     print("Translating content...", file=sys.stderr)
-    translated_content = translate_with_retry(client, content, system_prompt)
+    cache = None
+    if (args.parallel or args.stream) and not args.no_cache:
+        cache = open_cache_from_env(estimate_tokens)
+    quality_gate = None
+    if args.qc:
+        quality_gate = QualityGate(
+            client, args.concurrency, args.qc_threshold, use_heuristics=not args.no_heuristics
+        )
     
-    # Output translated content
-    print(translated_content)
+    try:
+        # Without --output the translation goes to stdout
+        translate_file(
+            client, args.markdown_file, args.output, system_prompt,
+            stream=args.stream,
+            parallel=args.parallel,
+            max_tokens=args.chunk_tokens,
+            concurrency=args.concurrency,
+            cache=cache,
+            quality_gate=quality_gate,
+            qc_threshold=args.qc_threshold,
+            qc_report=args.qc_report,
+        )
+    finally:
+        if cache is not None:
+            print(cache.stats.summary(), file=sys.stderr)
+            cache.close()
 
 
 if __name__ == "__main__":
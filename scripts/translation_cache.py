@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Persistent translation memory for repeated newsletter segments.
+Stores translations in a local SQLite database keyed by the normalized source
+segment, the system prompt hash and the deployment name.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+# Default location and size limit of the translation memory
+DEFAULT_CACHE_PATH = ".cache/translation_memory.sqlite3"
+DEFAULT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Eviction trims the store down to this fraction of the size limit
+EVICTION_TARGET_RATIO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    key TEXT PRIMARY KEY,
+    deployment TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS segments_last_used ON segments (last_used);
+"""
+
+
+def normalize_segment(segment: str) -> str:
+    """Normalize a source segment so trivial whitespace changes still match."""
+    lines = [line.rstrip() for line in segment.replace('\r\n', '\n').split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def hash_prompt(system_prompt: str) -> str:
+    """Hash the system prompt so prompt edits invalidate cached translations."""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def segment_key(segment: str, prompt_hash: str, deployment: str) -> str:
+    """Build the content-addressed key for a segment."""
+    material = '\0'.join([normalize_segment(segment), prompt_hash, deployment])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class CacheStats:
+    """Hit/miss counters and the estimated tokens they saved in this run."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.saved_input_tokens = 0
+        self.saved_output_tokens = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        """Format the counters as a one-line report."""
+        return (
+            f"Translation cache: {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate), {self.stores} stored, "
+            f"{self.evictions} evicted, ~{self.saved_input_tokens} input / "
+            f"~{self.saved_output_tokens} output tokens saved"
+        )
+
+
+class TranslationCache:
+    """SQLite-backed translation memory with size-based LRU eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.token_counter = token_counter or (lambda text: len(text) // 4)
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def get(self, segment: str, prompt_hash: str, deployment: str) -> Optional[str]:
+        """Return the cached translation for a segment, or None on a miss."""
+        key = segment_key(segment, prompt_hash, deployment)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation FROM segments WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE segments SET last_used = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+
+        self.stats.hits += 1
+        self.stats.saved_input_tokens += self.token_counter(segment)
+        self.stats.saved_output_tokens += self.token_counter(row[0])
+        return row[0]
+
+    def peek(self, segment: str, prompt_hash: str, deployment: str) -> Optional[str]:
+        """Return the cached translation without counting a hit or refreshing its age."""
+        key = segment_key(segment, prompt_hash, deployment)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation FROM segments WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, segment: str, prompt_hash: str, deployment: str, translation: str) -> None:
+        """Store a translation and evict old entries if the store is over its limit."""
+        key = segment_key(segment, prompt_hash, deployment)
+        source = normalize_segment(segment)
+        size_bytes = len(source.encode('utf-8')) + len(translation.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO segments "
+                "(key, deployment, prompt_hash, source, translation, size_bytes, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, deployment, prompt_hash, source, translation, size_bytes, now, now),
+            )
+            self._conn.commit()
+            self.stats.stores += 1
+            self._evict()
+
+    def total_bytes(self) -> int:
+        """Return the total payload size of all cached segments."""
+        row = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM segments").fetchone()
+        return int(row[0])
+
+    def _evict(self) -> None:
+        """Drop least recently used segments until the store fits its size limit."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * EVICTION_TARGET_RATIO)
+        rows = self._conn.execute(
+            "SELECT key, size_bytes FROM segments ORDER BY last_used ASC"
+        ).fetchall()
+        doomed = []
+        for key, size_bytes in rows:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size_bytes
+
+        self._conn.executemany("DELETE FROM segments WHERE key = ?", doomed)
+        self._conn.commit()
+        self.stats.evictions += len(doomed)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_cache_from_env(token_counter: Optional[Callable[[str], int]] = None) -> TranslationCache:
+    """Open the translation memory configured by TRANSLATION_CACHE_* variables."""
+    path = os.environ.get("TRANSLATION_CACHE_PATH", DEFAULT_CACHE_PATH)
+    max_mb = os.environ.get("TRANSLATION_CACHE_MAX_MB")
+    max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_CACHE_MAX_BYTES
+    return TranslationCache(path, max_bytes, token_counter=token_counter)
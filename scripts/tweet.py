@@ -6,11 +6,13 @@ Extracts a short summary and posts with link to full article.
 
 import os
 import sys
-import re
 from typing import Optional
 import tweepy
 from dotenv import load_dotenv
 
+from document import load_document, parse_document, tweet_text
+from ledger import STATUS_DONE, guid_for_file, open_ledger
+
 # Load environment variables
 load_dotenv()
 
@@ -19,14 +21,7 @@ def is_quiet_day(content: str) -> bool:
     """
     Check if this is a "quiet day" newsletter with minimal content.
     """
-    lines = content.strip().split('\n')
-    
-    # Check for quiet day indicators
-    for line in lines[:10]:  # Check first 10 lines
-        if '静かな一日' in line or 'quiet day' in line.lower():
-            return True
-    
-    return False
+    return parse_document(content).quiet_day
 
 
 def extract_title(content: str) -> str:
@@ -34,43 +29,14 @@ def extract_title(content: str) -> str:
     Extract the main title from markdown content.
     Handles bold (**title**), italic (*title*), or heading (# title) formats.
     """
-    lines = content.strip().split('\n')
-    
-    # Look for the first non-empty line which should be the title
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Remove heading prefix (# title)
-        if line.startswith('#'):
-            line = re.sub(r'^#+\s*', '', line)
-        
-        # Remove bold formatting (**title**)
-        line = re.sub(r'^\*\*(.+)\*\*$', r'\1', line)
-        
-        # Remove italic formatting (*title*)
-        line = re.sub(r'^\*(.+)\*$', r'\1', line)
-        
-        return line.strip()
-    
-    return "AIニュース"
+    return parse_document(content).title
+
 
 def extract_tweet_summary(content: str, max_length: int = 100) -> str:
     """
     Extract the main title for tweeting.
     """
-    title = extract_title(content)
-    
-    # Truncate if needed for tweet
-    if len(title) > max_length:
-        if '、' in title[:max_length-3]:
-            cut_point = title[:max_length-3].rfind('、')
-            title = title[:cut_point] + '...'
-        else:
-            title = title[:max_length-3] + '...'
-    
-    return title
+    return tweet_text(extract_title(content), max_length)
 
 
 def post_tweet(message: str) -> bool:
@@ -107,6 +73,52 @@ def post_tweet(message: str) -> bool:
         return False
 
 
+def issue_url(date_prefix):
+    """Public URL of an issue page."""
+    return f"https://yipg.github.io/ainews/newsletters/{date_prefix}.html"
+
+
+def tweet_issue(document, date_prefix, guid=None, ledger=None):
+    """Post the tweet for a parsed issue; return True unless posting failed.
+
+    Quiet days and issues the ledger shows as already tweeted are skipped.
+    """
+    # Check if it's a quiet day
+    if document.quiet_day:
+        print("Quiet day detected - skipping tweet")
+        return True
+    
+    # Never post the same issue twice
+    if guid and ledger and ledger.is_done(guid, "tweet"):
+        print("Tweet already posted for this issue - skipping")
+        return True
+    
+    summary = document.tweet_text
+    
+    # Build tweet with URL
+    url = issue_url(date_prefix)
+    
+    # Calculate available space for summary (140 - URL length - 1 space)
+    # Twitter automatically shortens URLs to ~23 chars
+    available_length = 140 - 24 - 1
+    
+    # Truncate summary if needed
+    if len(summary) > available_length:
+        summary = summary[:available_length-3] + '...'
+    
+    # Compose tweet
+    tweet = f"{summary} {url}"
+    
+    print(f"Tweet ({len(tweet)} chars): {tweet}")
+    
+    # Post tweet
+    if not post_tweet(tweet):
+        return False
+    if guid and ledger:
+        ledger.record(guid, "tweet", status=STATUS_DONE)
+    return True
+
+
 def main():
     """Main function to process translated file and post tweet."""
     if len(sys.argv) != 3:
@@ -117,46 +129,20 @@ def main():
     date_prefix = sys.argv[2]
     
     try:
-        # Read translated content
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Read the translation's parsed sidecar (parsing it if missing or stale)
+        document = load_document(input_file)
         
-        # Check if it's a quiet day
-        if is_quiet_day(content):
-            print("Quiet day detected - skipping tweet")
-            sys.exit(0)
-        
-        # Extract summary
-        summary = extract_tweet_summary(content)
-        
-        # Build tweet with URL
-        url = f"https://yipg.github.io/ainews/newsletters/{date_prefix}.html"
-        
-        # Calculate available space for summary (140 - URL length - 1 space)
-        # Twitter automatically shortens URLs to ~23 chars
-        available_length = 140 - 24 - 1
-        
-        # Truncate summary if needed
-        if len(summary) > available_length:
-            summary = summary[:available_length-3] + '...'
-        
-        # Compose tweet
-        tweet = f"{summary} {url}"
-        
-        print(f"Tweet ({len(tweet)} chars): {tweet}")
-        
-        # Post tweet
-        if post_tweet(tweet):
-            sys.exit(0)
-        else:
-            sys.exit(1)
-            
+        ledger = open_ledger()
+        guid = guid_for_file(ledger, input_file)
+        posted = tweet_issue(document, date_prefix, guid, ledger)
     except FileNotFoundError:
         print(f"Error: File '{input_file}' not found")
         sys.exit(1)
     except Exception as e:
         print(f"Error processing file: {e}")
         sys.exit(1)
+    
+    sys.exit(0 if posted else 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+from html_sections import convert_html_to_sections
+
+HTML = """
+<h2>News</h2>
+<ul>
+<li><strong>Model</strong> released <a href="https://a.example/1">post</a>
+<blockquote><p>quoted text</p></blockquote>
+<pre>code line</pre>
+</li>
+<li>second <a href="https://b.example/2">link</a></li>
+</ul>
+"""
+
+
+def test_sections_carry_heading_markdown_and_links():
+    [section] = convert_html_to_sections(HTML)
+    assert section["heading"] == "News"
+    assert section["level"] == 2
+    assert section["markdown"].startswith("## News\n\n* **Model** released [post](https://a.example/1)")
+    assert section["links"] == ["https://a.example/1", "https://b.example/2"]
+
+
+def test_item_text_survives_nested_blocks():
+    [section] = convert_html_to_sections(HTML)
+    first, second = section["items"]
+    assert first["text"].startswith("* **Model** released [post](https://a.example/1)")
+    assert "quoted text" in first["text"]
+    assert "code line" in first["text"]
+    assert first["links"] == ["https://a.example/1"]
+    assert second["text"] == "* second [link](https://b.example/2)"
+    assert second["links"] == ["https://b.example/2"]
@@ -0,0 +1,71 @@
+import pytest
+
+from ledger import Ledger, content_hash, run_stage
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+
+
+def test_run_stage_skips_current_output(tmp_path):
+    ledger = Ledger(str(tmp_path / "ledger.jsonl"))
+    output = tmp_path / "out.md"
+    runs = []
+
+    def work(extra):
+        runs.append(1)
+        write(output, "translated")
+        extra["tokens"] = 42
+
+    assert run_stage(ledger, "guid-1", "translate", work, content_hash("in"), str(output))
+    assert not run_stage(ledger, "guid-1", "translate", work, content_hash("in"), str(output))
+    assert len(runs) == 1
+    assert ledger.stage("guid-1", "translate")["tokens"] == 42
+
+    # The ledger is replayed from disk
+    reopened = Ledger(str(tmp_path / "ledger.jsonl"))
+    assert reopened.is_done("guid-1", "translate", content_hash("in"))
+
+
+def test_run_stage_reruns_for_new_input_or_changed_output(tmp_path):
+    ledger = Ledger(str(tmp_path / "ledger.jsonl"))
+    output = tmp_path / "out.md"
+    runs = []
+
+    def work(extra):
+        runs.append(1)
+        write(output, "translated")
+
+    run_stage(ledger, "guid-1", "translate", work, content_hash("in"), str(output))
+    assert run_stage(ledger, "guid-1", "translate", work, content_hash("changed"), str(output))
+    write(output, "edited by hand")
+    assert run_stage(ledger, "guid-1", "translate", work, content_hash("changed"), str(output))
+    assert len(runs) == 3
+
+
+def test_failed_stage_is_not_done(tmp_path):
+    ledger = Ledger(str(tmp_path / "ledger.jsonl"))
+
+    def work(extra):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_stage(ledger, "guid-1", "publish", work)
+    assert ledger.stage("guid-1", "publish")["status"] == "failed"
+    assert not ledger.is_done("guid-1", "publish")
+
+
+def test_compact_keeps_the_latest_record_of_each_stage(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    ledger = Ledger(str(path))
+    ledger.record("guid-1", date="2026-01-02", title="Issue")
+    for _ in range(3):
+        with ledger.track("guid-1", "publish"):
+            pass
+    ledger.compact()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    reopened = Ledger(str(path))
+    assert reopened.guid_for_date("2026-01-02") == "guid-1"
+    assert reopened.is_done("guid-1", "publish")
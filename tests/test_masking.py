@@ -0,0 +1,55 @@
+from masking import Mask, MaskStats
+
+BODY = (
+    "Thanks @karpathy, see https://example.com/post. and run `pip install x`:\n\n"
+    "```\nprint('hi')\n```\n\nAgain https://example.com/post"
+)
+
+
+def test_apply_and_restore_round_trip():
+    mask = Mask()
+    masked = mask.apply(BODY)
+    assert "https://" not in masked
+    assert "@karpathy" not in masked
+    assert "print('hi')" not in masked
+    # The trailing full stop stays outside the URL placeholder
+    assert "{{U" in masked and "}}. and" in masked
+    assert mask.verify(masked) == []
+    assert mask.restore(masked) == BODY
+
+
+def test_repeated_values_share_a_placeholder():
+    mask = Mask()
+    masked = mask.apply(BODY)
+    url_placeholders = [p for p, value in mask.values.items() if value == "https://example.com/post"]
+    assert len(url_placeholders) == 1
+    assert masked.count(url_placeholders[0]) == 2
+
+
+def test_verify_reports_missing_and_unknown_placeholders():
+    mask = Mask()
+    masked = mask.apply("Read https://example.com/a twice: https://example.com/a")
+    placeholder = next(iter(mask.values))
+    translated = masked.replace(placeholder, "", 1) + " {{U9}}"
+    assert mask.verify(translated) == [f"missing {placeholder}", "unknown {{U9}}"]
+
+
+def test_text_with_placeholder_tokens_is_left_alone():
+    mask = Mask()
+    text = "Literal {{U1}} and https://example.com/a"
+    assert mask.apply(text) == text
+    assert not mask.values
+
+
+def test_saved_chars_counts_every_occurrence():
+    url = "https://example.com/" + "x" * 40
+    mask = Mask()
+    mask.apply(f"{url} and {url}")
+    assert mask.saved_chars() == 2 * (len(url) - len("{{U1}}"))
+
+    stats = MaskStats()
+    stats.add(mask)
+    stats.fallback()
+    assert (stats.requests, stats.placeholders, stats.saved_chars, stats.fallbacks) == (
+        1, 2, mask.saved_chars(), 1,
+    )
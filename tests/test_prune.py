@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+from prune import prune_sections
+
+STORY = "OpenAI released a new reasoning model that beats earlier models on math benchmarks"
+
+
+def test_near_duplicate_bullet_is_dropped():
+    sections = [
+        f"## Twitter\n\n* {STORY} [post](https://a.example/1)",
+        f"## Reddit\n\n* {STORY} [thread](https://b.example/2)",
+    ]
+    pruned, dropped = prune_sections(sections)
+    assert pruned[0] == sections[0]
+    assert [entry["reason"] for entry in dropped] == ["near_duplicate"]
+
+
+def test_repeated_link_list_is_dropped():
+    sections = [
+        "## Twitter\n\n* Release notes for the new model [notes](https://a.example/1)",
+        "## Links\n\nIntro paragraph.\n\n[notes](https://a.example/1)",
+    ]
+    pruned, dropped = prune_sections(sections)
+    assert [entry["reason"] for entry in dropped] == ["repeated_links"]
+    assert "https://a.example/1" not in pruned[1]
+
+
+def test_links_of_dropped_bullets_are_not_seen():
+    # The only bullet citing b.example/2 is dropped as a duplicate, so the later
+    # link list is the last place that source appears and must survive
+    sections = [
+        f"## Twitter\n\n* {STORY} [post](https://a.example/1)",
+        f"## Reddit\n\n* {STORY} [thread](https://b.example/2)",
+        "## Links\n\nSources for today.\n\n[thread](https://b.example/2)",
+    ]
+    pruned, dropped = prune_sections(sections)
+    assert [entry["reason"] for entry in dropped] == ["near_duplicate"]
+    assert pruned[2] == sections[2]
+
+
+def test_links_of_capped_bullets_are_not_seen():
+    filler = " ".join(f"word{i}" for i in range(200))
+    sections = [
+        f"## Discord\n\n* {filler} [log](https://c.example/3)",
+        "## Links\n\nSources for today.\n\n[log](https://c.example/3)",
+    ]
+    pruned, dropped = prune_sections(sections, section_tokens=50)
+    assert [entry["reason"] for entry in dropped] == ["section_cap"]
+    assert "https://c.example/3" in pruned[1]
+
+
+def test_prune_does_not_load_the_translator():
+    scripts = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+    code = "import sys, prune; print(sorted({'translate', 'openai', 'dotenv'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=scripts, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
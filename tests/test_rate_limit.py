@@ -0,0 +1,95 @@
+import pytest
+
+from rate_limit import Bucket, RateLimiter, is_rate_limited, retry_after
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class Throttled(Exception):
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("Error code: 429")
+        self.response = Response(headers or {"retry-after": "0"})
+
+
+def test_bucket_paces_requests_at_its_rate():
+    bucket = Bucket(rate_per_minute=60, burst_seconds=10)
+    assert bucket.capacity == 10
+    assert bucket.wait_time(10) == 0
+    bucket.take(10)
+    assert bucket.wait_time(2) == pytest.approx(2)
+    bucket.refill(bucket.updated + 2)
+    assert bucket.wait_time(2) == 0
+
+
+def test_bucket_caps_oversized_requests_at_its_capacity():
+    bucket = Bucket(rate_per_minute=60, burst_seconds=10)
+    assert bucket.wait_time(100) == 0
+    bucket.take(100)
+    # The debt is paid off before the next request goes out
+    assert bucket.wait_time(1) == pytest.approx(91)
+
+
+def test_success_grows_concurrency_by_one_per_round():
+    limiter = RateLimiter(tpm=1_000_000, rpm=10_000, concurrency=4, max_concurrency=8)
+    for _ in range(4):
+        limiter.succeed()
+    # 1/limit per success: just under one more slot after a round of four
+    assert 4.8 < limiter.limit < 5
+    for _ in range(100):
+        limiter.succeed()
+    assert limiter.limit == 8
+
+
+def test_throttles_in_one_burst_halve_concurrency_once():
+    limiter = RateLimiter(tpm=1_000_000, rpm=10_000, concurrency=8)
+    limiter.throttle(5, attempt=0)
+    limiter.throttle(5, attempt=0)
+    assert limiter.limit == 4
+    assert limiter.throttled == 2
+
+
+def test_call_retries_throttled_requests():
+    limiter = RateLimiter(tpm=1_000_000, rpm=10_000, concurrency=2, max_retries=3)
+    attempts = []
+    retries = []
+
+    def request():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise Throttled()
+        return "ok"
+
+    assert limiter.call(10, request, on_retry=lambda: retries.append(1)) == "ok"
+    assert len(attempts) == 2 and len(retries) == 1
+    assert limiter.in_flight == 0
+
+
+def test_call_raises_other_errors_and_the_last_throttle():
+    limiter = RateLimiter(tpm=1_000_000, rpm=10_000, max_retries=2)
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(10, broken)
+
+    def throttled():
+        raise Throttled()
+
+    with pytest.raises(Throttled):
+        limiter.call(10, throttled)
+    assert limiter.in_flight == 0
+
+
+def test_retry_after_headers():
+    assert is_rate_limited(Throttled())
+    assert not is_rate_limited(ValueError("bad request"))
+    assert retry_after(Throttled({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(Throttled({"retry-after": "7"})) == 7
+    assert retry_after(Throttled({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert retry_after(ValueError("no response")) is None
@@ -0,0 +1,23 @@
+import re
+
+import site_pages
+from archive_index import ArchiveIndex
+from build_manifest import BuildManifest
+from site_pages import SitePages
+from tweet import issue_url
+
+
+def test_sitemap_urls_match_the_published_urls(tmp_path, monkeypatch):
+    newsletters = tmp_path / "docs" / "newsletters"
+    newsletters.mkdir(parents=True)
+    (newsletters / "2026-06-29.html").write_text("<html></html>", encoding="utf-8")
+    monkeypatch.setattr(site_pages, "NEWSLETTERS_DIR", str(newsletters))
+    monkeypatch.setattr(site_pages, "SITEMAP_PATH", str(tmp_path / "docs" / "sitemap.xml"))
+
+    pages = SitePages(ArchiveIndex(str(newsletters / "index")), BuildManifest(str(tmp_path / "build_manifest.json")))
+    pages.build_sitemap()
+
+    sitemap = (tmp_path / "docs" / "sitemap.xml").read_text(encoding="utf-8")
+    urls = re.findall(r"<loc>(.*?)</loc>", sitemap)
+    assert issue_url("2026-06-29") in urls
+    assert not [url for url in urls if "/docs/" in url]
@@ -0,0 +1,63 @@
+from structure_check import FAIL, PASS, UNCERTAIN, check_structure, extract_urls
+
+SOURCE = (
+    "## Model releases\n\n"
+    "* OpenAI released a new reasoning model that scores 92.5 on the benchmark "
+    "[announcement](https://openai.example/blog)\n"
+    "* Mistral shipped two open models with 24B parameters "
+    "[weights](https://mistral.example/models)"
+)
+
+TRANSLATED = (
+    "## モデルのリリース\n\n"
+    "* OpenAIは新しい推論モデルをリリースし、ベンチマークで92.5を記録しました "
+    "[発表](https://openai.example/blog)\n"
+    "* Mistralは24Bパラメータのオープンモデルを2つ公開しました "
+    "[重み](https://mistral.example/models)"
+)
+
+
+def test_faithful_translation_passes():
+    result = check_structure(SOURCE, TRANSLATED)
+    assert result.verdict == PASS, result.reasons
+
+
+def test_empty_translation_fails():
+    assert check_structure(SOURCE, "  \n").verdict == FAIL
+
+
+def test_untranslated_section_fails():
+    result = check_structure(SOURCE, SOURCE)
+    assert result.verdict == FAIL
+    assert any(reason.startswith("not translated") for reason in result.reasons)
+
+
+def test_lost_urls_fail():
+    translated = TRANSLATED.replace("[発表](https://openai.example/blog)", "発表")
+    translated = translated.replace("[重み](https://mistral.example/models)", "重み")
+    result = check_structure(SOURCE, translated)
+    assert result.verdict == FAIL
+    assert any(reason.startswith("lost URLs") for reason in result.reasons)
+
+
+def test_code_fence_mismatch_fails():
+    source = SOURCE + "\n\n```\npip install model\n```"
+    translated = TRANSLATED + "\n\n```\npip install model"
+    result = check_structure(source, translated)
+    assert result.verdict == FAIL
+    assert any(reason.startswith("code fence count") for reason in result.reasons)
+
+
+def test_changed_number_is_uncertain():
+    result = check_structure(SOURCE, TRANSLATED.replace("92.5", "95.2"))
+    assert result.verdict == UNCERTAIN
+    assert any(reason.startswith("numbers changed") for reason in result.reasons)
+
+
+def test_source_newsletter_links_are_ignored():
+    source = SOURCE + "\n\nRead the full issue at https://news.smol.ai/issues/2026-01-02"
+    assert extract_urls(source) == {"https://openai.example/blog", "https://mistral.example/models"}
+    # The prompt drops the smol.ai link, which must not count as a lost URL
+    result = check_structure(source, TRANSLATED)
+    assert result.metrics["url_recall"] == 1.0
+    assert result.verdict == PASS, result.reasons
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from templating import template_dependencies
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    # TEMPLATE_DIR is relative to the repository root, where the scripts run
+    monkeypatch.chdir(ROOT)
+
+
+def test_issue_pages_depend_only_on_the_templates_they_use():
+    dependencies = template_dependencies("newsletter.html")
+    assert "layout.html" in dependencies
+    assert "partials/nav.html" in dependencies
+    for listing in ("archive.html", "month.html", "tag.html", "sitemap.xml", "partials/listing.html"):
+        assert listing not in dependencies
+
+
+def test_listing_pages_include_their_macros():
+    assert "partials/listing.html" in template_dependencies("month.html")
+    assert template_dependencies("sitemap.xml") == ["sitemap.xml"]
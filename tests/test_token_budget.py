@@ -0,0 +1,58 @@
+import pytest
+
+import token_budget
+from token_budget import Limits, TokenCounter, evaluate, plan_translation
+
+SECTIONS = [f"## Section {i}\n\n" + "word " * 400 for i in range(6)]
+CONTENT = "\n\n".join(SECTIONS)
+
+
+@pytest.fixture
+def counter(monkeypatch):
+    # The character estimate keeps the numbers independent of tiktoken
+    monkeypatch.setattr(token_budget, "tiktoken", None)
+    return TokenCounter()
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setenv("AOAI_TPM", "150000")
+    monkeypatch.delenv("AOAI_RPM", raising=False)
+    monkeypatch.setenv("AOAI_MAX_CONCURRENCY", "16")
+    return Limits()
+
+
+def test_larger_chunks_send_fewer_requests(counter, limits):
+    small = evaluate(CONTENT, 1000, "prompt", counter, limits, sections=SECTIONS)
+    large = evaluate(CONTENT, 6000, "prompt", counter, limits, sections=SECTIONS)
+    assert small.segments == large.segments == 6
+    assert small.requests > large.requests >= 1
+    assert large.cost > 0 and large.seconds > 0
+
+
+def test_cached_segments_are_not_requested(counter, limits):
+    plan = evaluate(CONTENT, 1000, "prompt", counter, limits, sections=SECTIONS, cached=lambda segment: True)
+    assert plan.cached == 6
+    assert plan.requests == 0
+    assert plan.cost == 0
+
+    half = evaluate(
+        CONTENT, 1000, "prompt", counter, limits, sections=SECTIONS,
+        cached=lambda segment: segment in SECTIONS[:3],
+    )
+    assert half.cached == 3
+    assert 0 < half.requests < evaluate(CONTENT, 1000, "prompt", counter, limits, sections=SECTIONS).requests
+
+
+def test_fixed_concurrency_is_used_for_every_plan(counter, limits):
+    plans = plan_translation(
+        CONTENT, "prompt", counter, limits, sections=SECTIONS, options=(1000, 6000), concurrency=2,
+    )
+    assert [plan.concurrency for plan in plans] == [min(2, plan.requests) for plan in plans]
+
+
+def test_derived_concurrency_respects_the_ceiling(counter, limits, monkeypatch):
+    monkeypatch.setenv("AOAI_MAX_CONCURRENCY", "1")
+    plan = evaluate(CONTENT, 1000, "prompt", counter, Limits(), sections=SECTIONS)
+    assert plan.requests > 1
+    assert plan.concurrency == 1
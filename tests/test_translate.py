@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from translate import translate_file
+
+SOURCE = "## First\n\nFirst section text.\n\n## Second\n\nSecond section text.\n"
+
+
+class FakeClient:
+    """Chat client that truncates any request holding more than one section."""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        body = request["messages"][-1]["content"]
+        self.requests.append(request)
+        if body.count("## ") > 1:
+            return self.response("", "length")
+        return self.response(f"訳: {body}", "stop")
+
+    @staticmethod
+    def response(content, finish_reason):
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "2026-01-02_issue.md"
+    path.write_text(SOURCE, encoding="utf-8")
+    return path
+
+
+def test_single_request_splits_when_truncated(source, capsys):
+    client = FakeClient()
+    translate_file(client, str(source), None, "prompt")
+
+    out = capsys.readouterr().out
+    assert "訳: ## First" in out and "訳: ## Second" in out
+    # The whole issue was cut off, then resent in smaller pieces
+    assert client.requests[0]["messages"][-1]["content"].count("## ") == 2
+    assert len(client.requests) > 2
+    assert all(request["max_tokens"] <= 16384 for request in client.requests)
+
+
+def test_stdout_and_output_file_get_the_same_translation(source, tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("LEDGER_PATH", str(tmp_path / "ledger.jsonl"))
+    translate_file(FakeClient(), str(source), None, "prompt", parallel=True)
+    printed = capsys.readouterr().out
+
+    output = tmp_path / "2026-01-02_issue_ja.md"
+    translate_file(FakeClient(), str(source), str(output), "prompt", parallel=True)
+    assert output.read_text(encoding="utf-8") == printed